@@ -1,19 +1,68 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 
 
 from routes.user import user
+from routes.userDetail import user_detail
 from routes.tarifas import tarifas
 from routes.cuotas import cuotas
 from routes.pagos import pagos          
 from routes.notificaciones import notificaciones
+from routes.metricas import metricas
+from routes.dashboard import dashboard
 
 
-from config.init_db import init_db
+import config.init_db  # noqa: F401  registra todos los modelos
+from config.db import DB_ASYNC, engine, async_engine
+from config.migraciones import preparar_esquema
+from config.instrumentacion import MiddlewareInstrumentacion
+from config import replicas
+from auth import revocaciones
+from auth.seguridad import Seguridad
+from services import idempotencia, outbox, vencimientos
 
 
-api_escu = FastAPI(title="ApiEscuela", version="2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque de cada worker: lee la versión del esquema (las migraciones
+    corren aparte, una vez por deploy) y lanza las tareas en segundo plano.
+    """
+    await run_in_threadpool(preparar_esquema)
+
+    tareas = []
+    # Worker del outbox: arma y entrega las notificaciones de pagos en segundo plano
+    if outbox.OUTBOX_WORKER:
+        tareas.append(asyncio.create_task(outbox.ejecutar_worker()))
+    # Marca cuotas vencidas al iniciar y cada VENCIMIENTOS_INTERVALO segundos
+    if vencimientos.VENCIMIENTOS_INTERVALO > 0:
+        tareas.append(asyncio.create_task(vencimientos.ejecutar_periodicamente()))
+    # Purga de las claves de idempotencia vencidas
+    if idempotencia.IDEMPOTENCIA_PURGA_INTERVALO > 0:
+        tareas.append(asyncio.create_task(idempotencia.ejecutar_periodicamente()))
+    # Revocaciones de tokens hechas en otros workers
+    if revocaciones.TOKEN_REVOCACION_SYNC > 0:
+        tareas.append(asyncio.create_task(revocaciones.sincronizar_periodicamente(Seguridad.token_cache)))
+    # Chequeo de conexión y atraso de las réplicas de lectura
+    if replicas.DATABASE_REPLICA_URLS:
+        tareas.append(asyncio.create_task(replicas.verificar_periodicamente()))
+
+    yield
+
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    await replicas.cerrar()
+
+
+api_escu = FastAPI(title="ApiEscuela", version="2.0", lifespan=lifespan)
 
 # Middleware CORS
 api_escu.add_middleware(
@@ -22,17 +71,35 @@ api_escu.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Tiempo, tiempo en la base y sentencias SQL por ruta (expuestos en GET /metrics)
+api_escu.add_middleware(MiddlewareInstrumentacion)
+
+# Lecturas en réplicas: tras un commit, ese usuario lee de la primaria un rato
+api_escu.add_middleware(replicas.MiddlewareLecturas)
+
 
-init_db()
+# Con DB_ASYNC=1 las rutas async se registran primero y tienen prioridad
+# sobre sus equivalentes síncronas; el resto de las rutas no cambia.
+if DB_ASYNC:
+    from routes.userAsync import user_async
+    from routes.cuotasAsync import cuotas_async
+    from routes.pagosAsync import pagos_async
 
+    api_escu.include_router(user_async)
+    api_escu.include_router(cuotas_async)
+    api_escu.include_router(pagos_async)
 
 api_escu.include_router(user)
+api_escu.include_router(user_detail)
 api_escu.include_router(tarifas)
 api_escu.include_router(cuotas)
 api_escu.include_router(pagos)
 api_escu.include_router(notificaciones)
+api_escu.include_router(metricas)
+api_escu.include_router(dashboard)
 
 
 @api_escu.get("/")
@@ -0,0 +1,129 @@
+# auth/passwords.py
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+
+# Algoritmo y costo configurables; cambiar el costo rehashea en el próximo login
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "argon2")  # argon2 | bcrypt
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "19456"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Pool propio para el KDF, separado del threadpool que atiende las rutas sync
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+executor_hash = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="hash")
+
+
+class HasherArgon2:
+    prefijo = "$argon2"
+
+    def __init__(self, time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=ARGON2_PARALLELISM):
+        from argon2 import PasswordHasher
+        self._ph = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+    def hashear(self, password: str) -> str:
+        return self._ph.hash(password)
+
+    def verificar(self, almacenado: str, password: str) -> bool:
+        from argon2.exceptions import VerificationError, InvalidHashError
+        try:
+            return self._ph.verify(almacenado, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def requiere_rehash(self, almacenado: str) -> bool:
+        return self._ph.check_needs_rehash(almacenado)
+
+
+class HasherBcrypt:
+    """
+    bcrypt solo admite 72 bytes (desde bcrypt 5.0 falla con más): las
+    contraseñas más largas se reducen antes a su SHA-256 en base64, así
+    las de hasta 72 bytes conservan sus hashes de siempre.
+    """
+    prefijo = "$2"
+    LIMITE = 72
+
+    def __init__(self, rounds=BCRYPT_ROUNDS):
+        import bcrypt
+        self._bcrypt = bcrypt
+        self.rounds = rounds
+
+    @classmethod
+    def _preparar(cls, password: str) -> bytes:
+        datos = password.encode("utf-8")
+        if len(datos) <= cls.LIMITE:
+            return datos
+        return base64.b64encode(hashlib.sha256(datos).digest())
+
+    def hashear(self, password: str) -> str:
+        salt = self._bcrypt.gensalt(rounds=self.rounds)
+        return self._bcrypt.hashpw(self._preparar(password), salt).decode("utf-8")
+
+    def verificar(self, almacenado: str, password: str) -> bool:
+        try:
+            if self._bcrypt.checkpw(self._preparar(password), almacenado.encode("utf-8")):
+                return True
+            # Hashes de versiones de bcrypt que truncaban en silencio a 72 bytes
+            datos = password.encode("utf-8")
+            return len(datos) > self.LIMITE and self._bcrypt.checkpw(datos[:self.LIMITE], almacenado.encode("utf-8"))
+        except ValueError:
+            return False
+
+    def requiere_rehash(self, almacenado: str) -> bool:
+        return int(almacenado.split("$")[2]) != self.rounds
+
+
+HASHERS = {"argon2": HasherArgon2, "bcrypt": HasherBcrypt}
+hasher = HASHERS[PASSWORD_HASHER]()
+
+# Se verifica contra este hash cuando el usuario no existe, para que
+# la respuesta tarde lo mismo y no revele qué usernames son válidos
+_HASH_FALSO = hasher.hashear("usuario-inexistente")
+
+
+def hashear_password(password: str) -> str:
+    return hasher.hashear(password)
+
+
+def verificar_password(almacenado: Optional[str], password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Devuelve (es_valida, nuevo_hash). `nuevo_hash` viene cargado cuando la
+    contraseña es válida pero hay que guardarla de nuevo: filas heredadas en
+    texto plano, otro algoritmo o parámetros de costo desactualizados.
+    """
+    if almacenado is None:
+        hasher.verificar(_HASH_FALSO, password)
+        return False, None
+
+    for clase in HASHERS.values():
+        if almacenado.startswith(clase.prefijo):
+            verificador = hasher if isinstance(hasher, clase) else clase()
+            if not verificador.verificar(almacenado, password):
+                return False, None
+            if verificador is not hasher or hasher.requiere_rehash(almacenado):
+                return True, hasher.hashear(password)
+            return True, None
+
+    # Contraseña heredada en texto plano
+    if hmac.compare_digest(almacenado.encode("utf-8"), password.encode("utf-8")):
+        return True, hasher.hashear(password)
+    return False, None
+
+
+async def verificar_password_async(almacenado: Optional[str], password: str) -> Tuple[bool, Optional[str]]:
+    """Igual que `verificar_password`, ejecutado en el pool del KDF sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor_hash, verificar_password, almacenado, password)
+
+
+async def hashear_password_async(password: str) -> str:
+    """Igual que `hashear_password`, en el pool del KDF."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor_hash, hashear_password, password)
+
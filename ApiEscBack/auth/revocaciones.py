@@ -0,0 +1,84 @@
+# auth/revocaciones.py
+"""
+Revocaciones de tokens compartidas entre workers. Cada revocación se
+guarda en la tabla tokens_revocados además de la lista en memoria del
+worker que la recibe; una tarea de cada worker lee las filas nuevas cada
+TOKEN_REVOCACION_SYNC segundos, así un token cerrado deja de aceptarse
+en todos los workers en ese plazo. La verificación del token sigue sin
+leer la base.
+"""
+from typing import TYPE_CHECKING
+import asyncio
+import os
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.tokenRevocado import TokenRevocado
+
+if TYPE_CHECKING:
+    from auth.tokenCache import TokenCache
+
+# Segundos entre lecturas de revocaciones nuevas; 0 la desactiva (un solo proceso)
+TOKEN_REVOCACION_SYNC = float(os.getenv("TOKEN_REVOCACION_SYNC", "2"))
+TOKEN_REVOCACION_PURGA = float(os.getenv("TOKEN_REVOCACION_PURGA", "3600"))
+
+
+def _insert(dialecto: str):
+    return postgresql.insert if dialecto == "postgresql" else sqlite.insert
+
+
+def guardar(clave: str, exp: float):
+    """Registra la revocación; repetirla (doble logout) no es un error."""
+    from config.db import SessionLocal
+
+    with SessionLocal() as db:
+        db.execute(
+            _insert(db.get_bind().dialect.name)(TokenRevocado)
+            .values(clave=clave, exp=exp)
+            .on_conflict_do_nothing(index_elements=[TokenRevocado.clave])
+        )
+        db.commit()
+
+
+class Sincronizador:
+    """Lleva el último id leído para traer solo las revocaciones nuevas."""
+
+    def __init__(self):
+        self.ultimo_id = 0
+        self._ultima_purga = 0.0
+
+    def sincronizar(self, cache: "TokenCache") -> int:
+        from config.db import SessionLocal
+
+        ahora = time.time()
+        with SessionLocal() as db:
+            if ahora - self._ultima_purga >= TOKEN_REVOCACION_PURGA:
+                self._ultima_purga = ahora
+                db.execute(delete(TokenRevocado).where(TokenRevocado.exp <= ahora))
+                db.commit()
+            filas = db.execute(
+                select(TokenRevocado.id, TokenRevocado.clave, TokenRevocado.exp)
+                .where(TokenRevocado.id > self.ultimo_id, TokenRevocado.exp > ahora)
+                .order_by(TokenRevocado.id)
+            ).all()
+        for fila in filas:
+            cache.revocar(fila.clave, fila.exp)
+        if filas:
+            self.ultimo_id = filas[-1].id
+        return len(filas)
+
+
+sincronizador = Sincronizador()
+
+
+async def sincronizar_periodicamente(cache: "TokenCache", intervalo: float = TOKEN_REVOCACION_SYNC):
+    """Tarea asyncio que trae las revocaciones de los otros workers."""
+    while True:
+        try:
+            await run_in_threadpool(sincronizador.sincronizar, cache)
+        except Exception as e:
+            print("Error al sincronizar tokens revocados:", e)
+        await asyncio.sleep(intervalo)
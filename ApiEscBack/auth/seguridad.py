@@ -3,13 +3,17 @@ from datetime import datetime, timedelta
 from fastapi import HTTPException, status, Header, Depends
 from typing import Dict, Any
 from models.user import User
+from auth.tokenCache import TokenCache
+from auth import revocaciones
 from zoneinfo import ZoneInfo
+import time
 
 # Para verificar tipo en dependencias
 from fastapi import Request
 
 class Seguridad:
     secret = "tu_clave_secreta"  # ⚠️ En producción, pasalo a variable de entorno
+    token_cache = TokenCache()
 
     @classmethod
     def generar_token(cls, user: User) -> str:
@@ -48,9 +52,19 @@ class Seguridad:
                     detail="Formato de token incorrecto. Se espera 'Bearer <token>'."
                 )
 
-            payload = jwt.decode(token, cls.secret, algorithms=["HS256"])
-            return payload
+            clave = cls.token_cache.clave(token)
+            if cls.token_cache.esta_revocado(clave):
+                raise HTTPException(status_code=401, detail="Token revocado.")
 
+            payload = cls.token_cache.obtener(clave)
+            if payload is None:
+                inicio = time.perf_counter()
+                payload = jwt.decode(token, cls.secret, algorithms=["HS256"])
+                cls.token_cache.guardar(clave, payload, time.perf_counter() - inicio)
+            return dict(payload)
+
+        except HTTPException:
+            raise
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token expirado.")
         except jwt.DecodeError:
@@ -69,6 +83,23 @@ class Seguridad:
                 detail="Error interno del servidor al verificar el token."
             )
 
+    @classmethod
+    def revocar_token(cls, token: str):
+        """
+        Invalida un token antes de su vencimiento (por ejemplo, al cerrar sesión).
+        La revocación se recuerda hasta el `exp` del token: en este worker al
+        instante y en los demás cuando leen tokens_revocados (auth.revocaciones).
+        """
+        try:
+            payload = jwt.decode(
+                token, cls.secret, algorithms=["HS256"], options={"verify_exp": False}
+            )
+        except jwt.InvalidTokenError:
+            return
+        clave, exp = cls.token_cache.clave(token), float(payload.get("exp", 0))
+        cls.token_cache.revocar(clave, exp)
+        revocaciones.guardar(clave, exp)
+
 # Dependencia general
 async def obtener_usuario_desde_token(authorization: str = Header(...)) -> Dict[str, Any]:
     headers = {"authorization": authorization}
@@ -0,0 +1,84 @@
+# auth/tokenCache.py
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import hashlib
+import os
+import threading
+import time
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class TokenCache:
+    """
+    LRU acotado de tokens ya verificados, indexado por el hash del token.
+    Cada entrada vive hasta el `exp` del propio token. La lista de revocados
+    comparte la misma clave, así revocar descarta la entrada al instante.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._revocados: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.verificaciones = 0
+        self.tiempo_verificacion = 0.0
+
+    @staticmethod
+    def clave(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        ahora = time.time()
+        with self._lock:
+            payload = self._entradas.get(clave)
+            if payload is None or payload.get("exp", 0) <= ahora:
+                if payload is not None:
+                    del self._entradas[clave]
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return payload
+
+    def guardar(self, clave: str, payload: Dict[str, Any], segundos: float):
+        with self._lock:
+            self.verificaciones += 1
+            self.tiempo_verificacion += segundos
+            if clave in self._revocados:
+                return
+            self._entradas[clave] = payload
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_size:
+                self._entradas.popitem(last=False)
+
+    def revocar(self, clave: str, exp: float):
+        with self._lock:
+            self._entradas.pop(clave, None)
+            self._revocados[clave] = exp
+            ahora = time.time()
+            vencidos = [k for k, e in self._revocados.items() if e <= ahora]
+            for k in vencidos:
+                del self._revocados[k]
+
+    def esta_revocado(self, clave: str) -> bool:
+        with self._lock:
+            return clave in self._revocados
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "revocados": len(self._revocados),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / consultas if consultas else 0.0,
+                "verificaciones": self.verificaciones,
+                "verificacion_ms_promedio": (
+                    self.tiempo_verificacion * 1000 / self.verificaciones
+                    if self.verificaciones else 0.0
+                ),
+            }
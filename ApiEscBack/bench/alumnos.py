@@ -0,0 +1,109 @@
+# bench/alumnos.py
+"""
+Control de regresión de /user/alumnos: cuenta las sentencias SQL que
+emite cada modo del endpoint con pocos y con muchos alumnos, y falla si
+la cantidad crece con la cantidad de filas (un N+1 reintroducido).
+
+    DATABASE_URL=sqlite:///./bench.db python -m bench.alumnos --alumnos 300
+"""
+import argparse
+import sys
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import api_escu
+from auth.seguridad import Seguridad
+from config.init_db import init_db
+from config.db import SessionLocal, engine, async_engine
+from models.user import User
+from models.userDetail import UserDetail
+
+sentencias = 0
+
+
+def _contar(*args):
+    global sentencias
+    sentencias += 1
+
+
+def crear_usuarios(cantidad: int, tipo: str = "Alumno"):
+    """Inserta `cantidad` usuarios con su detalle y devuelve el último."""
+    sufijo = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        for i in range(cantidad):
+            u = User(username=f"bench_{tipo}_{sufijo}_{i}", password="-")
+            db.add(u)
+            db.flush()
+            db.add(UserDetail(
+                dni=int(sufijo, 16) % 10**6 * 1000 + i,
+                firstName="Bench",
+                lastName=f"{tipo} {i}",
+                type=tipo,
+                email=f"bench_{tipo}_{sufijo}_{i}@bench.local",
+                user_id=u.id
+            ))
+        db.commit()
+        return u.id
+    finally:
+        db.close()
+
+
+def medir(client: TestClient, headers: dict) -> dict:
+    """Sentencias emitidas por cada modo del endpoint."""
+    global sentencias
+    modos = {
+        "completo": "/user/alumnos",
+        "pagina": "/user/alumnos?limit=50",
+        "stream": "/user/alumnos?stream=true",
+    }
+    conteos = {}
+    for modo, url in modos.items():
+        sentencias = 0
+        r = client.get(url, headers=headers)
+        r.raise_for_status()
+        conteos[modo] = (sentencias, len(r.json()))
+    return conteos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alumnos", type=int, default=300, help="alumnos agregados entre las dos mediciones")
+    args = parser.parse_args()
+    init_db()  # la app no crea las tablas al importarse
+
+    event.listen(engine, "before_cursor_execute", _contar)
+    if async_engine is not None:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", _contar)
+
+    admin_id = crear_usuarios(1, "Admin")
+    db = SessionLocal()
+    try:
+        token = Seguridad.generar_token(db.get(User, admin_id))
+    finally:
+        db.close()
+    client = TestClient(api_escu)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    crear_usuarios(5)
+    antes = medir(client, headers)
+    crear_usuarios(args.alumnos)
+    despues = medir(client, headers)
+
+    crecieron = []
+    for modo in antes:
+        (s_antes, filas_antes), (s_despues, filas_despues) = antes[modo], despues[modo]
+        print(f"{modo:10} {filas_antes:>6} filas → {s_antes} sentencias   {filas_despues:>6} filas → {s_despues} sentencias")
+        if s_despues > s_antes:
+            crecieron.append(modo)
+
+    if crecieron:
+        print(f"❌ La cantidad de sentencias crece con las filas en: {', '.join(crecieron)}")
+        sys.exit(1)
+    print("✅ Cantidad de sentencias constante")
+
+
+if __name__ == "__main__":
+    main()
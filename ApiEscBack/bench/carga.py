@@ -0,0 +1,260 @@
+# bench/carga.py
+"""
+Prueba de carga en proceso de los endpoints más usados sobre una base
+cargada con bench.seed. Cada escenario se dispara con varios clientes
+concurrentes y se informa p50/p95/p99, throughput y sentencias SQL por
+petición. Los resultados se pueden guardar como línea base y comparar
+en corridas siguientes para detectar regresiones.
+
+    python -m bench.seed
+    python -m bench.carga --guardar              # guarda bench/baseline.json
+    python -m bench.carga --comparar             # sale con 1 si hay regresión
+
+Se considera regresión un p95 que empeora más que --tolerancia (0.25 =
+25 %) o cualquier aumento de sentencias por petición. Las latencias
+dependen de la máquina y del motor: la línea base solo se compara
+contra corridas en el mismo entorno, y no se versiona.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, func, select, update
+
+from app import api_escu
+from auth.seguridad import Seguridad
+from config.db import SessionLocal, engine, async_engine
+from models.cuota import Cuota
+from models.notificacionPago import NotificacionPago
+from models.user import User
+from services.notificaciones import recontar_no_leidas
+from bench.seed import ADMIN, CONTRASENA, PREFIJO_ALUMNO
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+
+class ContadorSQL:
+    """Sentencias emitidas por ambos motores mientras `activo` está en True."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.activo = False
+
+    def __call__(self, *args):
+        if self.activo:
+            with self._lock:
+                self.total += 1
+
+
+contador = ContadorSQL()
+event.listen(engine, "after_cursor_execute", contador)
+if async_engine is not None:
+    event.listen(async_engine.sync_engine, "after_cursor_execute", contador)
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    peticion: Callable[[int], object]       # i -> respuesta
+    peticiones: int
+    clientes: int
+    esperados: tuple = (200,)
+    preparar: Optional[Callable[[], None]] = None  # fuera del tiempo medido, antes de cada petición
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    return valores[max(int(round(p / 100 * len(valores))) - 1, 0)]
+
+
+def ejecutar(escenario: Escenario) -> dict:
+    errores = 0
+    latencias: List[float] = []
+    lock = threading.Lock()
+
+    def una(i):
+        nonlocal errores
+        inicio = time.perf_counter()
+        r = escenario.peticion(i)
+        duracion = time.perf_counter() - inicio
+        with lock:
+            latencias.append(duracion * 1000)
+            if r.status_code not in escenario.esperados:
+                errores += 1
+
+    contador.total = 0
+    if escenario.preparar:
+        # Con preparación por petición se corre de a una: la preparación no se mide ni se cuenta
+        transcurrido = 0.0
+        for i in range(escenario.peticiones):
+            escenario.preparar()
+            contador.activo = True
+            inicio = time.perf_counter()
+            una(i)
+            transcurrido += time.perf_counter() - inicio
+            contador.activo = False
+    else:
+        contador.activo = True
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=escenario.clientes) as pool:
+            list(pool.map(una, range(escenario.peticiones)))
+        transcurrido = time.perf_counter() - inicio
+        contador.activo = False
+
+    latencias.sort()
+    return {
+        "peticiones": escenario.peticiones,
+        "clientes": 1 if escenario.preparar else escenario.clientes,
+        "errores": errores,
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+        "rps": round(escenario.peticiones / transcurrido, 1),
+        "sql_por_peticion": round(contador.total / escenario.peticiones, 2),
+    }
+
+
+def escenarios(client: TestClient, peticiones: int, clientes: int, muestra: int) -> List[Escenario]:
+    db = SessionLocal()
+    try:
+        admin = db.scalar(select(User).where(User.username == ADMIN))
+        if admin is None:
+            sys.exit(f"❌ No existe '{ADMIN}': cargar primero la base con python -m bench.seed")
+        alumnos = db.scalars(
+            select(User).where(User.username.startswith(PREFIJO_ALUMNO)).order_by(User.id).limit(muestra)
+        ).all()
+        # La cuota del período en curso de cada alumno es la que reciben los pagos de prueba
+        cuota_actual = dict(db.execute(
+            select(Cuota.alumno_id, func.max(Cuota.id))
+            .where(Cuota.alumno_id.in_([a.id for a in alumnos]))
+            .group_by(Cuota.alumno_id)
+        ).tuples().all())
+        admin_h = {"Authorization": f"Bearer {Seguridad.generar_token(admin)}"}
+        alumnos = [(a.id, a.username, {"Authorization": f"Bearer {Seguridad.generar_token(a)}"}) for a in alumnos]
+    finally:
+        db.close()
+
+    rng = random.Random(7)
+    hoy = date.today()
+    ventana = {"desde": hoy.isoformat(), "hasta": (hoy + timedelta(days=7)).isoformat()}
+
+    def alumno(i):
+        return alumnos[i % len(alumnos)]
+
+    def login(i):
+        return client.post("/user/loginUser", json={"username": alumno(i)[1], "password": CONTRASENA})
+
+    def pagar(i):
+        alumno_id, _, headers = alumno(i)
+        return client.post("/pagos/nuevo", headers=headers, json={
+            "alumno_id": alumno_id, "cuota_id": cuota_actual[alumno_id],
+            "monto_pagado": 1.0, "metodo": "bench",
+        })
+
+    def mis_pagos(i):
+        return client.get("/pagos/mis", headers=alumno(i)[2])
+
+    def cuotas(i):
+        return client.get("/cuotas/")
+
+    def usuarios_filtrados(i):
+        return client.post("/user/paginated/filtered-sync", headers=admin_h, json={
+            "limit": 20, "last_seen_id": rng.randint(0, 1000), "search": rng.choice((None, "go", "ana", "bench")),
+        })
+
+    def recordatorios(i):
+        return client.post("/notificaciones/recordatorios", headers=admin_h, params=ventana)
+
+    def reiniciar_recordatorios():
+        """Deja la ventana de vencimientos sin notificar, como antes de la primera corrida."""
+        with SessionLocal() as db:
+            db.execute(
+                update(Cuota)
+                .where(Cuota.fecha_vencimiento.between(hoy, hoy + timedelta(days=7)))
+                .values(notificada=False)
+            )
+            db.execute(delete(NotificacionPago).where(NotificacionPago.tipo == "recordatorio_vencimiento"))
+            recontar_no_leidas(db)
+            db.commit()
+
+    return [
+        Escenario("login", login, peticiones, clientes),
+        Escenario("pagos_nuevo", pagar, peticiones, clientes),
+        Escenario("pagos_mis", mis_pagos, peticiones, clientes),
+        # Lista todas las cuotas: pesa mucho más que el resto, alcanza con pocas
+        Escenario("cuotas_listado", cuotas, max(peticiones // 20, 5), clientes),
+        Escenario("usuarios_filtrados", usuarios_filtrados, peticiones, clientes),
+        Escenario("recordatorios", recordatorios, max(peticiones // 40, 3), 1, preparar=reiniciar_recordatorios),
+    ]
+
+
+def comparar(actual: Dict[str, dict], base: Dict[str, dict], tolerancia: float) -> List[str]:
+    regresiones = []
+    for nombre, r in actual.items():
+        b = base.get(nombre)
+        if b is None:
+            continue
+        if r["p95_ms"] > b["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {b['p95_ms']} → {r['p95_ms']} ms")
+        if r["sql_por_peticion"] > b["sql_por_peticion"]:
+            regresiones.append(f"{nombre}: sentencias por petición {b['sql_por_peticion']} → {r['sql_por_peticion']}")
+        if r["errores"] > b["errores"]:
+            regresiones.append(f"{nombre}: errores {b['errores']} → {r['errores']}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=400, help="peticiones por escenario")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--alumnos", type=int, default=500, help="alumnos distintos que usan los escenarios")
+    parser.add_argument("--solo", nargs="*", help="nombres de escenarios a correr")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--guardar", action="store_true", help="guardar los resultados como línea base")
+    parser.add_argument("--comparar", action="store_true", help="comparar contra la línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    client = TestClient(api_escu)
+    resultados: Dict[str, dict] = {}
+    print(f"{'escenario':<20}{'pet':>6}{'cli':>5}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}{'sql/pet':>9}")
+    for escenario in escenarios(client, args.peticiones, args.clientes, args.alumnos):
+        if args.solo and escenario.nombre not in args.solo:
+            continue
+        r = resultados[escenario.nombre] = ejecutar(escenario)
+        print(
+            f"{escenario.nombre:<20}{r['peticiones']:>6}{r['clientes']:>5}{r['errores']:>5}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['rps']:>9}{r['sql_por_peticion']:>9}"
+        )
+
+    if args.guardar:
+        datos = {"motor": engine.dialect.name, "escenarios": resultados}
+        args.baseline.write_text(json.dumps(datos, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"✅ Línea base guardada en {args.baseline}")
+
+    if args.comparar:
+        if not args.baseline.exists():
+            sys.exit(f"❌ No hay línea base en {args.baseline}: correr antes con --guardar")
+        base = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if base.get("motor") != engine.dialect.name:
+            print(f"⚠️  La línea base es de {base.get('motor')} y esta corrida de {engine.dialect.name}")
+        regresiones = comparar(resultados, base["escenarios"], args.tolerancia)
+        for linea in regresiones:
+            print(f"❌ {linea}")
+        if regresiones:
+            sys.exit(1)
+        print("✅ Sin regresiones respecto de la línea base")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench/pagos.py
+"""
+Dispara N pagos simultáneos contra una misma cuota y verifica que el
+saldo final sea exacto (ningún pago perdido) y cuánto throughput se logra.
+
+    DATABASE_URL=postgresql://... python -m bench.pagos --pagos 500 --clientes 32
+
+Con SQLite las escrituras se serializan en el archivo: sirve para validar
+el saldo, no para medir contención de filas.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+import argparse
+import statistics
+import sys
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import api_escu
+from auth.seguridad import Seguridad
+from config.init_db import init_db
+from config.db import SessionLocal
+from models.cuota import Cuota
+from models.pago import Pago
+from models.user import User
+from models.userDetail import UserDetail
+
+
+def preparar(pagos: int, monto: Decimal):
+    """Crea un admin, un alumno y una cuota que queda saldada con exactamente `pagos` pagos."""
+    sufijo = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        ids = []
+        for i, tipo in enumerate(("Admin", "Alumno")):
+            u = User(username=f"bench_{tipo}_{sufijo}", password="-")
+            db.add(u)
+            db.flush()
+            db.add(UserDetail(
+                dni=int(sufijo, 16) % 10**8 * 10 + i,
+                firstName="Bench",
+                lastName=tipo,
+                type=tipo,
+                email=f"bench_{tipo}_{sufijo}@bench.local",
+                user_id=u.id
+            ))
+            ids.append(u.id)
+        total = monto * pagos
+        cuota = Cuota(
+            alumno_id=ids[1],
+            periodo=f"B{sufijo[:6]}",
+            fecha_vencimiento=date.today(),
+            monto_base=total,
+            monto_a_pagar=total,
+        )
+        db.add(cuota)
+        db.commit()
+        admin = db.get(User, ids[0])
+        return Seguridad.generar_token(admin), ids[1], cuota.id
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pagos", type=int, default=200)
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--monto", type=Decimal, default=Decimal("10.00"))
+    args = parser.parse_args()
+    init_db()  # la app no crea las tablas al importarse
+
+    token, alumno_id, cuota_id = preparar(args.pagos, args.monto)
+    client = TestClient(api_escu)
+    headers = {"Authorization": f"Bearer {token}"}
+    cuerpo = {"alumno_id": alumno_id, "cuota_id": cuota_id, "monto_pagado": float(args.monto), "metodo": "bench"}
+
+    def pagar(_):
+        inicio = time.perf_counter()
+        r = client.post("/pagos/nuevo", json=cuerpo, headers=headers)
+        return r.status_code, time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clientes) as pool:
+        resultados = list(pool.map(pagar, range(args.pagos)))
+    transcurrido = time.perf_counter() - inicio
+
+    ok = sum(1 for status, _ in resultados if status == 200)
+    latencias = sorted(t * 1000 for _, t in resultados)
+    db = SessionLocal()
+    try:
+        cuota = db.get(Cuota, cuota_id)
+        pagos_guardados = db.query(Pago).filter(Pago.cuota_id == cuota_id).count()
+        esperado = args.monto * ok
+        correcto = (
+            Decimal(cuota.monto_pagado) == esperado
+            and pagos_guardados == ok
+            and (ok < args.pagos or cuota.estado == "pagada")
+        )
+
+        print(f"pagos enviados     {args.pagos} con {args.clientes} clientes")
+        print(f"aceptados          {ok}  (errores: {args.pagos - ok})")
+        print(f"throughput         {ok / transcurrido:.1f} pagos/s")
+        print(f"latencia p50/p95   {statistics.median(latencias):.1f} / {latencias[int(len(latencias) * 0.95) - 1]:.1f} ms")
+        print(f"monto pagado       {cuota.monto_pagado} (esperado {esperado}), estado {cuota.estado}")
+        print(f"filas en pagos     {pagos_guardados}")
+        print("✅ saldo consistente" if correcto else "❌ se perdieron actualizaciones")
+    finally:
+        db.close()
+    sys.exit(0 if correcto else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench/passwords.py
+"""
+Mide logins/segundo por núcleo para cada configuración de costo del KDF.
+
+    python -m bench.passwords
+    python -m bench.passwords --segundos 5 --hilos 4
+
+Cada login es una verificación completa del hash, que es lo que domina
+el costo de /user/loginUser.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import time
+
+from auth.passwords import HasherArgon2, HasherBcrypt
+
+CONFIGURACIONES = [
+    ("argon2 t=1 m=19MiB", lambda: HasherArgon2(time_cost=1, memory_cost=19456, parallelism=1)),
+    ("argon2 t=2 m=19MiB", lambda: HasherArgon2(time_cost=2, memory_cost=19456, parallelism=1)),
+    ("argon2 t=3 m=64MiB", lambda: HasherArgon2(time_cost=3, memory_cost=65536, parallelism=1)),
+    ("bcrypt rounds=10", lambda: HasherBcrypt(rounds=10)),
+    ("bcrypt rounds=12", lambda: HasherBcrypt(rounds=12)),
+]
+
+
+def _verificaciones(hasher, almacenado: str, segundos: float) -> int:
+    fin = time.perf_counter() + segundos
+    n = 0
+    while time.perf_counter() < fin:
+        hasher.verificar(almacenado, "contraseña-de-prueba")
+        n += 1
+    return n
+
+
+def medir(hasher, segundos: float, hilos: int):
+    almacenado = hasher.hashear("contraseña-de-prueba")
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        total = sum(pool.map(lambda _: _verificaciones(hasher, almacenado, segundos), range(hilos)))
+    transcurrido = time.perf_counter() - inicio
+    return total / transcurrido, transcurrido * 1000 * hilos / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segundos", type=float, default=2.0)
+    parser.add_argument("--hilos", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"{'configuración':<22}{'1 hilo/s':>10}{'ms/login':>10}{f'{args.hilos} hilos/s':>13}{'por núcleo':>12}")
+    for nombre, crear in CONFIGURACIONES:
+        hasher = crear()
+        por_segundo, ms = medir(hasher, args.segundos, 1)
+        paralelo, _ = medir(hasher, args.segundos, args.hilos)
+        print(f"{nombre:<22}{por_segundo:>10.1f}{ms:>10.1f}{paralelo:>13.1f}{paralelo / args.hilos:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# bench/seed.py
+"""
+Carga una base local con volúmenes realistas para bench.carga: alumnos
+con su detalle, una cuota por período y varios pagos por cuota, más el
+admin `bench_admin`. Los datos salen de una semilla fija, así que dos
+bases cargadas con los mismos parámetros son comparables.
+
+    DATABASE_URL=postgresql://.../api_escuela_bench python -m bench.seed
+    DATABASE_URL=sqlite:///./bench.db python -m bench.seed --alumnos 500
+
+Usar una base dedicada: si `bench_admin` ya existe no se carga nada.
+Todos los usuarios tienen la contraseña `bench1234`.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+import argparse
+import random
+import sys
+import time
+
+from sqlalchemy import insert, select
+
+from auth.passwords import hashear_password
+from config.db import SessionLocal
+from config.init_db import init_db
+from models.cuota import Cuota
+from models.pago import Pago
+from models.tarifa import Tarifa
+from models.user import User
+from models.userDetail import UserDetail
+from services.estadoCuenta import recalcular_todos
+
+ADMIN = "bench_admin"
+PREFIJO_ALUMNO = "bench_alumno_"
+CONTRASENA = "bench1234"
+MONTO_CUOTA = Decimal("15000.00")
+METODOS = ("efectivo", "transferencia", "tarjeta")
+LOTE = 5000
+
+
+def periodos(cantidad: int, hoy: date):
+    """Los últimos `cantidad` períodos 'YYYY-MM', el más reciente al final."""
+    anio, mes = hoy.year, hoy.month
+    salida = []
+    for _ in range(cantidad):
+        salida.append((anio, mes))
+        anio, mes = (anio, mes - 1) if mes > 1 else (anio - 1, 12)
+    return [f"{a:04d}-{m:02d}" for a, m in reversed(salida)]
+
+
+def vencimiento(periodo: str, ultimo: bool, hoy: date) -> date:
+    # El período en curso vence en pocos días para que /notificaciones/recordatorios tenga trabajo
+    if ultimo:
+        return hoy + timedelta(days=3)
+    anio, mes = map(int, periodo.split("-"))
+    return date(anio, mes, 10)
+
+
+def insertar(db, modelo, filas, devolver_ids=False):
+    """INSERT en lotes de LOTE filas; con `devolver_ids` devuelve los ids en el orden de `filas`."""
+    ids = []
+    for i in range(0, len(filas), LOTE):
+        lote = filas[i:i + LOTE]
+        if devolver_ids:
+            ids.extend(db.scalars(insert(modelo).returning(modelo.id, sort_by_parameter_order=True), lote).all())
+        else:
+            db.execute(insert(modelo), lote)
+    return ids
+
+
+def cargar(alumnos: int, cantidad_periodos: int, pagos: int, semilla: int) -> dict:
+    rng = random.Random(semilla)
+    hoy = date.today()
+    lista_periodos = periodos(cantidad_periodos, hoy)
+    # Pagos promedio por cuota; las del período en curso quedan sin pagar
+    promedio = pagos / max(alumnos * (cantidad_periodos - 1), 1)
+    init_db()
+    clave = hashear_password(CONTRASENA)  # un solo hash: el KDF es lento a propósito
+
+    db = SessionLocal()
+    try:
+        if db.scalar(select(User.id).where(User.username == ADMIN)):
+            return {}
+
+        usuarios = [{"username": ADMIN, "password": clave}] + [
+            {"username": f"{PREFIJO_ALUMNO}{i}", "password": clave} for i in range(alumnos)
+        ]
+        ids = insertar(db, User, usuarios, devolver_ids=True)
+        admin_id, alumno_ids = ids[0], ids[1:]
+
+        insertar(db, UserDetail, [{
+            "dni": 90_000_000 + i,
+            "firstName": rng.choice(("Ana", "Juan", "Sofía", "Mateo", "Lucía", "Tomás", "Valentina", "Bruno")),
+            "lastName": rng.choice(("Gómez", "Pérez", "Fernández", "López", "Díaz", "Martínez", "Romero")),
+            "type": "Admin" if i == 0 else "Alumno",
+            "email": f"{u['username']}@bench.local",
+            "anio_lectivo": None if i == 0 else rng.randint(1, 6),
+            "estado_academico": None if i == 0 else "regular",
+            "user_id": user_id,
+        } for i, (u, user_id) in enumerate(zip(usuarios, ids))])
+
+        if not db.scalar(select(Tarifa.id).limit(1)):
+            db.add(Tarifa(MONTO_CUOTA, date(hoy.year - 2, 1, 1), creado_por=admin_id))
+
+        # Cuotas y pagos se arman juntos para que monto_pagado, saldo y estado sean consistentes
+        cuotas, pagos_por_cuota = [], []
+        for alumno_id in alumno_ids:
+            for n, periodo in enumerate(lista_periodos):
+                ultimo = n == len(lista_periodos) - 1
+                vence = vencimiento(periodo, ultimo, hoy)
+                cantidad = 0 if ultimo else int(promedio) + (rng.random() < promedio % 1)
+                parte = (MONTO_CUOTA / max(cantidad, 1)).quantize(Decimal("0.01"))
+                montos = [parte] * cantidad
+                if montos:
+                    montos[-1] = MONTO_CUOTA - parte * (cantidad - 1)
+                    if rng.random() < 0.1:  # uno de cada diez queda a medio pagar
+                        montos.pop()
+                pagado = sum(montos, Decimal("0"))
+                saldo = MONTO_CUOTA - pagado
+                estado = (
+                    "pagada" if saldo <= 0
+                    else "vencida" if vence < hoy
+                    else "parcial" if pagado > 0
+                    else "pendiente"
+                )
+                cuotas.append({
+                    "alumno_id": alumno_id,
+                    "periodo": periodo,
+                    "fecha_vencimiento": vence,
+                    "monto_base": MONTO_CUOTA,
+                    "ajuste_anterior": Decimal("0"),
+                    "monto_a_pagar": MONTO_CUOTA,
+                    "monto_pagado": pagado,
+                    "saldo_pendiente": saldo,
+                    "estado": estado,
+                    "notificada": False,
+                    "recargo_mora": Decimal("0"),
+                })
+                pagos_por_cuota.append((vence, montos))
+
+        cuota_ids = insertar(db, Cuota, cuotas, devolver_ids=True)
+        filas_pago = []
+        for cuota, cuota_id, (vence, montos) in zip(cuotas, cuota_ids, pagos_por_cuota):
+            for monto in montos:
+                filas_pago.append({
+                    "alumno_id": cuota["alumno_id"],
+                    "cuota_id": cuota_id,
+                    "monto_pagado": monto,
+                    "metodo": rng.choice(METODOS),
+                    "comprobante": None,
+                    "fecha_pago": vence - timedelta(days=rng.randint(0, 20), minutes=rng.randint(0, 1439)),
+                    "registrado_por": cuota["alumno_id"] if rng.random() < 0.7 else admin_id,
+                })
+        insertar(db, Pago, filas_pago)
+        db.commit()
+    finally:
+        db.close()
+
+    recalcular_todos()
+    return {"alumnos": alumnos, "cuotas": len(cuotas), "pagos": len(filas_pago)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alumnos", type=int, default=5000)
+    parser.add_argument("--periodos", type=int, default=12)
+    parser.add_argument("--pagos", type=int, default=200_000, help="pagos aproximados en total")
+    parser.add_argument("--semilla", type=int, default=20)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    cargados = cargar(args.alumnos, args.periodos, args.pagos, args.semilla)
+    if not cargados:
+        print(f"ℹ️  '{ADMIN}' ya existe: la base ya tiene datos de benchmark.")
+        sys.exit(0)
+    print(
+        f"✅ Cargados {cargados['alumnos']} alumnos, {cargados['cuotas']} cuotas y "
+        f"{cargados['pagos']} pagos en {time.perf_counter() - inicio:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
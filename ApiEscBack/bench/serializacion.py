@@ -0,0 +1,115 @@
+# bench/serializacion.py
+"""
+Costo de serializar 1000 filas de un listado, antes y después del
+camino rápido de schemas.adaptadores. Las filas son Row reales de
+SQLAlchemy leídas de una SQLite en memoria, no toca la base de la app.
+
+    python -m bench.serializacion --filas 1000 --repeticiones 50
+
+  dicts + response_model   un dict por fila armado a mano y luego
+                           validado y escrito por FastAPI (camino anterior)
+  dicts + json estándar    jsonable_encoder + json.dumps (rutas sin
+                           response_model antes de RespuestaJSON)
+  dumps (orjson)           los mismos dicts con schemas.adaptadores.dumps
+  filas + TypeAdapter      las Row emparejadas con sus columnas y
+                           validadas con json_lista (camino nuevo)
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, insert, select
+
+from schemas.adaptadores import LISTA_NOTIFICACIONES, dumps, json_lista, orjson
+
+
+def filas_notificaciones(cantidad: int):
+    metadata = MetaData()
+    tabla = Table(
+        "notificaciones", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("alumno_id", Integer),
+        Column("cuota_id", Integer),
+        Column("tipo", String),
+        Column("destinatario", String),
+        Column("mensaje", String),
+        Column("fecha_envio", DateTime),
+        Column("alumno_nombre", String),
+        Column("periodo", String),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    ahora = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(tabla), [{
+            "alumno_id": i % 500,
+            "cuota_id": i,
+            "tipo": "pago_registrado",
+            "destinatario": "alumno" if i % 2 else "admin",
+            "mensaje": f"Se registró un pago de ${i * 10:,.2f} para tu cuota del período 2025-{i % 12 + 1:02d}.",
+            "fecha_envio": ahora - timedelta(minutes=i),
+            "alumno_nombre": f"Alumno {i % 500}",
+            "periodo": f"2025-{i % 12 + 1:02d}",
+        } for i in range(cantidad)])
+    with engine.connect() as conn:
+        return conn.execute(select(tabla)).all()
+
+
+def a_dicts(filas):
+    # Lo que hacía listar_notificaciones con cada fila antes de devolverla
+    return [{
+        "id": f.id,
+        "alumno_id": f.alumno_id,
+        "cuota_id": f.cuota_id,
+        "tipo": f.tipo,
+        "destinatario": f.destinatario,
+        "mensaje": f.mensaje,
+        "fecha_envio": f.fecha_envio,
+        "alumno_nombre": f.alumno_nombre,
+        "periodo": f.periodo,
+    } for f in filas]
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Milisegundos por llamada, el mejor de `repeticiones`."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    filas = filas_notificaciones(args.filas)
+    adaptador = LISTA_NOTIFICACIONES
+
+    casos = {
+        "dicts + response_model": lambda: adaptador.dump_json(
+            adaptador.validate_python(a_dicts(filas), from_attributes=True)
+        ),
+        "dicts + json estándar": lambda: json.dumps(jsonable_encoder(a_dicts(filas))).encode("utf-8"),
+        f"dumps ({'orjson' if orjson else 'json'})": lambda: dumps(a_dicts(filas)),
+        "filas + TypeAdapter": lambda: json_lista(adaptador, filas),
+    }
+
+    # Mismo contenido en todos los caminos con modelo
+    assert json.loads(casos["filas + TypeAdapter"]()) == json.loads(casos["dicts + response_model"]())
+
+    base = None
+    print(f"{'camino':<26}{'ms por ' + str(args.filas):>14}{'ms por 1000':>14}{'vs anterior':>13}")
+    for nombre, funcion in casos.items():
+        ms = medir(funcion, args.repeticiones)
+        base = base or ms
+        print(f"{nombre:<26}{ms:>14.2f}{ms * 1000 / args.filas:>14.2f}{base / ms:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
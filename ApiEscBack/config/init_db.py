@@ -1,4 +1,3 @@
-from config.db import engine, Base
 from models.user import User
 from models.userDetail import UserDetail
 from models.tarifa import Tarifa
@@ -6,23 +5,26 @@ from models.cuota import Cuota
 from models.pago import Pago
 from models.pagoEliminado import PagoEliminado
 from models.notificacionPago import NotificacionPago
+from models.contadorNotificaciones import ContadorNotificaciones
+from models.idempotencia import ClaveIdempotencia
+from models.outbox import EventoOutbox
+from models.estadoCuenta import EstadoCuenta
+from models.ejecucionTarea import EjecucionTarea
+from models.tokenRevocado import TokenRevocado
 
 
 def init_db():
     """
-    Crea todas las tablas de la base de datos si no existen.
-    Se ejecuta automáticamente al iniciar FastAPI (desde main.py).
+    Crea las tablas y aplica las migraciones pendientes (config.migraciones).
+    La usan scripts y pruebas locales: la app solo verifica la versión al
+    arrancar, y en producción se corre python -m config.migraciones una
+    vez por deploy.
     """
+    from config.migraciones import migrar
+
     try:
-        Base.metadata.create_all(bind=engine, tables=[
-            User.__table__,
-            UserDetail.__table__,
-            Tarifa.__table__,
-            Cuota.__table__,
-            Pago.__table__,
-            PagoEliminado.__table__,
-            NotificacionPago.__table__,
-        ])
+        for nombre, error in migrar().items():
+            print(f"⚠️ No se pudo crear {nombre}: {error}")
         print("✅ Base de datos inicializada correctamente.")
     except Exception as e:
         print(f"⚠️ Error al inicializar la base de datos: {e}")
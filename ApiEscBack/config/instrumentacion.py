@@ -0,0 +1,219 @@
+# config/instrumentacion.py
+"""
+Métricas por ruta: tiempo total, tiempo en la base, sentencias SQL y filas.
+
+El middleware abre un acumulador por petición en una ContextVar; los
+eventos before/after_cursor_execute del motor suman ahí cada sentencia.
+Al terminar la respuesta el acumulador se vuelca en los totales por ruta
+(plantilla, no URL concreta) que GET /metrics expone en formato Prometheus.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+# Sentencias más lentas que esto (ms) se registran en el log "sql.lento"; 0 lo desactiva
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger_lento = logging.getLogger("sql.lento")
+
+
+class MedicionPeticion:
+    __slots__ = ("ruta", "sentencias", "segundos_db", "filas")
+
+    def __init__(self):
+        self.ruta = "sin_ruta"
+        self.sentencias = 0
+        self.segundos_db = 0.0
+        self.filas = 0
+
+
+_medicion: ContextVar[Optional[MedicionPeticion]] = ContextVar("medicion_peticion", default=None)
+
+
+class TotalesRuta:
+    __slots__ = ("peticiones", "buckets", "segundos", "segundos_db", "sentencias", "filas", "por_status")
+
+    def __init__(self):
+        self.peticiones = 0
+        self.buckets = [0] * len(BUCKETS_SEGUNDOS)
+        self.segundos = 0.0
+        self.segundos_db = 0.0
+        self.sentencias = 0
+        self.filas = 0
+        self.por_status: Dict[int, int] = {}
+
+
+class RegistroMetricas:
+    """Totales acumulados desde que arrancó el proceso, por (método, ruta)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rutas: Dict[Tuple[str, str], TotalesRuta] = {}
+        self.sentencias = 0
+        self.segundos_db = 0.0
+        self.lentas = 0
+
+    def registrar_sentencia(self, segundos: float):
+        with self._lock:
+            self.sentencias += 1
+            self.segundos_db += segundos
+
+    def registrar_lenta(self):
+        with self._lock:
+            self.lentas += 1
+
+    def registrar_peticion(self, metodo: str, medicion: MedicionPeticion, status: int, segundos: float):
+        with self._lock:
+            totales = self._rutas.get((metodo, medicion.ruta))
+            if totales is None:
+                totales = self._rutas[(metodo, medicion.ruta)] = TotalesRuta()
+            totales.peticiones += 1
+            i = bisect_left(BUCKETS_SEGUNDOS, segundos)
+            if i < len(BUCKETS_SEGUNDOS):
+                totales.buckets[i] += 1
+            totales.segundos += segundos
+            totales.segundos_db += medicion.segundos_db
+            totales.sentencias += medicion.sentencias
+            totales.filas += medicion.filas
+            totales.por_status[status] = totales.por_status.get(status, 0) + 1
+
+    def texto_prometheus(self, extras: Optional[Dict[str, float]] = None) -> str:
+        with self._lock:
+            rutas = sorted(self._rutas.items())
+            lineas: List[str] = []
+
+            def serie(nombre, tipo, ayuda, valores):
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                lineas.extend(valores)
+
+            def etiquetas(metodo, ruta, **otras):
+                pares = {"method": metodo, "route": ruta, **otras}
+                return "{" + ",".join(f'{k}="{v}"' for k, v in pares.items()) + "}"
+
+            serie("apiesc_http_requests_total", "counter", "Peticiones atendidas por ruta y status.", [
+                f"apiesc_http_requests_total{etiquetas(m, r, status=str(s))} {n}"
+                for (m, r), t in rutas for s, n in sorted(t.por_status.items())
+            ])
+
+            histograma = []
+            for (m, r), t in rutas:
+                acumulado = 0
+                for limite, n in zip(BUCKETS_SEGUNDOS, t.buckets):
+                    acumulado += n
+                    histograma.append(f"apiesc_http_request_duration_seconds_bucket{etiquetas(m, r, le=str(limite))} {acumulado}")
+                histograma.append(f"apiesc_http_request_duration_seconds_bucket{etiquetas(m, r, le='+Inf')} {t.peticiones}")
+                histograma.append(f"apiesc_http_request_duration_seconds_sum{etiquetas(m, r)} {t.segundos:.6f}")
+                histograma.append(f"apiesc_http_request_duration_seconds_count{etiquetas(m, r)} {t.peticiones}")
+            serie("apiesc_http_request_duration_seconds", "histogram", "Tiempo total de la petición.", histograma)
+
+            serie("apiesc_http_request_db_seconds_total", "counter", "Tiempo en la base por ruta.", [
+                f"apiesc_http_request_db_seconds_total{etiquetas(m, r)} {t.segundos_db:.6f}" for (m, r), t in rutas
+            ])
+            serie("apiesc_http_request_sql_statements_total", "counter", "Sentencias SQL emitidas por ruta.", [
+                f"apiesc_http_request_sql_statements_total{etiquetas(m, r)} {t.sentencias}" for (m, r), t in rutas
+            ])
+            serie("apiesc_http_request_sql_rows_total", "counter",
+                  "Filas informadas por el driver (rowcount) por ruta.", [
+                f"apiesc_http_request_sql_rows_total{etiquetas(m, r)} {t.filas}" for (m, r), t in rutas
+            ])
+
+            serie("apiesc_sql_statements_total", "counter", "Sentencias SQL totales, incluidas las de tareas en segundo plano.",
+                  [f"apiesc_sql_statements_total {self.sentencias}"])
+            serie("apiesc_sql_seconds_total", "counter", "Tiempo total en la base.",
+                  [f"apiesc_sql_seconds_total {self.segundos_db:.6f}"])
+            serie("apiesc_sql_slow_statements_total", "counter", "Sentencias por encima de SLOW_QUERY_MS.",
+                  [f"apiesc_sql_slow_statements_total {self.lentas}"])
+
+        for nombre, valor in (extras or {}).items():
+            lineas.append(f"# TYPE {nombre} gauge")
+            lineas.append(f"{nombre} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+
+def instrumentar_consultas(engine):
+    """Engancha los eventos de ejecución del motor (para el async, pasar async_engine.sync_engine)."""
+
+    # El inicio se guarda en el contexto de ejecución: si la sentencia
+    # falla no hay after_cursor_execute y no queda nada pendiente
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._inicio_medicion = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_inicio_medicion", None)
+        if inicio is None:
+            return
+        segundos = time.perf_counter() - inicio
+        registro_metricas.registrar_sentencia(segundos)
+
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.sentencias += 1
+            medicion.segundos_db += segundos
+            medicion.filas += max(cursor.rowcount or 0, 0)
+
+        if SLOW_QUERY_MS and segundos * 1000 >= SLOW_QUERY_MS:
+            registro_metricas.registrar_lenta()
+            logger_lento.warning(
+                "%.1f ms [%s] %s", segundos * 1000,
+                medicion.ruta if medicion else "segundo plano",
+                " ".join(statement.split())[:500]
+            )
+
+
+class MiddlewareInstrumentacion:
+    """
+    Middleware ASGI puro: mide hasta el último fragmento del cuerpo, así
+    que las respuestas en streaming incluyen el tiempo de generación.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        medicion = MedicionPeticion()
+        medicion.ruta = scope["path"]  # hasta resolver la plantilla, para el log de lentas
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        status = 500
+        registrada = False
+
+        def registrar():
+            nonlocal registrada
+            if registrada:
+                return
+            registrada = True
+            # FastAPI deja la ruta resuelta en el scope; sin ruta (404) se agrupa aparte
+            ruta = scope.get("route")
+            medicion.ruta = getattr(ruta, "path", None) or "sin_ruta"
+            registro_metricas.registrar_peticion(scope["method"], medicion, status, time.perf_counter() - inicio)
+
+        async def enviar(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+            await send(mensaje)
+            if mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                registrar()
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            registrar()
+            _medicion.reset(token)
@@ -0,0 +1,425 @@
+# config/migraciones.py
+"""
+Migraciones versionadas del esquema y verificación con EXPLAIN de que las
+consultas más usadas aprovechan los índices.
+
+Cada migración aplicada queda registrada en la tabla schema_version. Se
+corren una vez por deploy, antes de levantar los workers; al arrancar,
+cada worker solo lee la versión (ver `preparar_esquema`).
+
+    python -m config.migraciones            # aplica las migraciones pendientes
+    python -m config.migraciones todas      # vuelve a correr todos los pasos (son idempotentes)
+    python -m config.migraciones explain    # falla si alguna consulta no usa índice
+    python -m config.migraciones arrastrados [--aplicar]
+                                            # cuotas viejas con el saldo posiblemente contado dos veces
+"""
+from datetime import date, datetime
+from typing import Callable, Dict, List, NamedTuple
+import os
+import sys
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, func, inspect, insert, literal, select, text
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config.db import Base, engine
+from models.user import User
+from models.userDetail import UserDetail
+from models.tarifa import Tarifa
+from models.cuota import Cuota
+from models.pago import Pago
+from models.pagoEliminado import PagoEliminado
+from models.notificacionPago import NotificacionPago
+from models.contadorNotificaciones import ContadorNotificaciones
+from models.idempotencia import ClaveIdempotencia
+from models.outbox import EventoOutbox
+from models.estadoCuenta import EstadoCuenta
+from models.ejecucionTarea import EjecucionTarea
+from models.tokenRevocado import TokenRevocado
+
+MODELOS = [
+    User, UserDetail, Tarifa, Cuota, Pago, PagoEliminado, NotificacionPago,
+    ContadorNotificaciones, ClaveIdempotencia, EventoOutbox, EstadoCuenta, EjecucionTarea,
+    TokenRevocado,
+]
+
+
+def crear_indices(bind=engine):
+    """
+    Crea los índices declarados en los modelos que todavía no existan.
+    Cada índice va en su propia transacción: si uno falla (por ejemplo,
+    cuotas duplicadas que impiden el índice único) los demás se crean igual.
+    """
+    errores = {}
+    for modelo in MODELOS:
+        for indice in modelo.__table__.indexes:
+            try:
+                with bind.begin() as conn:
+                    indice.create(bind=conn, checkfirst=True)
+            except Exception as e:
+                errores[indice.name] = str(e).splitlines()[0]
+    return errores
+
+
+# Índices para el buscador de usuarios (solo PostgreSQL, requieren pg_trgm)
+INDICES_BUSQUEDA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_usuarios_username_trgm ON usuarios USING gin (username gin_trgm_ops)",
+    'CREATE INDEX IF NOT EXISTS ix_userdetail_email_trgm ON "userDetail" USING gin (email gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_userdetail_firstname_trgm ON "userDetail" USING gin ("firstName" gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_userdetail_lastname_trgm ON "userDetail" USING gin ("lastName" gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_userdetail_dni_texto ON "userDetail" ((CAST(dni AS VARCHAR)) varchar_pattern_ops)',
+]
+
+
+def crear_indices_busqueda(bind=engine):
+    """Crea la extensión pg_trgm y los índices GIN del buscador. No hace nada fuera de PostgreSQL."""
+    if bind.dialect.name != "postgresql":
+        return {}
+    errores = {}
+    for sentencia in INDICES_BUSQUEDA:
+        try:
+            with bind.begin() as conn:
+                conn.execute(text(sentencia))
+        except Exception as e:
+            errores[sentencia.split(" ON ")[0]] = str(e).splitlines()[0]
+    return errores
+
+
+def ampliar_columna_password(bind=engine):
+    """Los hashes argon2 no entran en el VARCHAR(100) original. SQLite no valida largos."""
+    if bind.dialect.name != "postgresql":
+        return {}
+    try:
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE usuarios ALTER COLUMN password TYPE VARCHAR(255)"))
+    except Exception as e:
+        return {"usuarios.password": str(e).splitlines()[0]}
+    return {}
+
+
+# Columnas agregadas a tablas existentes después de su creación
+COLUMNAS_NUEVAS = [
+    Cuota.__table__.c.recargo_mora,
+    NotificacionPago.__table__.c.leida,
+    NotificacionPago.__table__.c.leida_en,
+]
+
+
+def agregar_columnas(bind=engine):
+    """ALTER TABLE ... ADD COLUMN para las columnas de COLUMNAS_NUEVAS que falten."""
+    errores = {}
+    for columna in COLUMNAS_NUEVAS:
+        tabla = columna.table.name
+        if columna.name in {c["name"] for c in inspect(bind).get_columns(tabla)}:
+            continue
+        ddl = f'ALTER TABLE "{tabla}" ADD COLUMN "{columna.name}" {columna.type.compile(bind.dialect)}'
+        if columna.default is not None and columna.default.is_scalar:
+            valor = literal(columna.default.arg).compile(
+                dialect=bind.dialect, compile_kwargs={"literal_binds": True}
+            )
+            ddl += f" DEFAULT {valor}"
+        try:
+            with bind.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception as e:
+            errores[f"{tabla}.{columna.name}"] = str(e).splitlines()[0]
+    return errores
+
+
+# ----- Versiones -----
+
+# Aplicar las migraciones pendientes al arrancar (cómodo en desarrollo, con un solo proceso)
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "0").lower() in ("1", "true", "si")
+# Leer la versión al arrancar; con 0 el worker no toca la base hasta la primera petición
+DB_VERIFICAR_ESQUEMA = os.getenv("DB_VERIFICAR_ESQUEMA", "1").lower() in ("1", "true", "si")
+# Clave del advisory lock de PostgreSQL que serializa dos migraciones simultáneas
+LOCK_MIGRACIONES = 72_022
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String(120), nullable=False),
+    Column("aplicada", DateTime, nullable=False),
+)
+
+
+def crear_tablas(bind=engine):
+    Base.metadata.create_all(bind=bind, tables=[m.__table__ for m in MODELOS])
+    return {}
+
+
+def _estado_cuenta_inicial(bind=engine):
+    # Completa estado_cuenta para las cuotas que existían antes de la tabla
+    from services.estadoCuenta import recalcular_todos
+    recalcular_todos(bind)
+    return {}
+
+
+def _bandejas_notificaciones(bind=engine):
+    # Tabla del contador, columnas leida/leida_en e índices de las bandejas, y el primer conteo
+    from sqlalchemy.orm import Session
+    from services.notificaciones import recontar_no_leidas
+
+    errores = crear_tablas(bind)
+    errores.update(agregar_columnas(bind))
+    errores.update(crear_indices(bind))
+    with Session(bind) as db:
+        recontar_no_leidas(db)
+        db.commit()
+    return errores
+
+
+def _sin_cambios(bind=engine):
+    return {}
+
+
+def _consulta_arrastrados():
+    """
+    Cuotas abiertas cuyo saldo parece haberse sumado ya al ajuste_anterior
+    del período siguiente (generadas antes de que existiera el estado
+    arrastrada). Es una suposición: ajuste_anterior también se usaba para
+    ajustes a mano, así que cada una hay que revisarla antes de cerrarla.
+    """
+    from sqlalchemy.orm import aliased
+
+    siguiente, posterior = aliased(Cuota), aliased(Cuota)
+    periodo_siguiente = (
+        select(func.min(posterior.periodo))
+        .where(posterior.alumno_id == Cuota.alumno_id, posterior.periodo > Cuota.periodo)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Cuota.id, Cuota.alumno_id, Cuota.periodo, Cuota.saldo_pendiente,
+            siguiente.periodo.label("periodo_siguiente"), siguiente.ajuste_anterior,
+        )
+        .join(siguiente, (siguiente.alumno_id == Cuota.alumno_id) & (siguiente.periodo == periodo_siguiente))
+        .where(
+            Cuota.estado.in_(["pendiente", "parcial", "vencida"]),
+            Cuota.saldo_pendiente > 0,
+            siguiente.ajuste_anterior >= Cuota.saldo_pendiente,
+        )
+        .order_by(Cuota.alumno_id, Cuota.periodo)
+    )
+
+
+def revisar_saldos_arrastrados(bind=engine, aplicar: bool = False) -> list:
+    """
+    Lista las cuotas que `_consulta_arrastrados` marca como posiblemente
+    contadas dos veces. Solo con `aplicar=True` las pasa a arrastrada (saldo
+    0) y recalcula estado_cuenta. No corre en ninguna migración: se pide a
+    mano con `python -m config.migraciones arrastrados`.
+    """
+    from sqlalchemy import update
+    from services.estadoCuenta import ARRASTRADA, recalcular
+
+    with bind.begin() as conn:
+        filas = conn.execute(_consulta_arrastrados()).all()
+        if aplicar and filas:
+            conn.execute(
+                update(Cuota)
+                .where(Cuota.id.in_([f.id for f in filas]), Cuota.estado.in_(["pendiente", "parcial", "vencida"]))
+                .values(estado=ARRASTRADA, saldo_pendiente=0)
+            )
+            conn.execute(recalcular(bind.dialect.name))
+    return filas
+
+
+def _indices(bind=engine):
+    errores = crear_indices(bind)
+    errores.update(crear_indices_busqueda(bind))
+    errores.update(ampliar_columna_password(bind))
+    return errores
+
+
+class Migracion(NamedTuple):
+    version: int
+    descripcion: str
+    aplicar: Callable  # (bind) -> {nombre: error}; los errores se informan sin frenar la migración
+
+
+# Solo se agregan al final. Las primeras ponen al día bases creadas antes de
+# schema_version: todos sus pasos son idempotentes.
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "tablas", crear_tablas),
+    Migracion(2, "columnas agregadas a tablas existentes", agregar_columnas),
+    Migracion(3, "índices y ancho de usuarios.password", _indices),
+    Migracion(4, "estado de cuenta inicial", _estado_cuenta_inicial),
+    Migracion(5, "notificaciones leídas y contador de no leídas", _bandejas_notificaciones),
+    # Cerraba cuotas por suposición; ahora es el comando `arrastrados`, que pide confirmación
+    Migracion(6, "cuotas con saldo arrastrado (sin cambios de datos)", _sin_cambios),
+    Migracion(7, "índice de purga del outbox", crear_indices),
+    Migracion(8, "índice de vencimiento de las claves de idempotencia", crear_indices),
+    # Falla (y no se registra) si ya hay comprobantes repetidos para un mismo alumno
+    Migracion(9, "comprobante único por alumno en pagos", crear_indices),
+    Migracion(10, "tokens revocados compartidos entre workers", crear_tablas),
+]
+VERSION_ESQUEMA = MIGRACIONES[-1].version
+
+
+def version_actual(bind=engine) -> int:
+    """
+    0 si la base todavía no tiene schema_version. Un error de conexión se
+    propaga: una base inalcanzable no es una base sin migrar.
+    """
+    with bind.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return 0
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def migrar(bind=engine, todas: bool = False) -> Dict[str, str]:
+    """
+    Aplica en orden las migraciones pendientes (o todas) y registra cada
+    una. Si una devuelve errores no se registra y se frena ahí: la próxima
+    corrida la vuelve a intentar (los pasos son idempotentes). En
+    PostgreSQL un advisory lock evita que dos procesos migren a la vez: el
+    segundo espera y, al releer la versión, ya no tiene nada que hacer.
+    """
+    schema_version.create(bind=bind, checkfirst=True)
+    errores: Dict[str, str] = {}
+    with bind.connect() as lock:
+        if bind.dialect.name == "postgresql":
+            lock.execute(text("SELECT pg_advisory_lock(:k)"), {"k": LOCK_MIGRACIONES})
+            lock.commit()
+        try:
+            actual = version_actual(bind)
+            for migracion in MIGRACIONES:
+                if migracion.version <= actual and not todas:
+                    continue
+                errores_paso = migracion.aplicar(bind)
+                if errores_paso:
+                    errores.update(errores_paso)
+                    print(f"❌ Migración {migracion.version}: {migracion.descripcion} (no se registra)")
+                    break
+                if migracion.version > actual:
+                    with bind.begin() as conn:
+                        conn.execute(insert(schema_version).values(
+                            version=migracion.version,
+                            descripcion=migracion.descripcion,
+                            aplicada=datetime.now(),
+                        ))
+                print(f"✅ Migración {migracion.version}: {migracion.descripcion}")
+        finally:
+            if bind.dialect.name == "postgresql":
+                lock.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_MIGRACIONES})
+                lock.commit()
+    return errores
+
+
+def preparar_esquema(bind=engine):
+    """
+    Chequeo de arranque de cada worker: una lectura de la versión, o
+    nada con DB_VERIFICAR_ESQUEMA=0. Si la base está atrasada migra con
+    DB_AUTO_MIGRATE=1 y, si no, no arranca.
+    """
+    if not DB_VERIFICAR_ESQUEMA:
+        return
+    version = version_actual(bind)
+    if version >= VERSION_ESQUEMA:
+        return
+    if DB_AUTO_MIGRATE:
+        for nombre, error in migrar(bind).items():
+            print(f"⚠️ No se pudo crear {nombre}: {error}")
+        version = version_actual(bind)
+        if version >= VERSION_ESQUEMA:
+            return
+        raise RuntimeError(
+            f"El esquema quedó en la versión {version} y la app espera la {VERSION_ESQUEMA}: "
+            "revisar los errores de la migración."
+        )
+    raise RuntimeError(
+        f"El esquema está en la versión {version} y la app espera la {VERSION_ESQUEMA}: "
+        "correr python -m config.migraciones (o arrancar con DB_AUTO_MIGRATE=1)."
+    )
+
+
+def consultas_criticas():
+    """Consultas de las rutas más usadas que deben resolverse con un índice."""
+    hoy = date.today()
+    return {
+        "vencimientos": select(Cuota.id)
+            .where(Cuota.estado.in_(["pendiente", "parcial"]), Cuota.fecha_vencimiento < hoy),
+        "recordatorios": select(Cuota.id)
+            .where(Cuota.fecha_vencimiento == hoy, Cuota.notificada == False),
+        "cuota_alumno_periodo": select(Cuota.id)
+            .where(Cuota.alumno_id == 1, Cuota.periodo == "2025-01"),
+        "mis_pagos": select(Pago.id)
+            .where(Pago.alumno_id == 1).order_by(Pago.fecha_pago.desc()),
+        "userdetail_por_usuario": select(UserDetail.id).where(UserDetail.user_id == 1),
+        "alumnos": select(UserDetail.user_id).where(UserDetail.type == "Alumno"),
+        "notificaciones_recientes": select(NotificacionPago.id)
+            .order_by(NotificacionPago.fecha_envio.desc()).limit(100),
+        "notificaciones_alumno": select(NotificacionPago.id)
+            .where(NotificacionPago.alumno_id == 1, NotificacionPago.destinatario == "alumno")
+            .order_by(NotificacionPago.fecha_envio.desc(), NotificacionPago.id.desc()).limit(20),
+        "notificaciones_admin": select(NotificacionPago.id)
+            .where(NotificacionPago.destinatario == "admin")
+            .order_by(NotificacionPago.fecha_envio.desc(), NotificacionPago.id.desc()).limit(20),
+        "pagos_del_mes": select(Pago.id).where(Pago.fecha_pago >= hoy.replace(day=1)),
+        "tarifa_vigente": select(Tarifa.id)
+            .where(Tarifa.vigente_desde <= hoy).order_by(Tarifa.vigente_desde.desc()).limit(1),
+    }
+
+
+def _usa_indice(plan: str) -> bool:
+    return "Index" in plan or "USING INDEX" in plan or "USING COVERING INDEX" in plan
+
+
+def verificar_planes(bind=engine):
+    """
+    Ejecuta EXPLAIN sobre cada consulta crítica y devuelve {nombre: (usa_indice, plan)}.
+    En PostgreSQL se desactiva el seq scan dentro de la transacción: con tablas
+    chicas el planner lo prefiere aunque exista el índice, y acá interesa
+    saber si el índice es utilizable.
+    """
+    dialecto = bind.dialect.name
+    resultados = {}
+    with bind.connect() as conn:
+        trans = conn.begin()
+        if dialecto == "postgresql":
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            prefijo, compilador = "EXPLAIN ", postgresql.dialect()
+        else:
+            prefijo, compilador = "EXPLAIN QUERY PLAN ", sqlite.dialect()
+
+        for nombre, consulta in consultas_criticas().items():
+            sql = str(consulta.compile(dialect=compilador, compile_kwargs={"literal_binds": True}))
+            filas = conn.execute(text(prefijo + sql)).all()
+            plan = "\n".join(str(f[-1]) for f in filas)
+            resultados[nombre] = (_usa_indice(plan), plan)
+        trans.rollback()
+    return resultados
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "explain":
+        fallidas = 0
+        for nombre, (ok, plan) in verificar_planes().items():
+            print(f"{'✅' if ok else '❌'} {nombre}")
+            if not ok:
+                fallidas += 1
+                print("   " + plan.replace("\n", "\n   "))
+        sys.exit(1 if fallidas else 0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "arrastrados":
+        aplicar = "--aplicar" in sys.argv[2:]
+        filas = revisar_saldos_arrastrados(aplicar=aplicar)
+        for f in filas:
+            print(
+                f"   cuota {f.id} alumno {f.alumno_id} {f.periodo}: saldo {f.saldo_pendiente}, "
+                f"ajuste_anterior de {f.periodo_siguiente}: {f.ajuste_anterior}"
+            )
+        if aplicar:
+            print(f"✅ Cuotas pasadas a arrastrada: {len(filas)}.")
+        else:
+            print(f"ℹ️ {len(filas)} cuotas candidatas; revisarlas y repetir con --aplicar para cerrarlas.")
+        sys.exit(0)
+
+    errores = migrar(todas=len(sys.argv) > 1 and sys.argv[1] == "todas")
+    for nombre, error in errores.items():
+        print(f"⚠️ No se pudo crear {nombre}: {error}")
+    print(f"{'❌' if errores else '✅'} Esquema en la versión {version_actual()}.")
+    sys.exit(1 if errores else 0)
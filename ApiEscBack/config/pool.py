@@ -0,0 +1,105 @@
+# config/pool.py
+# Métricas del pool de conexiones del motor síncrono.
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from typing import Any, Dict
+import threading
+import time
+
+
+class EstadisticasPool:
+    """Contadores acumulados desde que arrancó el proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.conexiones_nuevas = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.timeouts = 0
+        self.fallos_pre_ping = 0
+        self.invalidaciones = 0
+
+    def registrar_espera(self, segundos: float):
+        with self._lock:
+            self.esperas += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def sumar(self, campo: str):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "conexiones_nuevas": self.conexiones_nuevas,
+                "espera_ms_promedio": self.espera_total * 1000 / self.esperas if self.esperas else 0.0,
+                "espera_ms_max": self.espera_max * 1000,
+                "timeouts": self.timeouts,
+                "fallos_pre_ping": self.fallos_pre_ping,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+estadisticas_pool = EstadisticasPool()
+_local = threading.local()
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión libre."""
+
+    def _do_get(self):
+        # QueuePool._do_get se llama a sí mismo al reintentar; solo se mide el nivel externo
+        if getattr(_local, "midiendo", False):
+            return super()._do_get()
+        _local.midiendo = True
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            estadisticas_pool.sumar("timeouts")
+            raise
+        finally:
+            _local.midiendo = False
+            estadisticas_pool.registrar_espera(time.perf_counter() - inicio)
+
+
+def instrumentar_engine(engine):
+    """Registra los eventos del pool y de errores sobre el motor."""
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, record):
+        estadisticas_pool.sumar("conexiones_nuevas")
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        estadisticas_pool.sumar("checkouts")
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_conn, record, exception):
+        estadisticas_pool.sumar("invalidaciones")
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        if getattr(context, "is_pre_ping", False):
+            estadisticas_pool.sumar("fallos_pre_ping")
+
+
+def estado_pool(engine) -> Dict[str, Any]:
+    """Foto del pool (conexiones en uso, overflow) más los contadores acumulados."""
+    pool = engine.pool
+    estado = {"clase": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            "tamanio": pool.size(),
+            "en_uso": pool.checkedout(),
+            "libres": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+        })
+    estado.update(estadisticas_pool.resumen())
+    return estado
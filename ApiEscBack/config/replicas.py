@@ -0,0 +1,307 @@
+# config/replicas.py
+"""
+Lecturas en réplicas.
+
+Con DATABASE_REPLICA_URLS (URLs separadas por coma) las rutas de solo
+lectura que dependen de `get_db_lectura` leen de una réplica elegida por
+turnos entre las sanas; el resto de las rutas sigue usando la primaria.
+Una réplica que falla al conectar, o que en PostgreSQL atrasa más de
+REPLICA_MAX_LAG segundos, queda fuera por REPLICA_REINTENTO segundos.
+Sin réplicas sanas se lee de la primaria.
+
+Lectura de lo propio escrito: cuando una petición confirma una
+transacción en la primaria, las lecturas de ese mismo usuario (sub del
+token, o IP sin token) van a la primaria durante READ_YOUR_WRITES_SECONDS.
+La ventana vive en memoria del proceso: con varios workers hace falta
+que el balanceador mantenga a cada cliente en el mismo worker, o un
+valor que cubra el atraso de replicación.
+
+Para pruebas locales alcanza con una segunda base como réplica:
+
+    DATABASE_REPLICA_URLS=sqlite:///./replica.db
+"""
+from contextvars import ContextVar
+from itertools import count
+from typing import List, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from config.db import DB_ASYNC, SessionLocal, AsyncSessionLocal, _opciones_engine, _url_async
+from config.instrumentacion import instrumentar_consultas
+
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_REINTENTO = float(os.getenv("REPLICA_REINTENTO", "30"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "10"))
+REPLICA_CHEQUEO_INTERVALO = float(os.getenv("REPLICA_CHEQUEO_INTERVALO", "10"))
+
+logger = logging.getLogger("replicas")
+
+
+class Replica:
+    def __init__(self, nombre: str, url: str):
+        self.nombre = nombre
+        self.engine = create_engine(url, future=True, **_opciones_engine(url))
+        instrumentar_consultas(self.engine)
+        self.async_engine = None
+        if DB_ASYNC:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            url_async = _url_async(url)
+            self.async_engine = create_async_engine(url_async, **_opciones_engine(url_async, asincrono=True))
+            instrumentar_consultas(self.async_engine.sync_engine)
+        self.fuera_hasta = 0.0
+        self.lag: Optional[float] = None
+        self.lecturas = 0
+        self.fallos = 0
+
+    def sana(self, ahora: float) -> bool:
+        return ahora >= self.fuera_hasta
+
+    def descartar(self, motivo: str):
+        self.fallos += 1
+        self.fuera_hasta = time.monotonic() + REPLICA_REINTENTO
+        logger.warning("Réplica %s fuera por %.0f s: %s", self.nombre, REPLICA_REINTENTO, motivo)
+
+
+class SelectorReplicas:
+    """Turnos entre las réplicas sanas; la elección no toca la base."""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls)]
+        self._turno = count()
+        self._lock = threading.Lock()
+        self.lecturas_primaria = 0
+
+    def candidatas(self) -> List[Replica]:
+        """Réplicas sanas, empezando por la que toca en este turno."""
+        if not self.replicas:
+            return []
+        ahora = time.monotonic()
+        inicio = next(self._turno) % len(self.replicas)
+        orden = self.replicas[inicio:] + self.replicas[:inicio]
+        return [r for r in orden if r.sana(ahora)]
+
+    def contar(self, replica: Optional[Replica]):
+        with self._lock:
+            if replica is None:
+                self.lecturas_primaria += 1
+            else:
+                replica.lecturas += 1
+
+    def verificar(self):
+        """Chequeo activo: conexión y, en PostgreSQL, atraso de replicación."""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    if replica.engine.dialect.name == "postgresql":
+                        # Sin WAL pendiente de aplicar no hay atraso, aunque la primaria esté quieta
+                        replica.lag = conn.execute(text(
+                            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                        )).scalar()
+                    else:
+                        conn.execute(text("SELECT 1"))
+                        replica.lag = 0.0
+            except DBAPIError as e:
+                replica.descartar(str(e).splitlines()[0])
+                continue
+            if replica.lag is not None and replica.lag > REPLICA_MAX_LAG:
+                replica.descartar(f"atraso de {replica.lag:.1f} s")
+            else:
+                replica.fuera_hasta = 0.0
+
+    def stats(self) -> dict:
+        ahora = time.monotonic()
+        return {
+            "replicas": len(self.replicas),
+            "replicas_sanas": sum(r.sana(ahora) for r in self.replicas),
+            "lecturas_primaria": self.lecturas_primaria,
+            "lecturas_replica": sum(r.lecturas for r in self.replicas),
+            "fallos_replica": sum(r.fallos for r in self.replicas),
+        }
+
+    def detalle(self) -> List[dict]:
+        ahora = time.monotonic()
+        return [
+            {"nombre": r.nombre, "sana": r.sana(ahora), "lag_s": r.lag, "lecturas": r.lecturas, "fallos": r.fallos}
+            for r in self.replicas
+        ]
+
+
+selector = SelectorReplicas(DATABASE_REPLICA_URLS)
+
+
+# ----- Lectura de lo propio escrito -----
+
+class VentanaEscrituras:
+    """Hasta cuándo cada usuario lee de la primaria después de escribir."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hasta = {}
+
+    def registrar(self, clave: str):
+        ahora = time.monotonic()
+        with self._lock:
+            self._hasta[clave] = ahora + READ_YOUR_WRITES_SECONDS
+            if len(self._hasta) > 10_000:
+                self._hasta = {k: v for k, v in self._hasta.items() if v > ahora}
+
+    def activa(self, clave: Optional[str]) -> bool:
+        return clave is not None and self._hasta.get(clave, 0.0) > time.monotonic()
+
+
+ventana_escrituras = VentanaEscrituras()
+
+
+class EstadoPeticion:
+    __slots__ = ("headers", "cliente", "confirmo", "_clave")
+
+    def __init__(self, scope):
+        self.headers = scope.get("headers") or []
+        self.cliente = (scope.get("client") or ("?",))[0]
+        self.confirmo = False
+        self._clave = None
+
+    def clave(self) -> str:
+        """sub del token si viene uno válido; si no, la IP del cliente."""
+        if self._clave is None:
+            from auth.seguridad import Seguridad
+
+            self._clave = f"ip:{self.cliente}"
+            for nombre, valor in self.headers:
+                if nombre == b"authorization":
+                    try:
+                        payload = Seguridad.verificar_token({"authorization": valor.decode("latin-1")})
+                        self._clave = f"sub:{payload['sub']}"
+                    except Exception:
+                        pass
+                    break
+        return self._clave
+
+
+_peticion: ContextVar[Optional[EstadoPeticion]] = ContextVar("estado_lectura", default=None)
+
+
+@event.listens_for(Session, "after_commit")
+def _marcar_commit(session):
+    # Las sesiones de réplica nunca confirman escrituras; las tareas en segundo plano no tienen petición
+    estado = _peticion.get()
+    if estado is not None:
+        estado.confirmo = True
+
+
+class MiddlewareLecturas:
+    """
+    Middleware ASGI puro: abre el estado de la petición y, si hubo un
+    commit y la respuesta no fue un error, abre la ventana de lectura de
+    la primaria para ese usuario.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DATABASE_REPLICA_URLS:
+            return await self.app(scope, receive, send)
+
+        estado = EstadoPeticion(scope)
+        token = _peticion.set(estado)
+        status = 500
+
+        async def enviar(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if estado.confirmo and status < 400:
+                ventana_escrituras.registrar(estado.clave())
+            _peticion.reset(token)
+
+
+def _leer_de_primaria() -> bool:
+    estado = _peticion.get()
+    return estado is not None and ventana_escrituras.activa(estado.clave())
+
+
+# ----- Dependencias -----
+
+def get_db_lectura():
+    """Como get_db, pero para rutas de solo lectura: usa una réplica sana si hay."""
+    conexion = None
+    if not _leer_de_primaria():
+        for replica in selector.candidatas():
+            try:
+                conexion = replica.engine.connect()
+            except DBAPIError as e:
+                replica.descartar(str(e).splitlines()[0])
+                continue
+            selector.contar(replica)
+            break
+    if conexion is None:
+        selector.contar(None)
+        db = SessionLocal()
+    else:
+        db = Session(bind=conexion, autoflush=False)
+    try:
+        yield db
+    finally:
+        db.close()
+        if conexion is not None:
+            conexion.close()
+
+
+async def get_async_db_lectura():
+    """Versión asíncrona de get_db_lectura."""
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    conexion = None
+    if not _leer_de_primaria():
+        for replica in selector.candidatas():
+            try:
+                conexion = await replica.async_engine.connect()
+            except DBAPIError as e:
+                replica.descartar(str(e).splitlines()[0])
+                continue
+            selector.contar(replica)
+            break
+    if conexion is None:
+        selector.contar(None)
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    try:
+        async with AsyncSession(bind=conexion, autoflush=False, expire_on_commit=False) as db:
+            yield db
+    finally:
+        await conexion.close()
+
+
+async def verificar_periodicamente(intervalo: float = REPLICA_CHEQUEO_INTERVALO):
+    """Tarea asyncio con el chequeo activo de las réplicas."""
+    while True:
+        try:
+            await run_in_threadpool(selector.verificar)
+        except Exception as e:
+            print("Error al verificar réplicas:", e)
+        await asyncio.sleep(intervalo)
+
+
+async def cerrar():
+    for replica in selector.replicas:
+        replica.engine.dispose()
+        if replica.async_engine is not None:
+            await replica.async_engine.dispose()
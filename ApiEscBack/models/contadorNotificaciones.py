@@ -0,0 +1,15 @@
+# models/contadorNotificaciones.py
+from config.db import Base
+from sqlalchemy import Column, Integer, String
+
+
+class ContadorNotificaciones(Base):
+    """
+    Notificaciones sin leer por bandeja ("admin" o "alumno:<id>"),
+    mantenido por services/notificaciones.py en la misma transacción que
+    cada alta o lectura: el contador del navbar es leer una fila.
+    """
+    __tablename__ = "notificaciones_no_leidas"
+
+    bandeja = Column(String(40), primary_key=True)
+    no_leidas = Column(Integer, nullable=False, default=0)
@@ -1,10 +1,18 @@
 # models/cuota.py
 from config.db import Base
-from sqlalchemy import Column, Integer, String, Date, Numeric, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Numeric, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 class Cuota(Base):
     __tablename__ = "cuotas"
+    __table_args__ = (
+        # Recordatorios: cuotas que vencen en una fecha y no fueron notificadas
+        Index("ix_cuotas_vencimiento_notificada", "fecha_vencimiento", "notificada"),
+        # Una sola cuota por alumno y período
+        Index("uq_cuotas_alumno_periodo", "alumno_id", "periodo", unique=True),
+        # Vencimientos y listados por estado
+        Index("ix_cuotas_estado_vencimiento", "estado", "fecha_vencimiento"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     alumno_id = Column(ForeignKey("usuarios.id"), nullable=False)
@@ -17,6 +25,7 @@ class Cuota(Base):
     saldo_pendiente = Column(Numeric(10, 2), default=0)
     estado = Column(String(20), default="pendiente")  # pendiente, pagada, parcial, vencida
     notificada = Column(Boolean, default=False)
+    recargo_mora = Column(Numeric(10, 2), default=0)  # se suma al ajuste_anterior del período siguiente
 
     # Relaciones
     alumno = relationship("User", back_populates="cuotas")
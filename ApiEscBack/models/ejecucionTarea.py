@@ -0,0 +1,25 @@
+# models/ejecucionTarea.py
+from config.db import Base
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, Index
+import datetime
+
+class EjecucionTarea(Base):
+    """Registro de cada corrida de una tarea programada (duración y filas afectadas)."""
+    __tablename__ = "ejecuciones_tarea"
+    __table_args__ = (
+        Index("ix_ejecuciones_tarea_inicio", "tarea", "inicio"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tarea = Column(String(50), nullable=False)  # vencimientos
+    inicio = Column(DateTime, default=datetime.datetime.now)
+    duracion_ms = Column(Float, nullable=False)
+    filas = Column(Integer, nullable=False, default=0)
+    detalle = Column(JSON, nullable=True)
+
+    def __init__(self, tarea, inicio, duracion_ms, filas, detalle=None):
+        self.tarea = tarea
+        self.inicio = inicio
+        self.duracion_ms = duracion_ms
+        self.filas = filas
+        self.detalle = detalle
@@ -0,0 +1,22 @@
+# models/estadoCuenta.py
+from config.db import Base
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Index
+import datetime
+
+class EstadoCuenta(Base):
+    """
+    Resumen de saldo por alumno, mantenido por services/estadoCuenta.py en
+    la misma transacción que cada pago, eliminación o generación de cuotas.
+    """
+    __tablename__ = "estado_cuenta"
+    __table_args__ = (
+        # Listado de morosos: más cuotas vencidas y mayor deuda primero
+        Index("ix_estado_cuenta_vencidas_adeudado", "cuotas_vencidas", "total_adeudado"),
+    )
+
+    alumno_id = Column(ForeignKey("usuarios.id"), primary_key=True)
+    total_adeudado = Column(Numeric(12, 2), nullable=False, default=0)
+    total_pagado = Column(Numeric(12, 2), nullable=False, default=0)
+    cuotas_vencidas = Column(Integer, nullable=False, default=0)
+    periodo_vencido_mas_antiguo = Column(String(7), nullable=True)
+    actualizado = Column(DateTime, default=datetime.datetime.now)
@@ -0,0 +1,33 @@
+# models/idempotencia.py
+from config.db import Base
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+import datetime
+
+class ClaveIdempotencia(Base):
+    """
+    Respuesta guardada de una petición con cabecera Idempotency-Key.
+    Se escribe en la misma transacción que el efecto (el pago), así que
+    si la clave existe el efecto ya ocurrió.
+    """
+    __tablename__ = "claves_idempotencia"
+    __table_args__ = (
+        Index("uq_idempotencia_usuario_clave", "usuario_id", "clave", unique=True),
+        Index("ix_idempotencia_creada", "creada"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(ForeignKey("usuarios.id"), nullable=False)
+    clave = Column(String(100), nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    huella = Column(String(64), nullable=False)  # sha256 del cuerpo de la petición
+    status_code = Column(Integer, nullable=False)
+    respuesta = Column(Text, nullable=False)  # JSON
+    creada = Column(DateTime, default=datetime.datetime.now)
+
+    def __init__(self, usuario_id, clave, endpoint, huella, status_code, respuesta):
+        self.usuario_id = usuario_id
+        self.clave = clave
+        self.endpoint = endpoint
+        self.huella = huella
+        self.status_code = status_code
+        self.respuesta = respuesta
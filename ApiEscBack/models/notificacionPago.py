@@ -1,10 +1,16 @@
 # models/notificacion_pago.py
 from config.db import Base
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Index
 import datetime
 
 class NotificacionPago(Base):
     __tablename__ = "notificaciones_pago"
+    __table_args__ = (
+        Index("ix_notificaciones_fecha_envio", "fecha_envio"),
+        # Bandejas paginadas por (fecha_envio, id): la de cada alumno y la de admin
+        Index("ix_notificaciones_alumno_bandeja", "alumno_id", "destinatario", "fecha_envio", "id"),
+        Index("ix_notificaciones_destinatario_fecha", "destinatario", "fecha_envio", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     alumno_id = Column(ForeignKey("usuarios.id"), nullable=False)
@@ -13,6 +19,8 @@ class NotificacionPago(Base):
     fecha_envio = Column(DateTime, default=datetime.datetime.now)
     destinatario = Column(String(20), nullable=False)  # alumno, admin
     mensaje = Column(String(255), nullable=False)
+    leida = Column(Boolean, nullable=False, default=False)
+    leida_en = Column(DateTime, nullable=True)
 
     def __init__(self, alumno_id, cuota_id, tipo, destinatario, mensaje):
         self.alumno_id = alumno_id
@@ -0,0 +1,32 @@
+# models/outbox.py
+from config.db import Base
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
+import datetime
+
+class EventoOutbox(Base):
+    """
+    Evento pendiente de notificar. Se escribe en la misma transacción que
+    el pago que lo origina; el worker de services/outbox.py lo convierte
+    en notificaciones y lo marca como procesado.
+    """
+    __tablename__ = "outbox_eventos"
+    __table_args__ = (
+        # El worker toma los pendientes cuyo próximo intento ya venció
+        Index("ix_outbox_estado_proximo", "estado", "proximo_intento"),
+        # Purga de los procesados viejos
+        Index("ix_outbox_estado_procesado", "estado", "procesado_en"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(50), nullable=False)  # pago_registrado, pago_eliminado
+    payload = Column(JSON, nullable=False)
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente, por_entregar, procesado, fallido
+    intentos = Column(Integer, nullable=False, default=0)
+    creado = Column(DateTime, default=datetime.datetime.now)
+    proximo_intento = Column(DateTime, default=datetime.datetime.now)
+    procesado_en = Column(DateTime, nullable=True)
+    error = Column(String(255), nullable=True)
+
+    def __init__(self, tipo, payload):
+        self.tipo = tipo
+        self.payload = payload
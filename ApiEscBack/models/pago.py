@@ -1,10 +1,22 @@
 from config.db import Base
-from sqlalchemy import Column, Integer, Numeric, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 import datetime
 
 class Pago(Base):
     __tablename__ = "pagos"
+    __table_args__ = (
+        # /pagos/mis: pagos de un alumno ordenados por fecha
+        Index("ix_pagos_alumno_fecha", "alumno_id", "fecha_pago"),
+        # Recaudación del mes en el panel de administración
+        Index("ix_pagos_fecha", "fecha_pago"),
+        # Un comprobante se registra una sola vez por alumno: reimportar un archivo no duplica pagos
+        Index(
+            "uq_pagos_alumno_comprobante", "alumno_id", "comprobante", unique=True,
+            postgresql_where=text("comprobante IS NOT NULL"),
+            sqlite_where=text("comprobante IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     alumno_id = Column(ForeignKey("usuarios.id"), nullable=False)
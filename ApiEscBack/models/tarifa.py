@@ -1,10 +1,13 @@
 # models/tarifa.py
 from config.db import Base
-from sqlalchemy import Column, Integer, Numeric, Date, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 class Tarifa(Base):
     __tablename__ = "tarifas"
+    __table_args__ = (
+        Index("ix_tarifas_vigente_desde", "vigente_desde"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     monto_mensual = Column(Numeric(10, 2), nullable=False)
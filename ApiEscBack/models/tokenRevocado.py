@@ -0,0 +1,21 @@
+# models/tokenRevocado.py
+from config.db import Base
+from sqlalchemy import Column, Integer, String, Float, Index
+
+class TokenRevocado(Base):
+    """
+    Token cerrado antes de su vencimiento, indexado por el sha256 del token.
+    Cada worker lee las filas nuevas por id y las suma a su lista en memoria.
+    """
+    __tablename__ = "tokens_revocados"
+    __table_args__ = (
+        Index("ix_tokens_revocados_exp", "exp"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    clave = Column(String(64), nullable=False, unique=True)
+    exp = Column(Float, nullable=False)  # epoch del `exp` del token; después la fila se purga
+
+    def __init__(self, clave, exp):
+        self.clave = clave
+        self.exp = exp
@@ -1,9 +1,13 @@
 from config.db import Base
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 class UserDetail(Base):
     __tablename__ = "userDetail"
+    __table_args__ = (
+        Index("ix_userdetail_user_id", "user_id"),
+        Index("ix_userdetail_type", "type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     dni = Column(Integer, nullable=False, unique=True)
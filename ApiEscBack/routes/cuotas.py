@@ -1,25 +1,61 @@
 # routes/cuotas.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert, update, func, exists, and_
+from sqlalchemy.orm import Session, aliased
 from datetime import date, timedelta
-from config.db import get_db
+from decimal import Decimal
+import csv
+import io
+import re
+import time
+from config.db import get_db, SessionLocal
+from config.replicas import get_db_lectura
+from auth.seguridad import obtener_usuario_desde_token, solo_admin
 from models.cuota import Cuota
-from models.tarifa import Tarifa
-from schemas.cuota import CuotaBase, CuotaOut
-from typing import List
+from models.estadoCuenta import EstadoCuenta
+from models.ejecucionTarea import EjecucionTarea
+from models.user import User
+from models.userDetail import UserDetail
+from schemas.adaptadores import LISTA_CUOTAS, dumps, respuesta_lista
+from services.tarifas import obtener_tarifa
+from services.estadoCuenta import ARRASTRADA, actualizar_estado_cuenta
+from services.dashboard import invalidar_dashboard
+from services.vencimientos import procesar_vencimientos
+from schemas.cuota import (
+    CuotaBase,
+    CuotaOut,
+    EjecucionTareaOut,
+    EstadoCuentaOut,
+    GenerarPeriodoIn,
+    GenerarPeriodoOut,
+    PaginatedCuotasOut,
+    VencimientosOut
+)
+from typing import List, Optional
 
 cuotas = APIRouter(prefix="/cuotas", tags=["Cuotas"])
 
-# Obtener la tarifa vigente
-def get_tarifa_vigente(db: Session):
-    hoy = date.today()
-    return (
-        db.query(Tarifa)
-        .filter(Tarifa.vigente_desde <= hoy)
-        .filter((Tarifa.vigente_hasta == None) | (Tarifa.vigente_hasta >= hoy))
-        .order_by(Tarifa.vigente_desde.desc())
-        .first()
-    )
+# Columnas expuestas en los listados (mismo orden que CuotaOut)
+COLUMNAS_CUOTA = [
+    Cuota.id,
+    Cuota.alumno_id,
+    Cuota.periodo,
+    Cuota.fecha_vencimiento,
+    Cuota.monto_base,
+    Cuota.ajuste_anterior,
+    Cuota.monto_a_pagar,
+    Cuota.monto_pagado,
+    Cuota.saldo_pendiente,
+    Cuota.estado,
+]
+CAMPOS_CUOTA = [c.key for c in COLUMNAS_CUOTA]
+PATRON_ESTADO = "^(pendiente|parcial|pagada|vencida|arrastrada)$"
+FILAS_POR_LOTE = 1000
+
+# Obtener la tarifa vigente (hoy o en la fecha indicada)
+def get_tarifa_vigente(db: Session, fecha: Optional[date] = None):
+    return obtener_tarifa(db, fecha)
 
 # Crear una nueva cuota
 @cuotas.post("/", response_model=CuotaOut)
@@ -38,11 +74,290 @@ def generar_cuota(data: CuotaBase, db: Session = Depends(get_db)):
     )
 
     db.add(nueva)
+    db.flush()
+    actualizar_estado_cuenta(db, [nueva.alumno_id])
     db.commit()
+    invalidar_dashboard()
     db.refresh(nueva)
     return nueva
 
+# 🗓️ ADMIN: Generar las cuotas de un período para todos los alumnos
+@cuotas.post("/generar-periodo", response_model=GenerarPeriodoOut)
+def generar_periodo(
+    data: GenerarPeriodoIn,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(solo_admin)
+):
+    """
+    Genera en una sola pasada la cuota del período para cada alumno.
+    Resuelve una vez la tarifa vigente al inicio del período, arrastra el saldo pendiente y el recargo
+    por mora de la cuota anterior a `ajuste_anterior` y omite a los alumnos que ya tienen el período.
+    La cuota cuyo saldo se arrastra queda `arrastrada` con saldo 0, para no contar la deuda dos veces.
+    Todas las cuotas se insertan con un INSERT multi-fila en una única transacción.
+    """
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", data.periodo):
+        raise HTTPException(status_code=400, detail="El período debe tener formato 'YYYY-MM'")
+
+    tiempos = {}
+    inicio = time.perf_counter()
+
+    anio, mes = map(int, data.periodo.split("-"))
+    tarifa = get_tarifa_vigente(db, date(anio, mes, 1))
+    if not tarifa:
+        raise HTTPException(status_code=404, detail="No hay tarifa vigente para el período")
+    monto_base = Decimal(tarifa.monto_mensual)
+    tiempos["tarifa"] = (time.perf_counter() - inicio) * 1000
+
+    try:
+        # Último período anterior de cada alumno (para arrastrar su saldo)
+        ultimo = (
+            select(Cuota.alumno_id, func.max(Cuota.periodo).label("periodo"))
+            .where(Cuota.periodo < data.periodo)
+            .group_by(Cuota.alumno_id)
+            .subquery()
+        )
+        anterior = aliased(Cuota)
+        ya_generada = exists().where(
+            Cuota.alumno_id == User.id,
+            Cuota.periodo == data.periodo
+        )
+
+        t = time.perf_counter()
+        alumnos = db.execute(
+            select(User.id, ya_generada.label("existe"), anterior.id, anterior.saldo_pendiente, anterior.recargo_mora)
+            .join(UserDetail, UserDetail.user_id == User.id)
+            .outerjoin(ultimo, ultimo.c.alumno_id == User.id)
+            .outerjoin(anterior, and_(
+                anterior.alumno_id == User.id,
+                anterior.periodo == ultimo.c.periodo
+            ))
+            .where(UserDetail.type == "Alumno")
+        ).all()
+        tiempos["lectura"] = (time.perf_counter() - t) * 1000
+
+        filas = []
+        arrastradas = []
+        omitidas = 0
+        for alumno_id, existe, anterior_id, saldo_anterior, recargo_anterior in alumnos:
+            if existe:
+                omitidas += 1
+                continue
+            if saldo_anterior and saldo_anterior > 0:
+                arrastradas.append(anterior_id)
+            ajuste = Decimal(saldo_anterior or 0) + Decimal(recargo_anterior or 0)
+            monto_a_pagar = monto_base + ajuste
+            filas.append({
+                "alumno_id": alumno_id,
+                "periodo": data.periodo,
+                "fecha_vencimiento": data.fecha_vencimiento,
+                "monto_base": monto_base,
+                "ajuste_anterior": ajuste,
+                "monto_a_pagar": monto_a_pagar,
+                "monto_pagado": 0,
+                "saldo_pendiente": monto_a_pagar,
+                "estado": "pendiente",
+                "notificada": False,
+            })
+
+        t = time.perf_counter()
+        if filas:
+            db.execute(insert(Cuota), filas)
+            for i in range(0, len(arrastradas), FILAS_POR_LOTE):
+                db.execute(
+                    update(Cuota)
+                    .where(Cuota.id.in_(arrastradas[i:i + FILAS_POR_LOTE]))
+                    .values(estado=ARRASTRADA, saldo_pendiente=0)
+                    .execution_options(synchronize_session=False)
+                )
+            actualizar_estado_cuenta(db, [f["alumno_id"] for f in filas])
+        db.commit()
+        invalidar_dashboard()
+        tiempos["insercion"] = (time.perf_counter() - t) * 1000
+
+    except Exception as e:
+        db.rollback()
+        print("Error al generar cuotas del período:", e)
+        raise HTTPException(status_code=500, detail="Error al generar las cuotas del período")
+
+    tiempos["total"] = (time.perf_counter() - inicio) * 1000
+
+    return {
+        "periodo": data.periodo,
+        "monto_base": float(monto_base),
+        "alumnos": len(alumnos),
+        "creadas": len(filas),
+        "omitidas": omitidas,
+        "tiempos_ms": {k: round(v, 2) for k, v in tiempos.items()},
+    }
+
 # Listar todas las cuotas
 @cuotas.get("/", response_model=List[CuotaOut])
-def listar_cuotas(db: Session = Depends(get_db)):
-    return db.query(Cuota).order_by(Cuota.id.desc()).all()
+def listar_cuotas(db: Session = Depends(get_db_lectura)):
+    filas = db.execute(select(*COLUMNAS_CUOTA).order_by(Cuota.id.desc())).all()
+    return respuesta_lista(LISTA_CUOTAS, filas)
+
+
+# Listar cuotas paginadas por cursor (más recientes primero)
+@cuotas.get("/paginado", response_model=PaginatedCuotasOut)
+def listar_cuotas_paginado(
+    limit: int = Query(50, ge=1, le=500),
+    before_id: Optional[int] = Query(None, ge=1),
+    estado: Optional[str] = Query(None, pattern=PATRON_ESTADO),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Devuelve una página de cuotas ordenadas por id descendente.
+    `next_cursor` se pasa como `before_id` para pedir la página siguiente.
+    """
+    q = select(*COLUMNAS_CUOTA).order_by(Cuota.id.desc()).limit(limit)
+    if before_id:
+        q = q.where(Cuota.id < before_id)
+    if estado:
+        q = q.where(Cuota.estado == estado)
+
+    filas = [dict(zip(CAMPOS_CUOTA, fila)) for fila in db.execute(q)]
+    next_cursor = filas[-1]["id"] if len(filas) == limit else None
+
+    return {"cuotas": filas, "next_cursor": next_cursor}
+
+
+def _valor_plano(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def _filas_cuotas():
+    """
+    Recorre la tabla con un cursor del lado del servidor, de a lotes,
+    sin construir objetos ORM. Abre su propia sesión porque el cuerpo
+    de la respuesta se envía después de que terminan las dependencias.
+    """
+    db = SessionLocal()
+    try:
+        resultado = db.execute(
+            select(*COLUMNAS_CUOTA)
+            .order_by(Cuota.id.desc())
+            .execution_options(stream_results=True, yield_per=FILAS_POR_LOTE)
+        )
+        for lote in resultado.partitions():
+            yield lote
+    finally:
+        db.close()
+
+
+def _exportar_ndjson():
+    for lote in _filas_cuotas():
+        yield b"".join(dumps(dict(zip(CAMPOS_CUOTA, fila))) + b"\n" for fila in lote)
+
+
+def _exportar_csv():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CAMPOS_CUOTA)
+    for lote in _filas_cuotas():
+        writer.writerows([_valor_plano(v) for v in fila] for fila in lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# Exportar todas las cuotas en streaming (NDJSON o CSV)
+@cuotas.get("/exportar")
+def exportar_cuotas(formato: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Envía todas las cuotas a medida que se leen, con memoria constante
+    sin importar el tamaño de la tabla.
+    """
+    if formato == "csv":
+        return StreamingResponse(
+            _exportar_csv(),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=cuotas.csv"},
+        )
+    return StreamingResponse(_exportar_ndjson(), media_type="application/x-ndjson")
+
+
+# 📊 ADMIN: Estado de cuenta de varios alumnos (morosos primero)
+@cuotas.get("/estado-cuenta", response_model=List[EstadoCuentaOut])
+def listar_estados_cuenta(
+    alumno_ids: Optional[List[int]] = Query(None),
+    solo_morosos: bool = False,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db_lectura),
+    payload: dict = Depends(solo_admin)
+):
+    consulta = select(EstadoCuenta)
+    if alumno_ids:
+        consulta = consulta.where(EstadoCuenta.alumno_id.in_(alumno_ids))
+    if solo_morosos:
+        consulta = consulta.where(EstadoCuenta.cuotas_vencidas > 0)
+    return db.scalars(
+        consulta
+        .order_by(EstadoCuenta.cuotas_vencidas.desc(), EstadoCuenta.total_adeudado.desc(), EstadoCuenta.alumno_id)
+        .limit(limit)
+    ).all()
+
+
+# 🔄 ADMIN: Recalcular el estado de cuenta de todos los alumnos
+@cuotas.post("/estado-cuenta/recalcular")
+def recalcular_estados_cuenta(
+    db: Session = Depends(get_db),
+    payload: dict = Depends(solo_admin)
+):
+    inicio = time.perf_counter()
+    actualizar_estado_cuenta(db)
+    db.commit()
+    invalidar_dashboard()
+    return {
+        "alumnos": db.scalar(select(func.count()).select_from(EstadoCuenta)),
+        "tiempo_ms": round((time.perf_counter() - inicio) * 1000, 2),
+    }
+
+
+# 📊 ADMIN o el propio ALUMNO: Estado de cuenta de un alumno
+@cuotas.get("/estado-cuenta/{alumno_id}", response_model=EstadoCuentaOut)
+def obtener_estado_cuenta(
+    alumno_id: int,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(obtener_usuario_desde_token)
+):
+    if payload["type"] != "Admin" and int(payload["sub"]) != alumno_id:
+        raise HTTPException(status_code=403, detail="No autorizado para ver este estado de cuenta")
+
+    estado = db.get(EstadoCuenta, alumno_id)
+    # Un alumno sin cuotas todavía no tiene fila: no debe nada
+    return estado or EstadoCuentaOut(alumno_id=alumno_id)
+
+
+# ⏰ ADMIN: Marcar ahora las cuotas vencidas (también corre periódicamente)
+@cuotas.post("/vencimientos", response_model=VencimientosOut)
+def procesar_cuotas_vencidas(
+    db: Session = Depends(get_db),
+    payload: dict = Depends(solo_admin)
+):
+    try:
+        return procesar_vencimientos(db)
+    except Exception as e:
+        db.rollback()
+        print("Error al procesar vencimientos:", e)
+        raise HTTPException(status_code=500, detail="Error al procesar los vencimientos")
+
+
+# 📜 ADMIN: Últimas corridas del proceso de vencimientos
+@cuotas.get("/vencimientos/ejecuciones", response_model=List[EjecucionTareaOut])
+def listar_ejecuciones_vencimientos(
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    payload: dict = Depends(solo_admin)
+):
+    return db.scalars(
+        select(EjecucionTarea)
+        .where(EjecucionTarea.tarea == "vencimientos")
+        .order_by(EjecucionTarea.inicio.desc())
+        .limit(limit)
+    ).all()
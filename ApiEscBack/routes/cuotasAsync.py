@@ -0,0 +1,67 @@
+# routes/cuotasAsync.py
+# Versiones asíncronas (AsyncSession) de las rutas más usadas de /cuotas.
+# Solo se registran con DB_ASYNC=1; el resto de /cuotas sigue en routes/cuotas.py.
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from config.db import get_async_db
+from config.replicas import get_async_db_lectura
+from models.cuota import Cuota
+from routes.cuotas import COLUMNAS_CUOTA, CAMPOS_CUOTA, PATRON_ESTADO
+from schemas.cuota import CuotaBase, CuotaOut, PaginatedCuotasOut
+from schemas.adaptadores import LISTA_CUOTAS, respuesta_lista
+from services.tarifas import obtener_tarifa_async
+from services.estadoCuenta import actualizar_estado_cuenta_async
+from services.dashboard import invalidar_dashboard
+
+cuotas_async = APIRouter(prefix="/cuotas", tags=["Cuotas"])
+
+# Crear una nueva cuota
+@cuotas_async.post("/", response_model=CuotaOut)
+async def generar_cuota(data: CuotaBase, db: AsyncSession = Depends(get_async_db)):
+    tarifa = await obtener_tarifa_async(db)
+    if not tarifa:
+        raise HTTPException(status_code=404, detail="No hay tarifa vigente")
+
+    nueva = Cuota(
+        alumno_id=data.alumno_id,
+        periodo=data.periodo,
+        fecha_vencimiento=data.fecha_vencimiento,
+        monto_base=tarifa.monto_mensual,
+        ajuste_anterior=data.ajuste_anterior,
+        monto_a_pagar=data.monto_a_pagar,
+    )
+
+    db.add(nueva)
+    await db.flush()
+    await actualizar_estado_cuenta_async(db, [nueva.alumno_id])
+    await db.commit()
+    invalidar_dashboard()
+    await db.refresh(nueva)
+    return nueva
+
+# Listar todas las cuotas
+@cuotas_async.get("/", response_model=List[CuotaOut])
+async def listar_cuotas(db: AsyncSession = Depends(get_async_db_lectura)):
+    filas = (await db.execute(select(*COLUMNAS_CUOTA).order_by(Cuota.id.desc()))).all()
+    return respuesta_lista(LISTA_CUOTAS, filas)
+
+# Listar cuotas paginadas por cursor (más recientes primero)
+@cuotas_async.get("/paginado", response_model=PaginatedCuotasOut)
+async def listar_cuotas_paginado(
+    limit: int = Query(50, ge=1, le=500),
+    before_id: Optional[int] = Query(None, ge=1),
+    estado: Optional[str] = Query(None, pattern=PATRON_ESTADO),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    q = select(*COLUMNAS_CUOTA).order_by(Cuota.id.desc()).limit(limit)
+    if before_id:
+        q = q.where(Cuota.id < before_id)
+    if estado:
+        q = q.where(Cuota.estado == estado)
+
+    filas = [dict(zip(CAMPOS_CUOTA, fila)) for fila in await db.execute(q)]
+    next_cursor = filas[-1]["id"] if len(filas) == limit else None
+
+    return {"cuotas": filas, "next_cursor": next_cursor}
@@ -0,0 +1,23 @@
+# routes/dashboard.py
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from config.db import get_db
+from auth.seguridad import solo_admin
+from schemas.dashboard import DashboardAdminOut
+from services.dashboard import cache_dashboard
+
+dashboard = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+# 🏠 ADMIN: Indicadores del panel en una sola petición
+@dashboard.get("/admin", response_model=DashboardAdminOut)
+def dashboard_admin(
+    db: Session = Depends(get_db),
+    payload: dict = Depends(solo_admin)
+):
+    """
+    Cuotas por estado, recaudación del mes, deuda vencida, último pago y
+    último usuario. Se calcula con agregados SQL y se sirve desde caché
+    hasta DASHBOARD_CACHE_TTL segundos o hasta la próxima escritura.
+    """
+    return cache_dashboard.obtener(db)
@@ -0,0 +1,55 @@
+# routes/metricas.py
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+import os
+from config.db import engine
+from config.pool import estado_pool
+from config.instrumentacion import registro_metricas
+from config.replicas import selector
+from auth.seguridad import Seguridad, solo_admin
+from services.perfiles import cache_perfiles
+
+metricas = APIRouter(prefix="/metrics", tags=["Métricas"])
+
+# Si se define, Prometheus tiene que mandar "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def _numericos(prefijo: str, valores: dict) -> dict:
+    return {
+        f"{prefijo}_{clave}": valor for clave, valor in valores.items()
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool)
+    }
+
+
+# 📈 Métricas por ruta, del pool y de las cachés en formato Prometheus
+@metricas.get("", response_class=PlainTextResponse)
+def metricas_prometheus(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+
+    extras = _numericos("apiesc_db_pool", estado_pool(engine))
+    extras.update(_numericos("apiesc_token_cache", Seguridad.token_cache.stats()))
+    extras.update(_numericos("apiesc_db", selector.stats()))
+    extras.update(_numericos("apiesc_perfil_cache", cache_perfiles.stats()))
+    return PlainTextResponse(
+        registro_metricas.texto_prometheus(extras),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# 📈 ADMIN: Estado del pool de conexiones, de las réplicas y de la caché de tokens
+@metricas.get("/db", response_model=dict)
+def metricas_db(payload: dict = Depends(solo_admin)):
+    """
+    Conexiones en uso, overflow, espera por conexión, timeouts y
+    fallos de pre-ping, para dimensionar el pool con carga real.
+    """
+    return {
+        "pool": estado_pool(engine),
+        "auth": Seguridad.token_cache.stats(),
+        "replicas": selector.detalle(),
+        "perfiles": cache_perfiles.stats(),
+    }
@@ -1,111 +1,262 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from sqlalchemy import String, cast, func, select, update
+from sqlalchemy.orm import Session
 from datetime import date, timedelta, datetime
-from typing import List
+from typing import List, Optional
 
 from config.db import get_db
+from config.replicas import get_db_lectura
 from models.cuota import Cuota
 from models.notificacionPago import NotificacionPago
-from models.user import User
-from schemas.notificacionPago import NotificacionPagoOut
-from auth.seguridad import solo_admin
+from models.userDetail import UserDetail
+from schemas.notificacionPago import NoLeidasOut, NotificacionPagoOut, RecordatoriosResumenOut
+from schemas.adaptadores import LISTA_NOTIFICACIONES, json_lista, respuesta_lista
+from auth.seguridad import obtener_usuario_desde_token, solo_admin
+from services.notificaciones import (
+    bandeja_de, cursor_de, filtro_bandeja, insertar_notificaciones, marcar_leida,
+    marcar_todas_leidas, no_leidas, pagina
+)
 
 notificaciones = APIRouter(prefix="/notificaciones", tags=["Notificaciones"])
 
-# 📆 Generar recordatorios automáticos de vencimiento
-@notificaciones.post("/recordatorios", response_model=List[NotificacionPagoOut])
-def generar_recordatorios(db: Session = Depends(get_db), payload: dict = Depends(solo_admin)):
-    hoy = date.today()
-    fecha_objetivo = hoy + timedelta(days=7)
-
-    cuotas_proximas = (
-        db.query(Cuota)
-        .options(joinedload(Cuota.alumno).joinedload(User.userdetail))
-        .filter(Cuota.fecha_vencimiento == fecha_objetivo)
-        .filter(Cuota.notificada == False)
-        .all()
+# Máximo de ids por cláusula IN al marcar cuotas notificadas
+LOTE_IDS = 1000
+
+# Columnas de NotificacionPagoOut; nombre y período salen de los outer join
+COLUMNAS_NOTIFICACION = [
+    NotificacionPago.id,
+    NotificacionPago.alumno_id,
+    NotificacionPago.cuota_id,
+    NotificacionPago.tipo,
+    NotificacionPago.destinatario,
+    NotificacionPago.mensaje,
+    NotificacionPago.fecha_envio,
+    func.coalesce(
+        UserDetail.firstName + " " + UserDetail.lastName,
+        "ID " + cast(NotificacionPago.alumno_id, String)
+    ).label("alumno_nombre"),
+    func.coalesce(Cuota.periodo, "Desconocido").label("periodo"),
+    NotificacionPago.leida,
+    NotificacionPago.leida_en,
+]
+
+
+def consulta_notificaciones():
+    return (
+        select(*COLUMNAS_NOTIFICACION)
+        .outerjoin(UserDetail, UserDetail.user_id == NotificacionPago.alumno_id)
+        .outerjoin(Cuota, Cuota.id == NotificacionPago.cuota_id)
     )
 
+
+def respuesta_pagina(filas, limit: int) -> Response:
+    """
+    El cuerpo es el array de notificaciones; si la página vino completa,
+    el cursor para pedir la siguiente va en la cabecera X-Next-Cursor.
+    """
+    respuesta = Response(content=json_lista(LISTA_NOTIFICACIONES, filas), media_type="application/json")
+    if len(filas) == limit:
+        respuesta.headers["X-Next-Cursor"] = cursor_de(filas[-1].fecha_envio, filas[-1].id)
+    return respuesta
+
+# 📆 Generar recordatorios automáticos de vencimiento
+@notificaciones.post("/recordatorios", response_model=RecordatoriosResumenOut)
+def generar_recordatorios(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(solo_admin)
+):
+    """
+    Notifica las cuotas no notificadas y con saldo que vencen entre `desde`
+    y `hasta`; las pagadas o arrastradas no reciben recordatorio.
+    Por defecto, las que vencen dentro de 7 días; con `desde` anterior se
+    recuperan en una sola llamada los días en que no se ejecutó.
+    Inserta todas las notificaciones y marca las cuotas en bloque.
+    """
+    hasta = hasta or date.today() + timedelta(days=7)
+    desde = desde or hasta
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' no puede ser posterior a 'hasta'.")
+
+    cuotas_proximas = db.execute(
+        select(
+            Cuota.id,
+            Cuota.alumno_id,
+            Cuota.periodo,
+            Cuota.fecha_vencimiento,
+            Cuota.saldo_pendiente,
+            UserDetail.firstName,
+            UserDetail.lastName
+        )
+        .outerjoin(UserDetail, UserDetail.user_id == Cuota.alumno_id)
+        .where(Cuota.fecha_vencimiento.between(desde, hasta))
+        .where(Cuota.notificada == False)
+        .where(Cuota.estado.in_(["pendiente", "parcial", "vencida"]), Cuota.saldo_pendiente > 0)
+        .with_for_update(of=Cuota, skip_locked=True)
+    ).all()
+
     if not cuotas_proximas:
         raise HTTPException(status_code=404, detail="No hay cuotas próximas a vencer.")
 
     notifs = []
-
     for cuota in cuotas_proximas:
-        alumno = cuota.alumno.userdetail if cuota.alumno and cuota.alumno.userdetail else None
-        nombre_alumno = f"{alumno.firstName} {alumno.lastName}" if alumno else f"ID {cuota.alumno_id}"
-
-        mensaje_alumno = (
-            f"Recordatorio: Tu cuota del período {cuota.periodo} vence el "
-            f"{cuota.fecha_vencimiento.strftime('%d/%m/%Y')}. Monto a pagar: ${float(cuota.monto_a_pagar):,.2f}"
-        )
-        mensaje_admin = (
-            f"El alumno {nombre_alumno} tiene una cuota próxima a vencer el "
-            f"{cuota.fecha_vencimiento.strftime('%d/%m/%Y')}."
+        nombre_alumno = (
+            f"{cuota.firstName} {cuota.lastName}" if cuota.firstName else f"ID {cuota.alumno_id}"
         )
+        vencimiento = cuota.fecha_vencimiento.strftime('%d/%m/%Y')
+        base = {"alumno_id": cuota.alumno_id, "cuota_id": cuota.id, "tipo": "recordatorio_vencimiento"}
 
-        notif_alumno = NotificacionPago(
-            alumno_id=cuota.alumno_id,
-            cuota_id=cuota.id,
-            tipo="recordatorio_vencimiento",
-            destinatario="alumno",
-            mensaje=mensaje_alumno
-        )
-        notif_admin = NotificacionPago(
-            alumno_id=cuota.alumno_id,
-            cuota_id=cuota.id,
-            tipo="recordatorio_vencimiento",
-            destinatario="admin",
-            mensaje=mensaje_admin
-        )
+        notifs.append({
+            **base,
+            "destinatario": "alumno",
+            "mensaje": (
+                f"Recordatorio: Tu cuota del período {cuota.periodo} vence el "
+                f"{vencimiento}. Saldo pendiente: ${float(cuota.saldo_pendiente):,.2f}"
+            ),
+        })
+        notifs.append({
+            **base,
+            "destinatario": "admin",
+            "mensaje": f"El alumno {nombre_alumno} tiene una cuota próxima a vencer el {vencimiento}.",
+        })
 
-        db.add_all([notif_alumno, notif_admin])
-        cuota.notificada = True
-        notifs.extend([notif_alumno, notif_admin])
+    ids = [cuota.id for cuota in cuotas_proximas]
+    try:
+        insertar_notificaciones(db, notifs)
+        for i in range(0, len(ids), LOTE_IDS):
+            db.execute(
+                update(Cuota)
+                .where(Cuota.id.in_(ids[i:i + LOTE_IDS]))
+                .values(notificada=True)
+            )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print("Error al generar recordatorios:", e)
+        raise HTTPException(status_code=500, detail="Error al generar recordatorios")
 
-    db.commit()
-    print(f"✅ {len(notifs)} notificaciones generadas correctamente.")
-    return notifs
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "cuotas": len(ids),
+        "notificaciones": len(notifs),
+    }
 
 
 # 📋 Listar notificaciones recientes (extendido con nombre y periodo)
 @notificaciones.get("/listar", response_model=List[NotificacionPagoOut])
-def listar_notificaciones(db: Session = Depends(get_db), payload: dict = Depends(solo_admin)):
+def listar_notificaciones(db: Session = Depends(get_db_lectura), payload: dict = Depends(solo_admin)):
     """
     Devuelve todas las notificaciones enviadas (ordenadas por fecha descendente),
     incluyendo nombre del alumno y período de la cuota.
     Solo accesible por Admin.
+    Nombre y período salen de la misma consulta y las filas se serializan directo.
     """
-    notifs = (
-        db.query(NotificacionPago)
-        .options(
-            joinedload(NotificacionPago.alumno).joinedload(User.userdetail),
-            joinedload(NotificacionPago.cuota)
-        )
+    filas = db.execute(
+        consulta_notificaciones()
         .order_by(NotificacionPago.fecha_envio.desc())
         .limit(100)
-        .all()
-    )
+    ).all()
 
-    if not notifs:
+    if not filas:
         raise HTTPException(status_code=404, detail="No hay notificaciones registradas.")
 
-    salida = []
-    for n in notifs:
-        alumno = n.alumno.userdetail if n.alumno and n.alumno.userdetail else None
-        nombre_alumno = f"{alumno.firstName} {alumno.lastName}" if alumno else f"ID {n.alumno_id}"
-        periodo = n.cuota.periodo if n.cuota else "Desconocido"
-
-        salida.append({
-            "id": n.id,
-            "alumno_id": n.alumno_id,
-            "cuota_id": n.cuota_id,
-            "tipo": n.tipo,
-            "destinatario": n.destinatario,
-            "mensaje": n.mensaje,
-            "fecha_envio": n.fecha_envio,
-            "alumno_nombre": nombre_alumno,
-            "periodo": periodo,
-        })
+    return respuesta_lista(LISTA_NOTIFICACIONES, filas)
+
+
+# 📥 Bandeja propia: la del alumno, o la de admin para un Admin
+@notificaciones.get("/mis", response_model=List[NotificacionPagoOut])
+def mis_notificaciones(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    solo_no_leidas: bool = False,
+    payload: dict = Depends(obtener_usuario_desde_token),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Notificaciones de la bandeja de quien consulta, de la más nueva a la
+    más vieja. Pagina por cursor sobre (fecha_envio, id): `cursor` es el
+    valor de X-Next-Cursor de la página anterior.
+    """
+    consulta = consulta_notificaciones().where(filtro_bandeja(bandeja_de(payload)))
+    if solo_no_leidas:
+        consulta = consulta.where(NotificacionPago.leida == False)
+    return respuesta_pagina(db.execute(pagina(consulta, cursor, limit)).all(), limit)
+
 
-    return salida
+# 🔎 ADMIN: Todas las notificaciones con filtros
+@notificaciones.get("/feed", response_model=List[NotificacionPagoOut])
+def feed_notificaciones(
+    tipo: Optional[str] = None,
+    destinatario: Optional[str] = Query(None, pattern="^(alumno|admin)$"),
+    alumno_id: Optional[int] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    leida: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    payload: dict = Depends(solo_admin),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Notificaciones de todos los alumnos y destinatarios, filtrables por
+    tipo, destinatario, alumno, rango de fechas de envío y estado de
+    lectura. Pagina por cursor igual que /notificaciones/mis.
+    """
+    if desde and hasta and desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' no puede ser posterior a 'hasta'.")
+    consulta = consulta_notificaciones()
+    if tipo:
+        consulta = consulta.where(NotificacionPago.tipo == tipo)
+    if destinatario:
+        consulta = consulta.where(NotificacionPago.destinatario == destinatario)
+    if alumno_id is not None:
+        consulta = consulta.where(NotificacionPago.alumno_id == alumno_id)
+    # Rango de días completos sobre el DateTime, sin funciones sobre la columna indexada
+    if desde:
+        consulta = consulta.where(NotificacionPago.fecha_envio >= datetime.combine(desde, datetime.min.time()))
+    if hasta:
+        hasta_exclusivo = datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+        consulta = consulta.where(NotificacionPago.fecha_envio < hasta_exclusivo)
+    if leida is not None:
+        consulta = consulta.where(NotificacionPago.leida == leida)
+    return respuesta_pagina(db.execute(pagina(consulta, cursor, limit)).all(), limit)
+
+
+# 🔔 Cantidad sin leer de la bandeja propia (badge del navbar)
+@notificaciones.get("/no-leidas", response_model=NoLeidasOut)
+def contar_no_leidas(
+    payload: dict = Depends(obtener_usuario_desde_token),
+    db: Session = Depends(get_db_lectura)
+):
+    """Lee una fila del contador, sin COUNT sobre la tabla de notificaciones."""
+    return {"no_leidas": no_leidas(db, bandeja_de(payload))}
+
+
+# ✅ Marcar una notificación de la bandeja propia como leída
+@notificaciones.patch("/{notificacion_id}/leida", response_model=NoLeidasOut)
+def marcar_notificacion_leida(
+    notificacion_id: int,
+    payload: dict = Depends(obtener_usuario_desde_token),
+    db: Session = Depends(get_db)
+):
+    nombre = bandeja_de(payload)
+    marcada = marcar_leida(db, nombre, notificacion_id)
+    db.commit()
+    return {"no_leidas": no_leidas(db, nombre), "marcadas": int(marcada)}
+
+
+# ✅ Marcar como leídas todas las de la bandeja propia
+@notificaciones.patch("/leidas", response_model=NoLeidasOut)
+def marcar_notificaciones_leidas(
+    hasta_id: Optional[int] = Query(None, ge=1),
+    payload: dict = Depends(obtener_usuario_desde_token),
+    db: Session = Depends(get_db)
+):
+    """Con `hasta_id` solo marca hasta esa notificación (la más nueva que vio el usuario)."""
+    nombre = bandeja_de(payload)
+    marcadas = marcar_todas_leidas(db, nombre, hasta_id)
+    db.commit()
+    return {"no_leidas": no_leidas(db, nombre), "marcadas": marcadas}
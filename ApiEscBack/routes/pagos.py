@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
-from typing import List
+from decimal import Decimal
+from typing import List, Optional
+import time
 
 from config.db import get_db
+from config.replicas import get_db_lectura
 from auth.seguridad import obtener_usuario_desde_token, solo_admin
 from models.pago import Pago
-from models.cuota import Cuota
 from models.user import User
 from models.pagoEliminado import PagoEliminado
-from models.notificacionPago import NotificacionPago
-from schemas.pago import PagoBase, PagoOut, PagoEliminadoIn, PagoEliminadoOut
-from psycopg2 import IntegrityError
+from schemas.pago import PagoBase, PagoOut, PagoEliminadoIn, PagoEliminadoOut, ImportacionPagosOut
+from schemas.adaptadores import LISTA_PAGOS, respuesta_lista
+from services.pagos import aplicar_pago, consulta_mis_pagos
+from services.estadoCuenta import actualizar_estado_cuenta
+from services.dashboard import invalidar_dashboard
+from services import idempotencia, importacion, outbox
+from sqlalchemy.exc import IntegrityError
 
 
 pagos = APIRouter(prefix="/pagos", tags=["Pagos"])
@@ -22,76 +29,68 @@ pagos = APIRouter(prefix="/pagos", tags=["Pagos"])
 def nuevo_pago(
     data: PagoBase,
     db: Session = Depends(get_db),
-    payload: dict = Depends(obtener_usuario_desde_token)
+    payload: dict = Depends(obtener_usuario_desde_token),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100)
 ):
-    try:
-        # Solo Admin o Alumno
-        if payload["type"] not in ["Admin", "Alumno"]:
-            raise HTTPException(status_code=403, detail="No autorizado para registrar pagos")
+    """
+    Con cabecera Idempotency-Key, un reintento con la misma clave devuelve
+    la respuesta original sin volver a aplicar el pago.
+    """
+    # Solo Admin o Alumno
+    if payload["type"] not in ["Admin", "Alumno"]:
+        raise HTTPException(status_code=403, detail="No autorizado para registrar pagos")
+
+    usuario_id = int(payload["sub"])
+    huella = idempotencia.huella(data.model_dump())
+    if idempotency_key:
+        guardada = idempotencia.buscar(db, usuario_id, idempotency_key)
+        if guardada:
+            return idempotencia.repetir(guardada, huella)
 
+    try:
         alumno_id = data.alumno_id or int(payload["sub"])
         monto_pagado = float(data.monto_pagado)
 
-        cuota = db.query(Cuota).filter_by(id=data.cuota_id, alumno_id=alumno_id).first()
+        # Aplicar el pago en la base con un único UPDATE ... RETURNING
+        cuota = db.execute(
+            aplicar_pago(data.cuota_id, Decimal(str(monto_pagado)), alumno_id)
+        ).first()
         if not cuota:
-            raise HTTPException(status_code=404, detail="Cuota no encontrada")
-
-        # Calcular saldo evitando negativos
-        cuota.monto_pagado += monto_pagado
-        cuota.saldo_pendiente = max(0, float(cuota.monto_a_pagar) - float(cuota.monto_pagado))
-
-        # Actualizar estado según saldo
-        if cuota.saldo_pendiente == 0:
-            cuota.estado = "pagada"
-        elif 0 < cuota.saldo_pendiente < float(cuota.monto_a_pagar):
-            cuota.estado = "parcial"
-        else:
-            cuota.estado = "pendiente"
-
-        # Crear registro del pago
-        nuevo = Pago(
+            raise HTTPException(status_code=404, detail="Cuota no encontrada o con el saldo pasado al período siguiente")
+
+        # Registrar el pago y el evento de notificación en la misma transacción
+        db.add(Pago(
             alumno_id=alumno_id,
             cuota_id=cuota.id,
             monto_pagado=monto_pagado,
             metodo=data.metodo,
             comprobante=data.comprobante,
             registrado_por=payload["sub"]
-        )
-        db.add(nuevo)
-        db.commit()
-
-        # 🔔 Crear notificaciones automáticas
-        mensaje_alumno = (
-            f"Se registró un pago de ${monto_pagado:,.2f} "
-            f"para tu cuota del período {cuota.periodo}."
-        )
-        mensaje_admin = (
-            f"El alumno ID {alumno_id} realizó un pago de ${monto_pagado:,.2f} "
-            f"para la cuota {cuota.periodo}."
-        )
-
-        notif_alumno = NotificacionPago(
-            alumno_id=alumno_id,
-            cuota_id=cuota.id,
-            tipo="pago_registrado",
-            destinatario="alumno",
-            mensaje=mensaje_alumno
-        )
-        notif_admin = NotificacionPago(
-            alumno_id=alumno_id,
-            cuota_id=cuota.id,
-            tipo="pago_registrado",
-            destinatario="admin",
-            mensaje=mensaje_admin
-        )
+        ))
+        db.add(outbox.evento_pago_registrado(alumno_id, cuota.id, cuota.periodo, monto_pagado))
+        actualizar_estado_cuenta(db, [alumno_id])
 
-        db.add_all([notif_alumno, notif_admin])
+        respuesta = {"message": "Pago registrado y notificaciones enviadas correctamente"}
+        if idempotency_key:
+            idempotencia.registrar(db, usuario_id, idempotency_key, "/pagos/nuevo", huella, 200, respuesta)
         db.commit()
+        outbox.avisar()
+        invalidar_dashboard()
+        if idempotency_key:
+            idempotencia.recordar(usuario_id, idempotency_key, huella, 200, respuesta)
 
-        return {"message": "Pago registrado y notificaciones enviadas correctamente"}
+        return respuesta
 
+    except HTTPException:
+        db.rollback()
+        raise
     except IntegrityError:
         db.rollback()
+        # Otra petición con la misma clave se confirmó primero: se repite su respuesta
+        if idempotency_key:
+            guardada = idempotencia.buscar(db, usuario_id, idempotency_key)
+            if guardada:
+                return idempotencia.repetir(guardada, huella)
         raise HTTPException(status_code=400, detail="Error de integridad al registrar pago")
     except Exception as e:
         db.rollback()
@@ -99,6 +98,65 @@ def nuevo_pago(
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 
+# 📥 ADMIN: Importar pagos desde un archivo de conciliación (CSV o NDJSON)
+@pagos.post("/importar", response_model=ImportacionPagosOut)
+async def importar_pagos(
+    request: Request,
+    formato: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    payload: dict = Depends(solo_admin)
+):
+    """
+    El archivo va como cuerpo crudo de la petición (text/csv o
+    application/x-ndjson) con columnas alumno_id, cuota_id, monto_pagado y
+    opcionales metodo y comprobante. Se lee por partes y se confirma cada
+    lote de IMPORTACION_LOTE filas; la respuesta detalla el resultado de
+    cada línea. Cada lote corre en el threadpool con su propia sesión.
+    """
+    inicio = time.perf_counter()
+    if formato is None:
+        formato = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+    lector = importacion.LECTORES[formato]()
+    registrado_por = int(payload["sub"])
+
+    resultados = []
+    lote = []
+    async for numero, texto in importacion.lineas(request.stream()):
+        if not texto:
+            continue
+        try:
+            datos = lector.leer(texto)
+            if datos is None:
+                continue
+            lote.append(importacion.validar(numero, datos))
+        except ValueError as e:
+            # Sin encabezado válido no se puede interpretar ninguna fila
+            if formato == "csv" and lector.columnas is None:
+                raise HTTPException(status_code=400, detail=str(e))
+            resultados.append(importacion.resultado(numero, "rechazado", str(e)))
+            continue
+        if len(lote) >= importacion.IMPORTACION_LOTE:
+            resultados.extend(await run_in_threadpool(importacion.procesar_lote_con_sesion, lote, registrado_por))
+            lote = []
+    if lote:
+        resultados.extend(await run_in_threadpool(importacion.procesar_lote_con_sesion, lote, registrado_por))
+
+    outbox.avisar()
+    invalidar_dashboard()
+
+    resultados.sort(key=lambda r: r["linea"])
+    aplicados = [r for r in resultados if r["estado"] == "aplicado"]
+    return {
+        "formato": formato,
+        "procesadas": len(resultados),
+        "aplicadas": len(aplicados),
+        "rechazadas": sum(1 for r in resultados if r["estado"] == "rechazado"),
+        "duplicadas": sum(1 for r in resultados if r["estado"] == "duplicado"),
+        "monto_aplicado": float(sum(r["monto"] for r in aplicados)),
+        "tiempo_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        "resultados": resultados,
+    }
+
+
 # 📌 ADMIN: Eliminar pago y registrar en historial
 @pagos.delete("/eliminar/{pago_id}")
 def eliminar_pago(
@@ -107,7 +165,8 @@ def eliminar_pago(
     db: Session = Depends(get_db),
     payload: dict = Depends(solo_admin)
 ):
-    pago_obj = db.query(Pago).filter_by(id=pago_id).first()
+    # Bloquear el pago: si dos admins lo eliminan a la vez, el segundo ya no lo encuentra
+    pago_obj = db.query(Pago).filter_by(id=pago_id).with_for_update().first()
     if not pago_obj:
         raise HTTPException(status_code=404, detail="Pago no encontrado")
 
@@ -118,30 +177,20 @@ def eliminar_pago(
         registro = PagoEliminado(pago=pago_obj, eliminado_por=payload["sub"], motivo=motivo)
         db.add(registro)
 
-        # Ajustar saldo en la cuota
-        cuota = db.query(Cuota).filter_by(id=pago_obj.cuota_id).first()
-        if cuota:
-            cuota.monto_pagado -= pago_obj.monto_pagado
-            cuota.saldo_pendiente = max(0, float(cuota.monto_a_pagar) - float(cuota.monto_pagado))
-            cuota.estado = "pendiente" if cuota.monto_pagado <= 0 else "parcial"
-
-        # 🔔 Registrar notificación por eliminación
-        mensaje_admin = (
-            f"Se eliminó el pago ID {pago_obj.id} del alumno ID {pago_obj.alumno_id}. "
-            f"Monto: ${float(pago_obj.monto_pagado):,.2f}. Motivo: {motivo or 'No especificado'}."
-        )
-        notif = NotificacionPago(
-            alumno_id=pago_obj.alumno_id,
-            cuota_id=pago_obj.cuota_id,
-            tipo="pago_eliminado",
-            destinatario="admin",
-            mensaje=mensaje_admin
-        )
-        db.add(notif)
+        # Revertir el monto en la cuota con un UPDATE atómico
+        db.execute(aplicar_pago(pago_obj.cuota_id, -Decimal(pago_obj.monto_pagado)))
+        actualizar_estado_cuenta(db, [pago_obj.alumno_id])
+
+        # 🔔 La notificación por eliminación la genera el worker del outbox
+        db.add(outbox.evento_pago_eliminado(
+            pago_obj.id, pago_obj.alumno_id, pago_obj.cuota_id, pago_obj.monto_pagado, motivo
+        ))
 
         # Eliminar el pago original
         db.delete(pago_obj)
         db.commit()
+        outbox.avisar()
+        invalidar_dashboard()
         return {"message": "Pago eliminado, registrado y notificado"}
 
     except Exception as e:
@@ -153,7 +202,7 @@ def eliminar_pago(
 # 📜 ADMIN: Ver historial de pagos eliminados
 @pagos.get("/eliminados", response_model=List[PagoEliminadoOut])
 def listar_pagos_eliminados(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     payload: dict = Depends(solo_admin)
 ):
     registros = (
@@ -191,30 +240,14 @@ def obtener_ultimo_pago(
 # 👤 ALUMNO: Ver sus propios pagos
 @pagos.get("/mis", response_model=List[PagoOut])
 def ver_mis_pagos(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     payload: dict = Depends(obtener_usuario_desde_token)
 ):
     if payload["type"] != "Alumno":
         raise HTTPException(status_code=403, detail="Solo los alumnos pueden ver sus pagos")
 
-    pagos_alumno = (
-        db.query(Pago)
-        .options(joinedload(Pago.cuota))
-        .filter(Pago.alumno_id == int(payload["sub"]))
-        .order_by(Pago.fecha_pago.desc())
-        .all()
-    )
-
-    return [
-        {
-            "id": p.id,
-            "monto_pagado": float(p.monto_pagado),
-            "fecha_pago": p.fecha_pago.strftime("%Y-%m-%d"),
-            "metodo": p.metodo,
-            "periodo": p.cuota.periodo if p.cuota else "Sin período"
-        }
-        for p in pagos_alumno
-    ]
+    filas = db.execute(consulta_mis_pagos(int(payload["sub"]))).all()
+    return respuesta_lista(LISTA_PAGOS, filas)
 
 
 # ⚙️ ADMIN: Editar pago parcialmente
@@ -234,4 +267,5 @@ def editar_pago_parcial(
             setattr(pago_existente, campo, valor)
 
     db.commit()
+    invalidar_dashboard()
     return {"message": "Pago actualizado correctamente"}
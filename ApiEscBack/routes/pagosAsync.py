@@ -0,0 +1,143 @@
+# routes/pagosAsync.py
+# Versiones asíncronas (AsyncSession) de las rutas más usadas de /pagos.
+# Solo se registran con DB_ASYNC=1; el resto de /pagos sigue en routes/pagos.py.
+from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from decimal import Decimal
+from typing import List, Optional
+
+from config.db import get_async_db
+from config.replicas import get_async_db_lectura
+from auth.seguridad import obtener_usuario_desde_token, solo_admin
+from models.pago import Pago
+from models.user import User
+from models.pagoEliminado import PagoEliminado
+from schemas.pago import PagoBase, PagoOut, PagoEliminadoOut
+from schemas.adaptadores import LISTA_PAGOS, respuesta_lista
+from services.pagos import aplicar_pago, consulta_mis_pagos
+from services.estadoCuenta import actualizar_estado_cuenta_async
+from services.dashboard import invalidar_dashboard
+from services import idempotencia, outbox
+
+
+pagos_async = APIRouter(prefix="/pagos", tags=["Pagos"])
+
+# 📌 ADMIN o ALUMNO: Registrar nuevo pago flexible (con notificación)
+@pagos_async.post("/nuevo", response_model=dict)
+async def nuevo_pago(
+    data: PagoBase,
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(obtener_usuario_desde_token),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100)
+):
+    if payload["type"] not in ["Admin", "Alumno"]:
+        raise HTTPException(status_code=403, detail="No autorizado para registrar pagos")
+
+    usuario_id = int(payload["sub"])
+    huella = idempotencia.huella(data.model_dump())
+    if idempotency_key:
+        guardada = await idempotencia.buscar_async(db, usuario_id, idempotency_key)
+        if guardada:
+            return idempotencia.repetir(guardada, huella)
+
+    try:
+        alumno_id = data.alumno_id or int(payload["sub"])
+        monto_pagado = float(data.monto_pagado)
+
+        # Aplicar el pago en la base con un único UPDATE ... RETURNING
+        cuota = (await db.execute(
+            aplicar_pago(data.cuota_id, Decimal(str(monto_pagado)), alumno_id)
+        )).first()
+        if not cuota:
+            raise HTTPException(status_code=404, detail="Cuota no encontrada o con el saldo pasado al período siguiente")
+
+        # Registrar el pago y el evento de notificación en la misma transacción
+        db.add(Pago(
+            alumno_id=alumno_id,
+            cuota_id=cuota.id,
+            monto_pagado=monto_pagado,
+            metodo=data.metodo,
+            comprobante=data.comprobante,
+            registrado_por=payload["sub"]
+        ))
+        db.add(outbox.evento_pago_registrado(alumno_id, cuota.id, cuota.periodo, monto_pagado))
+        await actualizar_estado_cuenta_async(db, [alumno_id])
+
+        respuesta = {"message": "Pago registrado y notificaciones enviadas correctamente"}
+        if idempotency_key:
+            idempotencia.registrar(db, usuario_id, idempotency_key, "/pagos/nuevo", huella, 200, respuesta)
+        await db.commit()
+        outbox.avisar()
+        invalidar_dashboard()
+        if idempotency_key:
+            idempotencia.recordar(usuario_id, idempotency_key, huella, 200, respuesta)
+
+        return respuesta
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except IntegrityError:
+        await db.rollback()
+        # Otra petición con la misma clave se confirmó primero: se repite su respuesta
+        if idempotency_key:
+            guardada = await idempotencia.buscar_async(db, usuario_id, idempotency_key)
+            if guardada:
+                return idempotencia.repetir(guardada, huella)
+        raise HTTPException(status_code=400, detail="Error de integridad al registrar pago")
+    except Exception as e:
+        await db.rollback()
+        print("Error en nuevo pago:", e)
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+
+# 📜 ADMIN: Ver historial de pagos eliminados
+@pagos_async.get("/eliminados", response_model=List[PagoEliminadoOut])
+async def listar_pagos_eliminados(
+    db: AsyncSession = Depends(get_async_db_lectura),
+    payload: dict = Depends(solo_admin)
+):
+    registros = await db.execute(
+        select(PagoEliminado).order_by(PagoEliminado.fecha_eliminacion.desc())
+    )
+    return registros.scalars().all()
+
+
+# 📊 ADMIN: Ver último pago registrado
+@pagos_async.get("/ultimo", response_model=dict)
+async def obtener_ultimo_pago(
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(solo_admin)
+):
+    ultimo = (await db.execute(
+        select(Pago)
+        .options(selectinload(Pago.alumno).selectinload(User.userdetail))
+        .order_by(Pago.id.desc())
+        .limit(1)
+    )).scalar_one_or_none()
+
+    if not ultimo:
+        raise HTTPException(status_code=404, detail="No hay pagos registrados")
+
+    return {
+        "alumno": f"{ultimo.alumno.userdetail.firstName} {ultimo.alumno.userdetail.lastName}",
+        "monto_pagado": float(ultimo.monto_pagado),
+        "fecha_pago": ultimo.fecha_pago.strftime("%Y-%m-%d %H:%M"),
+        "metodo": ultimo.metodo,
+    }
+
+
+# 👤 ALUMNO: Ver sus propios pagos
+@pagos_async.get("/mis", response_model=List[PagoOut])
+async def ver_mis_pagos(
+    db: AsyncSession = Depends(get_async_db_lectura),
+    payload: dict = Depends(obtener_usuario_desde_token)
+):
+    if payload["type"] != "Alumno":
+        raise HTTPException(status_code=403, detail="Solo los alumnos pueden ver sus pagos")
+
+    filas = (await db.execute(consulta_mis_pagos(int(payload["sub"])))).all()
+    return respuesta_lista(LISTA_PAGOS, filas)
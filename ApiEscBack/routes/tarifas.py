@@ -2,9 +2,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from config.db import get_db
+from config.replicas import get_db_lectura
 from models.tarifa import Tarifa
 from schemas.tarifa import TarifaBase, TarifaCreate, TarifaOut
-from typing import List
+from services.tarifas import obtener_tarifa, invalidar_tarifas
+from typing import List, Optional
 from datetime import date
 
 tarifas = APIRouter(prefix="/tarifas", tags=["Tarifas"])
@@ -20,24 +22,18 @@ def crear_tarifa(data: TarifaCreate, db: Session = Depends(get_db)):
     db.add(tarifa)
     db.commit()
     db.refresh(tarifa)
+    invalidar_tarifas()
     return tarifa
 
 
 @tarifas.get("/vigente", response_model=TarifaOut)
-def obtener_tarifa_vigente(db: Session = Depends(get_db)):
-    hoy = date.today()
-    tarifa = (
-        db.query(Tarifa)
-        .filter(Tarifa.vigente_desde <= hoy)
-        .filter((Tarifa.vigente_hasta == None) | (Tarifa.vigente_hasta >= hoy))
-        .order_by(Tarifa.vigente_desde.desc())
-        .first()
-    )
+def obtener_tarifa_vigente(fecha: Optional[date] = None, db: Session = Depends(get_db)):
+    tarifa = obtener_tarifa(db, fecha)
     if not tarifa:
         raise HTTPException(status_code=404, detail="No hay tarifa vigente registrada")
     return tarifa
 
 
 @tarifas.get("/", response_model=List[TarifaOut])
-def listar_tarifas(db: Session = Depends(get_db)):
+def listar_tarifas(db: Session = Depends(get_db_lectura)):
     return db.query(Tarifa).order_by(Tarifa.vigente_desde.desc()).all()
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select, update
 from sqlalchemy.orm import joinedload, Session
-from config.db import get_db
+from config.db import get_db, SessionLocal
+from config.replicas import get_db_lectura
 from auth.seguridad import obtener_usuario_desde_token, Seguridad, solo_admin
+from auth.passwords import hashear_password_async, verificar_password_async
 from models.user import User
 from models.userDetail import UserDetail
 from models.pago import Pago
@@ -11,9 +15,15 @@ from schemas.user import (
     InputUser,
     UserOut,
     PaginatedUsersOut,
-    PaginatedFilteredBody
+    PaginatedFilteredBody,
+    BusquedaUsuariosBody,
+    BusquedaUsuariosOut
 )
-from typing import List
+from schemas.adaptadores import PERFIL_USUARIO, RespuestaJSON, dumps, json_objeto
+from services.busqueda import buscar_usuarios, invalidar_indice_busqueda
+from services.dashboard import invalidar_dashboard
+from services.perfiles import cache_perfiles, invalidar_perfil, respuesta_perfil
+from typing import List, Optional
 
 user = APIRouter(prefix="/user", tags=["User"])
 
@@ -21,22 +31,30 @@ user = APIRouter(prefix="/user", tags=["User"])
 @user.get("/profile", response_model=UserOut)
 def get_own_profile(
     payload: dict = Depends(obtener_usuario_desde_token),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
     Devuelve el perfil completo del usuario autenticado (User + UserDetail).
+    Sale de la caché de perfiles con ETag: si el cliente ya tiene esa
+    versión responde 304 sin tocar la base.
     """
     try:
         user_id = int(payload.get("sub"))
-        db_user = (
-            db.query(User)
-            .options(joinedload(User.userdetail))
-            .filter(User.id == user_id)
-            .first()
-        )
-        if not db_user:
-            raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        return db_user
+        guardado, version = cache_perfiles.obtener("perfil", user_id)
+        if guardado is None:
+            db_user = (
+                db.query(User)
+                .options(joinedload(User.userdetail))
+                .filter(User.id == user_id)
+                .first()
+            )
+            if not db_user:
+                raise HTTPException(status_code=404, detail="Usuario no encontrado")
+            guardado = cache_perfiles.guardar("perfil", user_id, json_objeto(PERFIL_USUARIO, db_user), version)
+        return respuesta_perfil(guardado, if_none_match)
+    except HTTPException:
+        raise
     except Exception as e:
         print("Error:", e)
         raise HTTPException(status_code=500, detail="Error al obtener perfil")
@@ -47,7 +65,7 @@ def get_own_profile(
 def get_users_paginated_filtered_sync(
     body: PaginatedFilteredBody,
     payload: dict = Depends(solo_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Retorna una lista paginada y filtrada de usuarios.
@@ -91,67 +109,138 @@ def get_users_paginated_filtered_sync(
         raise HTTPException(status_code=500, detail="Error al obtener usuarios")
 
 
+#  Buscador de usuarios por relevancia (solo Admin)
+@user.post("/buscar", response_model=BusquedaUsuariosOut)
+def buscar(
+    body: BusquedaUsuariosBody,
+    payload: dict = Depends(solo_admin),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Busca por username, email, nombre, apellido o DNI y ordena por relevancia.
+    En PostgreSQL usa los índices pg_trgm; en otras bases, un índice de prefijos en memoria.
+    """
+    limit = min(body.limit or 20, 100)
+    try:
+        ranking = buscar_usuarios(db, body.q, limit)
+        if not ranking:
+            return {"users": []}
+
+        ids = [user_id for user_id, _ in ranking]
+        por_id = {
+            u.id: u
+            for u in db.query(User)
+            .options(joinedload(User.userdetail))
+            .filter(User.id.in_(ids))
+        }
+        return {
+            "users": [
+                {**UserOut.model_validate(por_id[user_id]).model_dump(), "relevancia": relevancia}
+                for user_id, relevancia in ranking
+                if user_id in por_id
+            ]
+        }
+
+    except Exception as e:
+        print("Error en búsqueda de usuarios:", e)
+        raise HTTPException(status_code=500, detail="Error al buscar usuarios")
+
+
 #  Crear usuario con detalles completos (solo Admin)
 @user.post("/register/full")
-def crear_usuario_completo(
+async def crear_usuario_completo(
     user: InputUser,
-    payload: dict = Depends(obtener_usuario_desde_token),
-    db: Session = Depends(get_db)
+    payload: dict = Depends(obtener_usuario_desde_token)
 ):
     """
     Crea un nuevo usuario con su correspondiente UserDetail.
     Solo el administrador puede realizar esta acción.
+    El hash corre en el pool del KDF; la escritura, en un solo paso por el
+    threadpool con su propia sesión.
     """
     if payload["type"] != "Admin":
         raise HTTPException(status_code=403, detail="No tienes permiso para registrar usuarios")
 
-    try:
-        existing_username = db.query(User).filter(User.username == user.username).first()
-        existing_email = db.query(UserDetail).filter(UserDetail.email == user.email).first()
-
-        if existing_username:
-            raise HTTPException(status_code=400, detail="El usuario ya existe")
-        if existing_email:
-            raise HTTPException(status_code=400, detail="El email ya existe")
-
-        # Crear usuario base
-        new_user = User(username=user.username, password=user.password)
-        db.add(new_user)
-        db.flush()  # 🔹 genera el ID del usuario
-
-        # Crear detalle asociado
-        new_detail = UserDetail(
-            dni=user.dni,
-            firstName=user.firstName,
-            lastName=user.lastName,
-            type=user.type,
-            email=user.email,
-            user_id=new_user.id
-        )
+    password_hash = await hashear_password_async(user.password)
+    await run_in_threadpool(_registrar_usuario, user, password_hash)
+    invalidar_indice_busqueda()
+    invalidar_dashboard()
+
+    return {"msg": "Usuario registrado correctamente"}
+
+
+def _registrar_usuario(user: InputUser, password_hash: str):
+    with SessionLocal() as db:
+        try:
+            existing_username = db.query(User).filter(User.username == user.username).first()
+            existing_email = db.query(UserDetail).filter(UserDetail.email == user.email).first()
+
+            if existing_username:
+                raise HTTPException(status_code=400, detail="El usuario ya existe")
+            if existing_email:
+                raise HTTPException(status_code=400, detail="El email ya existe")
+
+            # Crear usuario base
+            new_user = User(username=user.username, password=password_hash)
+            db.add(new_user)
+            db.flush()  # 🔹 genera el ID del usuario
+
+            # Crear detalle asociado
+            new_detail = UserDetail(
+                dni=user.dni,
+                firstName=user.firstName,
+                lastName=user.lastName,
+                type=user.type,
+                email=user.email,
+                user_id=new_user.id
+            )
 
-        db.add(new_detail)
-        db.commit()
-        db.refresh(new_user)
+            db.add(new_detail)
+            db.commit()
 
-        return {"msg": "Usuario registrado correctamente"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            db.rollback()
+            print("Error al registrar usuario:", e)
+            raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
 
-    except Exception as e:
-        db.rollback()
-        print("Error al registrar usuario:", e)
-        raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
+
+def _buscar_para_login(username: str):
+    # Sesión propia que se cierra al volver: el usuario queda desprendido con
+    # sus columnas y el detalle ya cargados, sin lecturas perezosas pendientes
+    with SessionLocal() as db:
+        return (
+            db.query(User)
+            .options(joinedload(User.userdetail))
+            .filter(User.username == username)
+            .first()
+        )
+
+
+def _guardar_hash(user_id: int, password_hash: str):
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(password=password_hash))
+        db.commit()
 
 
 #  Login de usuario
 @user.post("/loginUser")
-def login_post(userIn: InputLogin, db: Session = Depends(get_db)):
+async def login_post(userIn: InputLogin):
     """
     Autentica a un usuario y devuelve un token JWT,
     sincronizando la respuesta con el formato esperado por el Frontend.
+    La verificación del hash corre en el pool del KDF: ningún hilo del
+    threadpool de rutas queda esperándola. Cada paso por la base usa su
+    propia sesión.
     """
     try:
-        user = db.query(User).filter(User.username == userIn.username).first()
-        
-        if not user or user.password != userIn.password:
+        user = await run_in_threadpool(_buscar_para_login, userIn.username)
+        valida, nuevo_hash = await verificar_password_async(
+            user.password if user else None, userIn.password
+        )
+
+        if not valida:
             # CORRECCIÓN 1: Usar "status": "error"
             return JSONResponse(
                 status_code=401, 
@@ -161,6 +250,10 @@ def login_post(userIn: InputLogin, db: Session = Depends(get_db)):
                 }
             )
 
+        # Contraseña heredada o con costo viejo: se guarda con el hash actual
+        if nuevo_hash:
+            await run_in_threadpool(_guardar_hash, user.id, nuevo_hash)
+
         token = Seguridad.generar_token(user)
         if not token:
             # CORRECCIÓN 2: Usar "status": "error"
@@ -191,38 +284,114 @@ def login_post(userIn: InputLogin, db: Session = Depends(get_db)):
             }
         )
 
+# 🚪 Cerrar sesión: revoca el token con el que se hizo la petición
+@user.post("/logout")
+def logout(
+    authorization: str = Header(...),
+    payload: dict = Depends(obtener_usuario_desde_token)
+):
+    """
+    Revoca el token actual: este worker lo rechaza de inmediato y los
+    demás dentro de TOKEN_REVOCACION_SYNC segundos.
+    """
+    Seguridad.revocar_token(authorization.split(" ")[-1])
+    return {"msg": "Sesión cerrada correctamente"}
+
+# Columnas del listado de alumnos: se leen como tuplas, sin hidratar User/UserDetail
+COLUMNAS_ALUMNO = (
+    User.id,
+    User.username,
+    UserDetail.firstName,
+    UserDetail.lastName,
+    UserDetail.email,
+    UserDetail.dni,
+)
+ALUMNOS_POR_LOTE = 1000
+
+
+def consulta_alumnos(limit: Optional[int] = None, after_id: Optional[int] = None):
+    """Un único SELECT con JOIN para todo el listado, ordenado por id para paginar por cursor."""
+    q = (
+        select(*COLUMNAS_ALUMNO)
+        .join(UserDetail, UserDetail.user_id == User.id)
+        .where(UserDetail.type == "Alumno")
+        .order_by(User.id)
+    )
+    if after_id:
+        q = q.where(User.id > after_id)
+    if limit:
+        q = q.limit(limit)
+    return q
+
+
+def alumno_dict(fila) -> dict:
+    return {
+        "id": fila.id,
+        "username": fila.username,
+        "userdetail": {
+            "firstName": fila.firstName,
+            "lastName": fila.lastName,
+            "email": fila.email,
+            "dni": fila.dni
+        }
+    }
+
+
+def respuesta_alumnos(alumnos: List[dict], limit: Optional[int]) -> RespuestaJSON:
+    """
+    El cuerpo sigue siendo el array de siempre; si la página vino completa,
+    el cursor para pedir la siguiente va en la cabecera X-Next-Cursor.
+    """
+    respuesta = RespuestaJSON(content=alumnos)
+    if limit and len(alumnos) == limit:
+        respuesta.headers["X-Next-Cursor"] = str(alumnos[-1]["id"])
+    return respuesta
+
+
+def _stream_alumnos(after_id: Optional[int]):
+    """
+    Emite el array JSON a medida que se leen los lotes. Usa su propia
+    sesión porque el cuerpo se envía después de que terminan las dependencias.
+    """
+    db = SessionLocal()
+    try:
+        resultado = db.execute(
+            consulta_alumnos(after_id=after_id)
+            .execution_options(stream_results=True, yield_per=ALUMNOS_POR_LOTE)
+        )
+        separador = b"["
+        for lote in resultado.partitions():
+            # Un solo dumps por lote, sin los corchetes del array
+            yield separador + dumps([alumno_dict(fila) for fila in lote])[1:-1]
+            separador = b","
+        yield b"[]" if separador == b"[" else b"]"
+    finally:
+        db.close()
+
+
 # 👨‍🎓 Obtener todos los alumnos (solo Admin)
 @user.get("/alumnos")
 def obtener_alumnos(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=1),
+    stream: bool = False,
     payload: dict = Depends(solo_admin),
     db: Session = Depends(get_db)
 ):
     """
-    Devuelve una lista de todos los alumnos registrados.
+    Devuelve los alumnos registrados con una sola consulta.
+    Sin parámetros devuelve todos; con `limit` pagina por cursor
+    (`after_id` = valor de X-Next-Cursor de la página anterior) y con
+    `stream=true` envía el array completo por partes, con memoria constante.
     """
+    if stream:
+        return StreamingResponse(_stream_alumnos(after_id), media_type="application/json")
     try:
-        alumnos = (
-            db.query(User)
-            .join(UserDetail)
-            .filter(UserDetail.type == "Alumno")
-            .all()
-        )
-        return [
-            {
-                "id": a.id,
-                "username": a.username,
-                "userdetail": {
-                    "firstName": a.userdetail.firstName,
-                    "lastName": a.userdetail.lastName,
-                    "email": a.userdetail.email,
-                    "dni": a.userdetail.dni
-                }
-            }
-            for a in alumnos
-        ]
+        alumnos = [alumno_dict(fila) for fila in db.execute(consulta_alumnos(limit, after_id))]
     except Exception as e:
         print("Error al obtener alumnos:", e)
         raise HTTPException(status_code=500, detail="Error al obtener alumnos")
+    return respuesta_alumnos(alumnos, limit)
 
 # 🕐 Obtener el último usuario registrado (solo Admin)
 @user.get("/ultimo")
@@ -269,7 +438,7 @@ def eliminar_usuario(
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
         # Borrar pagos asociados
-        pagos = db.query(Pago).filter(Pago.user_id == user_id).all()
+        pagos = db.query(Pago).filter(Pago.alumno_id == user_id).all()
         for pago in pagos:
             db.delete(pago)
 
@@ -280,6 +449,9 @@ def eliminar_usuario(
         # Borrar usuario base
         db.delete(db_user)
         db.commit()
+        invalidar_indice_busqueda()
+        invalidar_dashboard()
+        invalidar_perfil(user_id)
 
         return {"msg": "Usuario y datos asociados eliminados correctamente"}
 
@@ -0,0 +1,190 @@
+# routes/userAsync.py
+# Versiones asíncronas (AsyncSession) de las rutas más usadas de /user.
+# Solo se registran con DB_ASYNC=1; el resto de /user sigue en routes/user.py.
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from config.db import get_async_db, AsyncSessionLocal
+from config.replicas import get_async_db_lectura
+from auth.seguridad import obtener_usuario_desde_token, Seguridad, solo_admin
+from auth.passwords import verificar_password_async
+from models.user import User
+from models.userDetail import UserDetail
+from schemas.user import (
+    InputLogin,
+    UserOut,
+    PaginatedUsersOut,
+    PaginatedFilteredBody
+)
+from routes.user import ALUMNOS_POR_LOTE, alumno_dict, consulta_alumnos, respuesta_alumnos
+from schemas.adaptadores import PERFIL_USUARIO, dumps, json_objeto
+from services.perfiles import cache_perfiles, respuesta_perfil
+from typing import Optional
+
+user_async = APIRouter(prefix="/user", tags=["User"])
+
+# 📌 Obtener perfil del usuario autenticado
+@user_async.get("/profile", response_model=UserOut)
+async def get_own_profile(
+    payload: dict = Depends(obtener_usuario_desde_token),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Devuelve el perfil completo del usuario autenticado (User + UserDetail).
+    Sale de la caché de perfiles con ETag, igual que la versión síncrona.
+    """
+    user_id = int(payload.get("sub"))
+    guardado, version = cache_perfiles.obtener("perfil", user_id)
+    if guardado is None:
+        db_user = (await db.execute(
+            select(User)
+            .options(selectinload(User.userdetail))
+            .where(User.id == user_id)
+        )).scalar_one_or_none()
+        if not db_user:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        guardado = cache_perfiles.guardar("perfil", user_id, json_objeto(PERFIL_USUARIO, db_user), version)
+    return respuesta_perfil(guardado, if_none_match)
+
+
+#  Listado paginado y filtrado de usuarios (solo Admin)
+@user_async.post("/paginated/filtered-sync", response_model=PaginatedUsersOut)
+async def get_users_paginated_filtered(
+    body: PaginatedFilteredBody,
+    payload: dict = Depends(solo_admin),
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """
+    Retorna una lista paginada y filtrada de usuarios.
+    Permite filtrar por nombre, email, username, etc.
+    """
+    limit = body.limit or 20
+    last_seen_id = body.last_seen_id or 0
+    search = (body.search or "").strip()
+
+    try:
+        q = (
+            select(User)
+            .outerjoin(User.userdetail)
+            .options(selectinload(User.userdetail))
+        )
+
+        if search:
+            like = f"%{search}%"
+            q = q.where(
+                (User.username.ilike(like)) |
+                (UserDetail.email.ilike(like)) |
+                (UserDetail.firstName.ilike(like)) |
+                (UserDetail.lastName.ilike(like))
+            )
+
+        if last_seen_id > 0:
+            q = q.where(User.id > last_seen_id)
+
+        users_db = (await db.execute(q.order_by(User.id.asc()).limit(limit))).scalars().all()
+        next_cursor = users_db[-1].id if users_db else None
+
+        return {
+            "users": users_db,
+            "next_cursor": next_cursor
+        }
+
+    except Exception as e:
+        print("Error:", e)
+        raise HTTPException(status_code=500, detail="Error al obtener usuarios")
+
+
+#  Login de usuario
+@user_async.post("/loginUser")
+async def login_post(userIn: InputLogin, db: AsyncSession = Depends(get_async_db)):
+    """
+    Autentica a un usuario y devuelve un token JWT.
+    """
+    try:
+        user = (await db.execute(
+            select(User)
+            .options(selectinload(User.userdetail))
+            .where(User.username == userIn.username)
+        )).scalar_one_or_none()
+
+        valida, nuevo_hash = await verificar_password_async(
+            user.password if user else None, userIn.password
+        )
+
+        if not valida:
+            return JSONResponse(
+                status_code=401,
+                content={
+                    "status": "error",
+                    "message": "Usuario o contraseña incorrectos"
+                }
+            )
+
+        if nuevo_hash:
+            user.password = nuevo_hash
+            await db.commit()
+
+        token = Seguridad.generar_token(user)
+        if not token:
+            return JSONResponse(
+                status_code=401,
+                content={
+                    "status": "error",
+                    "message": "Error al generar el token"
+                }
+            )
+
+        return JSONResponse(status_code=200, content={
+            "status": "success",
+            "token": token,
+            "user": {"type": user.userdetail.type if user.userdetail else None}
+        })
+
+    except Exception as e:
+        print("Error en login:", e)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": "Error interno del servidor"
+            }
+        )
+
+async def _stream_alumnos(after_id: Optional[int]):
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(
+            consulta_alumnos(after_id=after_id)
+            .execution_options(yield_per=ALUMNOS_POR_LOTE)
+        )
+        separador = b"["
+        async for lote in resultado.partitions():
+            # Un solo dumps por lote, sin los corchetes del array
+            yield separador + dumps([alumno_dict(fila) for fila in lote])[1:-1]
+            separador = b","
+        yield b"[]" if separador == b"[" else b"]"
+
+
+# 👨‍🎓 Obtener todos los alumnos (solo Admin)
+@user_async.get("/alumnos")
+async def obtener_alumnos(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=1),
+    stream: bool = False,
+    payload: dict = Depends(solo_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Devuelve los alumnos registrados con una sola consulta.
+    Mismos parámetros que la versión síncrona (limit/after_id, stream).
+    """
+    if stream:
+        return StreamingResponse(_stream_alumnos(after_id), media_type="application/json")
+    try:
+        alumnos = [alumno_dict(fila) for fila in await db.execute(consulta_alumnos(limit, after_id))]
+    except Exception as e:
+        print("Error al obtener alumnos:", e)
+        raise HTTPException(status_code=500, detail="Error al obtener alumnos")
+    return respuesta_alumnos(alumnos, limit)
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 from config.db import get_db
 from models.userDetail import UserDetail
 from schemas.userDetail import InputUserDetail, UserDetailUpdate, UserDetailOut
 from auth.seguridad import obtener_usuario_desde_token, solo_admin
-from typing import List
+from schemas.adaptadores import DETALLE_USUARIO, json_objeto
+from services.busqueda import invalidar_indice_busqueda
+from services.perfiles import cache_perfiles, invalidar_perfil, respuesta_perfil
+from typing import List, Optional
 
 user_detail = APIRouter(prefix="/userdetail", tags=["UserDetail"])
 
@@ -13,13 +16,18 @@ user_detail = APIRouter(prefix="/userdetail", tags=["UserDetail"])
 @user_detail.get("/me", response_model=UserDetailOut)
 def obtener_mi_detalle(
     payload: dict = Depends(obtener_usuario_desde_token),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     user_id = int(payload.get("sub"))
-    detalle = db.query(UserDetail).filter(UserDetail.user_id == user_id).first()
-    if not detalle:
-        raise HTTPException(status_code=404, detail="No se encontró detalle del usuario")
-    return detalle
+    # Con el mismo ETag que ya tiene el cliente se responde 304 sin ir a la base
+    guardado, version = cache_perfiles.obtener("detalle", user_id)
+    if guardado is None:
+        detalle = db.query(UserDetail).filter(UserDetail.user_id == user_id).first()
+        if not detalle:
+            raise HTTPException(status_code=404, detail="No se encontró detalle del usuario")
+        guardado = cache_perfiles.guardar("detalle", user_id, json_objeto(DETALLE_USUARIO, detalle), version)
+    return respuesta_perfil(guardado, if_none_match)
 
 # Obtener un detalle por ID (solo Admin/Preceptor)
 @user_detail.get("/{user_id}", response_model=UserDetailOut)
@@ -58,6 +66,8 @@ def actualizar_detalle(
 
     db.commit()
     db.refresh(detalle)
+    invalidar_indice_busqueda()
+    invalidar_perfil(user_id)
     return {"msg": "Actualizado correctamente"}
 
 # Crear un detalle (solo Admin)
@@ -79,6 +89,9 @@ def crear_detalle(
     db.add(nuevo_detalle)
     db.commit()
     db.refresh(nuevo_detalle)
+    invalidar_indice_busqueda()
+    if nuevo_detalle.user_id is not None:
+        invalidar_perfil(nuevo_detalle.user_id)
     return nuevo_detalle
 
 # Eliminar un detalle (solo Admin)
@@ -94,4 +107,6 @@ def eliminar_detalle(
 
     db.delete(detalle)
     db.commit()
+    invalidar_indice_busqueda()
+    invalidar_perfil(user_id)
     return {"msg": "Detalle eliminado"}
@@ -0,0 +1,84 @@
+"""
+Serialización rápida de respuestas.
+
+Las rutas de listados leen con select(...) columnas cuyos nombres son
+los campos del esquema y devuelven las filas con `respuesta_lista`: cada
+tupla se empareja con los nombres de columna (sin objetos ORM ni dicts
+armados campo por campo) y el TypeAdapter precompilado del esquema la
+valida y la escribe directo a bytes JSON desde el núcleo de pydantic. El
+Response resultante no vuelve a pasar por la validación de
+`response_model`, que queda declarado solo para la documentación.
+
+Las rutas con response_model ya se escriben con pydantic directo a
+bytes; no se cambia la clase de respuesta por defecto de la app porque
+FastAPI solo usa ese camino con la clase por defecto. RespuestaJSON y
+`dumps` (orjson si está instalado) son para los dicts y streams que se
+arman a mano.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Sequence
+import json
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+from sqlalchemy.engine import Row
+
+from schemas.cuota import CuotaOut
+from schemas.notificacionPago import NotificacionPagoOut
+from schemas.pago import PagoOut
+from schemas.user import UserOut
+from schemas.userDetail import UserDetailOut
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional: sin orjson se usa json de la biblioteca estándar
+    orjson = None
+
+
+def _por_defecto(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (date, datetime)):  # solo sin orjson, que ya las escribe en ISO
+        return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} no es serializable a JSON")
+
+
+def dumps(contenido: Any) -> bytes:
+    """JSON compacto en bytes (orjson si está disponible)."""
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        contenido, default=_por_defecto, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Un adaptador por esquema de listado, compilado una sola vez al importar
+LISTA_CUOTAS = TypeAdapter(List[CuotaOut])
+LISTA_PAGOS = TypeAdapter(List[PagoOut])
+LISTA_NOTIFICACIONES = TypeAdapter(List[NotificacionPagoOut])
+PERFIL_USUARIO = TypeAdapter(UserOut)
+DETALLE_USUARIO = TypeAdapter(UserDetailOut)
+
+
+def json_lista(adaptador: TypeAdapter, filas: Sequence[Row]) -> bytes:
+    """
+    Filas de un select a bytes JSON. Pydantic valida un dict bastante más
+    rápido que leyendo atributos de cada Row, de ahí el zip con las claves.
+    """
+    claves = tuple(str(c) for c in filas[0]._fields) if filas else ()
+    return adaptador.dump_json(adaptador.validate_python([dict(zip(claves, f)) for f in filas]))
+
+
+def json_objeto(adaptador: TypeAdapter, objeto: Any) -> bytes:
+    """Un objeto ORM a bytes JSON, leyendo sus atributos como lo haría response_model."""
+    return adaptador.dump_json(adaptador.validate_python(objeto, from_attributes=True))
+
+
+def respuesta_lista(adaptador: TypeAdapter, filas: Sequence[Row], status_code: int = 200) -> Response:
+    return Response(content=json_lista(adaptador, filas), status_code=status_code, media_type="application/json")
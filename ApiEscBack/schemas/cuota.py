@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from datetime import date
-from typing import Optional
+from datetime import date, datetime
+from typing import Optional, Dict, List
 
 class CuotaBase(BaseModel):
     alumno_id: int
@@ -17,4 +17,61 @@ class CuotaOut(CuotaBase):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class GenerarPeriodoIn(BaseModel):
+    """Parámetros para generar las cuotas de un período para todos los alumnos."""
+    periodo: str  # Formato 'YYYY-MM'
+    fecha_vencimiento: date
+
+
+class GenerarPeriodoOut(BaseModel):
+    """Resumen de la generación masiva de cuotas."""
+    periodo: str
+    monto_base: float
+    alumnos: int
+    creadas: int
+    omitidas: int
+    tiempos_ms: Dict[str, float]
+
+
+class PaginatedCuotasOut(BaseModel):
+    """Respuesta del listado paginado de cuotas (cursor por id descendente)"""
+    cuotas: List[CuotaOut]
+    next_cursor: Optional[int] = None
+
+
+class EstadoCuentaOut(BaseModel):
+    """Saldo resumido de un alumno (tabla estado_cuenta)."""
+    alumno_id: int
+    total_adeudado: float = 0
+    total_pagado: float = 0
+    cuotas_vencidas: int = 0
+    periodo_vencido_mas_antiguo: Optional[str] = None
+    actualizado: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class VencimientosOut(BaseModel):
+    """Resultado de una corrida del proceso de vencimientos."""
+    fecha: date
+    vencidas: int
+    con_recargo: int
+    monto_recargos: float
+    alumnos: int
+    duracion_ms: float
+    omitida: bool = False  # otro worker la estaba corriendo o acababa de correrla
+
+
+class EjecucionTareaOut(BaseModel):
+    id: int
+    tarea: str
+    inicio: datetime
+    duracion_ms: float
+    filas: int
+    detalle: Optional[dict] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class UltimoPagoOut(BaseModel):
+    id: int
+    alumno: str
+    monto_pagado: float
+    fecha_pago: str
+    metodo: str
+
+
+class UltimoUsuarioOut(BaseModel):
+    id: int
+    username: str
+    firstName: Optional[str] = None
+    lastName: Optional[str] = None
+
+
+class DashboardAdminOut(BaseModel):
+    """Indicadores del panel de administración."""
+    cuotas_por_estado: Dict[str, int]
+    cuotas_total: int
+    ingresos_mes: float
+    alumnos: int
+    alumnos_morosos: int
+    deuda_vencida: float
+    cuotas_vencidas: int
+    ultimo_pago: Optional[UltimoPagoOut] = None
+    ultimo_usuario: Optional[UltimoUsuarioOut] = None
+    generado: datetime
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 class NotificacionPagoBase(BaseModel):
@@ -21,6 +21,21 @@ class NotificacionPagoOut(NotificacionPagoBase):
     # 🔹 Campos adicionales para mostrar más info en el frontend
     alumno_nombre: Optional[str] = None
     periodo: Optional[str] = None
+    leida: bool = False
+    leida_en: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class RecordatoriosResumenOut(BaseModel):
+    """Resumen de una corrida de recordatorios de vencimiento."""
+    desde: date
+    hasta: date
+    cuotas: int
+    notificaciones: int
+
+
+class NoLeidasOut(BaseModel):
+    """Pendientes de la bandeja después de marcar (o al consultar el contador)."""
+    no_leidas: int
+    marcadas: int = 0
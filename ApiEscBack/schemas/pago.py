@@ -62,3 +62,24 @@ class PagoEliminadoOut(BaseModel):
 class PagoEliminadoDetailOut(PagoEliminadoOut):
     alumno_nombre: Optional[str]
     eliminado_por_nombre: Optional[str]
+
+
+# 📥📤 Importación masiva de pagos (conciliación)
+
+class ResultadoImportacionOut(BaseModel):
+    linea: int
+    estado: str  # aplicado, rechazado, duplicado
+    pago_id: Optional[int] = None
+    monto: Optional[float] = None
+    detalle: Optional[str] = None
+
+
+class ImportacionPagosOut(BaseModel):
+    formato: str
+    procesadas: int
+    aplicadas: int
+    rechazadas: int
+    duplicadas: int
+    monto_aplicado: float
+    tiempo_ms: float
+    resultados: List[ResultadoImportacionOut]
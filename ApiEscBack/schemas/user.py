@@ -39,4 +39,18 @@ class PaginatedUsersOut(BaseModel):
     next_cursor: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BusquedaUsuariosBody(BaseModel):
+    """Cuerpo del buscador de usuarios del panel admin"""
+    q: str
+    limit: Optional[int] = 20
+
+
+class UserBusquedaOut(UserOut):
+    relevancia: float = 0
+
+
+class BusquedaUsuariosOut(BaseModel):
+    """Resultados ordenados por relevancia"""
+    users: List[UserBusquedaOut]
@@ -0,0 +1,146 @@
+# services/busqueda.py
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import threading
+
+from sqlalchemy import String, cast, func, select, union_all
+from sqlalchemy.orm import Session
+
+from models.user import User
+from models.userDetail import UserDetail
+
+
+def _tokens(*valores) -> List[str]:
+    tokens = []
+    for valor in valores:
+        if valor is None:
+            continue
+        texto = str(valor).lower()
+        tokens.append(texto)
+        # El email también se busca por la parte anterior a la @
+        if "@" in texto:
+            tokens.append(texto.split("@", 1)[0])
+        tokens.extend(t for t in texto.split() if t != texto)
+    return tokens
+
+
+class IndicePrefijos:
+    """
+    Índice en memoria para bases sin pg_trgm (SQLite en pruebas).
+    Guarda pares (token, user_id) ordenados y resuelve cada término
+    por prefijo con búsqueda binaria. Se reconstruye perezosamente
+    después de cada invalidación.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pares: List[Tuple[str, int]] = []
+        self._vigente = False
+
+    def invalidar(self):
+        with self._lock:
+            self._vigente = False
+
+    def _construir(self, db: Session):
+        filas = db.execute(
+            select(
+                User.id,
+                User.username,
+                UserDetail.email,
+                UserDetail.firstName,
+                UserDetail.lastName,
+                UserDetail.dni
+            ).outerjoin(UserDetail, UserDetail.user_id == User.id)
+        ).all()
+        pares = set()
+        for user_id, *valores in filas:
+            for token in _tokens(*valores):
+                pares.add((token, user_id))
+        self._pares = sorted(pares)
+        self._vigente = True
+
+    def buscar(self, db: Session, termino: str, limit: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            if not self._vigente:
+                self._construir(db)
+            pares = self._pares
+
+        # Todos los términos tienen que coincidir; coincidencia exacta pesa el doble
+        puntajes: Optional[Dict[int, float]] = None
+        for palabra in termino.lower().split():
+            encontrados: Dict[int, float] = defaultdict(float)
+            i = bisect_left(pares, (palabra, -1))
+            while i < len(pares) and pares[i][0].startswith(palabra):
+                token, user_id = pares[i]
+                encontrados[user_id] = max(encontrados[user_id], 2.0 if token == palabra else 1.0)
+                i += 1
+            if puntajes is None:
+                puntajes = dict(encontrados)
+            else:
+                puntajes = {u: p + encontrados[u] for u, p in puntajes.items() if u in encontrados}
+            if not puntajes:
+                return []
+
+        ranking = sorted((puntajes or {}).items(), key=lambda x: (-x[1], x[0]))
+        return ranking[:limit]
+
+
+indice_prefijos = IndicePrefijos()
+
+
+def escapar_like(termino: str) -> str:
+    """Escapa los comodines de LIKE para que `%` y `_` del término se busquen literales."""
+    return termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _buscar_trigramas(db: Session, termino: str, limit: int) -> List[Tuple[int, float]]:
+    """
+    Búsqueda con pg_trgm: cada tabla se filtra por separado para que el
+    planner use sus índices GIN, y se ordena por similitud.
+    """
+    literal = escapar_like(termino)
+    like = f"%{literal}%"
+    por_usuario = select(
+        User.id.label("user_id"),
+        func.similarity(User.username, termino).label("puntaje")
+    ).where(User.username.ilike(like, escape="\\"))
+
+    por_detalle = select(
+        UserDetail.user_id.label("user_id"),
+        func.greatest(
+            func.similarity(UserDetail.email, termino),
+            func.similarity(UserDetail.firstName, termino),
+            func.similarity(UserDetail.lastName, termino),
+        ).label("puntaje")
+    ).where(
+        UserDetail.email.ilike(like, escape="\\") |
+        UserDetail.firstName.ilike(like, escape="\\") |
+        UserDetail.lastName.ilike(like, escape="\\") |
+        cast(UserDetail.dni, String).like(f"{literal}%", escape="\\")
+    )
+
+    candidatos = union_all(por_usuario, por_detalle).subquery()
+    puntaje = func.max(candidatos.c.puntaje).label("puntaje")
+    filas = db.execute(
+        select(candidatos.c.user_id, puntaje)
+        .group_by(candidatos.c.user_id)
+        .order_by(puntaje.desc(), candidatos.c.user_id)
+        .limit(limit)
+    ).all()
+    return [(user_id, float(p or 0)) for user_id, p in filas]
+
+
+def buscar_usuarios(db: Session, termino: str, limit: int = 20) -> List[Tuple[int, float]]:
+    """Devuelve [(user_id, relevancia)] ordenado de más a menos relevante."""
+    termino = termino.strip()
+    if not termino:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _buscar_trigramas(db, termino, limit)
+    return indice_prefijos.buscar(db, termino, limit)
+
+
+def invalidar_indice_busqueda():
+    """Se llama cuando cambia un usuario o su detalle."""
+    indice_prefijos.invalidar()
@@ -0,0 +1,142 @@
+# services/dashboard.py
+from datetime import date, datetime
+from typing import Optional
+import os
+import threading
+import time
+
+from sqlalchemy import case, distinct, func, select
+from sqlalchemy.orm import Session
+
+from models.cuota import Cuota
+from models.pago import Pago
+from models.user import User
+from models.userDetail import UserDetail
+from services.estadoCuenta import cuota_vencida, resto_cuota
+
+# Segundos que se sirve el mismo resumen; las escrituras de pagos y cuotas lo invalidan antes
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+
+ESTADOS_CUOTA = ("pendiente", "parcial", "pagada", "vencida", "arrastrada")
+
+
+def _consulta_resumen():
+    """
+    Todos los contadores del panel en una sola sentencia. Las cuotas
+    vencidas salen de la misma regla por fecha que estado_cuenta
+    (`cuota_vencida`), tanto en cuotas_por_estado como en los totales de
+    morosidad: una cuota impaga con la fecha pasada cuenta como vencida
+    aunque el job de vencimientos todavía no la haya marcado.
+    """
+    hoy = date.today()
+    inicio_mes = datetime(hoy.year, hoy.month, 1)
+
+    ingresos_mes = (
+        select(func.coalesce(func.sum(Pago.monto_pagado), 0))
+        .where(Pago.fecha_pago >= inicio_mes)
+        .scalar_subquery()
+    )
+    alumnos = (
+        select(func.count()).select_from(UserDetail)
+        .where(UserDetail.type == "Alumno")
+        .scalar_subquery()
+    )
+    vencida = cuota_vencida(hoy)
+    estado = case((vencida, "vencida"), else_=Cuota.estado)
+
+    return select(
+        *[func.count().filter(estado == e).label(e) for e in ESTADOS_CUOTA],
+        func.count(Cuota.id).label("total"),
+        ingresos_mes.label("ingresos_mes"),
+        alumnos.label("alumnos"),
+        func.count(distinct(Cuota.alumno_id)).filter(vencida).label("alumnos_morosos"),
+        func.coalesce(func.sum(resto_cuota()).filter(vencida), 0).label("deuda_vencida"),
+        func.count().filter(vencida).label("cuotas_vencidas"),
+    ).select_from(Cuota)
+
+
+def calcular_resumen(db: Session) -> dict:
+    fila = db.execute(_consulta_resumen()).one()
+
+    ultimo_pago = db.execute(
+        select(Pago.id, Pago.alumno_id, Pago.monto_pagado, Pago.fecha_pago, Pago.metodo,
+               UserDetail.firstName, UserDetail.lastName)
+        .outerjoin(UserDetail, UserDetail.user_id == Pago.alumno_id)
+        .order_by(Pago.id.desc())
+        .limit(1)
+    ).first()
+
+    ultimo_usuario = db.execute(
+        select(User.id, User.username, UserDetail.firstName, UserDetail.lastName)
+        .outerjoin(UserDetail, UserDetail.user_id == User.id)
+        .order_by(User.id.desc())
+        .limit(1)
+    ).first()
+
+    return {
+        "cuotas_por_estado": {e: getattr(fila, e) for e in ESTADOS_CUOTA},
+        "cuotas_total": fila.total,
+        "ingresos_mes": float(fila.ingresos_mes),
+        "alumnos": fila.alumnos,
+        "alumnos_morosos": fila.alumnos_morosos or 0,
+        "deuda_vencida": float(fila.deuda_vencida or 0),
+        "cuotas_vencidas": int(fila.cuotas_vencidas or 0),
+        "ultimo_pago": {
+            "id": ultimo_pago.id,
+            "alumno": (
+                f"{ultimo_pago.firstName} {ultimo_pago.lastName}"
+                if ultimo_pago.firstName else f"ID {ultimo_pago.alumno_id}"
+            ),
+            "monto_pagado": float(ultimo_pago.monto_pagado),
+            "fecha_pago": ultimo_pago.fecha_pago.strftime("%Y-%m-%d %H:%M"),
+            "metodo": ultimo_pago.metodo,
+        } if ultimo_pago else None,
+        "ultimo_usuario": {
+            "id": ultimo_usuario.id,
+            "username": ultimo_usuario.username,
+            "firstName": ultimo_usuario.firstName,
+            "lastName": ultimo_usuario.lastName,
+        } if ultimo_usuario else None,
+        "generado": datetime.now(),
+    }
+
+
+class CacheDashboard:
+    """
+    Guarda el último resumen durante `ttl` segundos. Cada invalidación sube
+    la versión: un cálculo que empezó antes de una escritura no se guarda,
+    para no volver a servir datos que ya se sabe que cambiaron.
+    """
+
+    def __init__(self, ttl: float = DASHBOARD_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._resumen: Optional[dict] = None
+        self._vence = 0.0
+        self._version = 0
+
+    def obtener(self, db: Session) -> dict:
+        with self._lock:
+            if self._resumen is not None and time.monotonic() < self._vence:
+                return self._resumen
+            version = self._version
+
+        resumen = calcular_resumen(db)
+        with self._lock:
+            if version == self._version:
+                self._resumen = resumen
+                self._vence = time.monotonic() + self.ttl
+        return resumen
+
+    def invalidar(self):
+        with self._lock:
+            self._resumen = None
+            self._version += 1
+
+
+cache_dashboard = CacheDashboard()
+
+
+def invalidar_dashboard():
+    """Se llama después de confirmar escrituras de pagos, cuotas o usuarios."""
+    cache_dashboard.invalidar()
@@ -0,0 +1,154 @@
+# services/estadoCuenta.py
+"""
+Mantiene la tabla estado_cuenta (saldo resumido por alumno).
+
+Cada escritura que cambia cuotas de un alumno recalcula su fila con un
+único INSERT ... SELECT agregado ... ON CONFLICT DO UPDATE dentro de la
+misma transacción, así que leer la deuda de un alumno es leer una fila.
+Las cuotas `arrastrada` no cuentan como deuda: su saldo ya forma parte
+del `ajuste_anterior` de la cuota del período siguiente.
+Las cuotas pasan a vencidas con el correr de los días sin que nada se
+escriba, por eso conviene un recálculo completo diario:
+
+    python -m services.estadoCuenta
+"""
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from sqlalchemy import and_, case, func, literal, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.cuota import Cuota
+from models.estadoCuenta import EstadoCuenta
+
+# Estado de la cuota cuyo saldo pasó al ajuste_anterior del período siguiente
+ARRASTRADA = "arrastrada"
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _insert(dialecto: str):
+    return postgresql.insert if dialecto == "postgresql" else sqlite.insert
+
+
+def resto_cuota():
+    """Lo que falta pagar de la cuota; 0 si su saldo pasó al período siguiente."""
+    return case(
+        (Cuota.estado == ARRASTRADA, 0),
+        else_=Cuota.monto_a_pagar - func.coalesce(Cuota.monto_pagado, 0),
+    )
+
+
+def cuota_vencida(hoy: date):
+    """
+    Regla de cuota vencida por fecha, sin esperar a que el job de
+    vencimientos cambie su estado. La usan estado_cuenta y el panel.
+    """
+    return and_(resto_cuota() > 0, Cuota.fecha_vencimiento < hoy)
+
+
+def recalcular(dialecto: str, alumnos: Optional[Iterable[int]] = None):
+    """
+    Sentencia que recalcula el estado de cuenta de `alumnos` (ids o un
+    SELECT de ids), o de todos si es None. La deuda se calcula como
+    monto_a_pagar - monto_pagado para no depender de saldo_pendiente en
+    cuotas que todavía no recibieron pagos.
+    """
+    resto = resto_cuota()
+    pendiente = case((resto > 0, resto), else_=0)
+    vencida = cuota_vencida(date.today())
+
+    agregado = (
+        select(
+            Cuota.alumno_id,
+            func.coalesce(func.sum(pendiente), 0),
+            func.coalesce(func.sum(func.coalesce(Cuota.monto_pagado, 0)), 0),
+            func.coalesce(func.sum(case((vencida, 1), else_=0)), 0),
+            func.min(case((vencida, Cuota.periodo))),
+            literal(datetime.now()),
+        )
+        # En SQLite el WHERE evita que ON CONFLICT se lea como parte del FROM
+        .where(true() if alumnos is None else Cuota.alumno_id.in_(alumnos))
+        .group_by(Cuota.alumno_id)
+    )
+
+    sentencia = _insert(dialecto)(EstadoCuenta).from_select(
+        ["alumno_id", "total_adeudado", "total_pagado", "cuotas_vencidas",
+         "periodo_vencido_mas_antiguo", "actualizado"],
+        agregado,
+    )
+    return sentencia.on_conflict_do_update(
+        index_elements=[EstadoCuenta.alumno_id],
+        set_={
+            c: getattr(sentencia.excluded, c)
+            for c in ("total_adeudado", "total_pagado", "cuotas_vencidas",
+                      "periodo_vencido_mas_antiguo", "actualizado")
+        },
+    )
+
+
+def _sembrar(dialecto: str, alumnos: Iterable[int]):
+    """
+    Crea en cero las filas que falten, para que `_bloquear` siempre tenga
+    algo que bloquear: sin fila, dos primeras escrituras del mismo alumno
+    no se esperarían entre sí.
+    """
+    return _insert(dialecto)(EstadoCuenta).values(
+        [{"alumno_id": a} for a in alumnos]
+    ).on_conflict_do_nothing(index_elements=[EstadoCuenta.alumno_id])
+
+
+def _bloquear(alumnos: Iterable[int]):
+    """
+    Toma el lock de las filas antes de recalcular: si otra transacción está
+    actualizando al mismo alumno se espera a que confirme, y el recálculo
+    (una sentencia nueva en READ COMMITTED) ya ve sus cambios.
+    """
+    return (
+        select(EstadoCuenta.alumno_id)
+        .where(EstadoCuenta.alumno_id.in_(alumnos))
+        .order_by(EstadoCuenta.alumno_id)
+        .with_for_update()
+    )
+
+
+def actualizar_estado_cuenta(db: Session, alumnos: Optional[Iterable[int]] = None):
+    """Recalcula dentro de la transacción en curso; el commit queda a cargo de quien llama."""
+    dialecto = db.get_bind().dialect.name
+    if alumnos is not None:
+        alumnos = sorted(set(alumnos))
+        if not alumnos:
+            return
+        db.execute(_sembrar(dialecto, alumnos))
+        db.execute(_bloquear(alumnos))
+    db.execute(recalcular(dialecto, alumnos))
+
+
+async def actualizar_estado_cuenta_async(db: "AsyncSession", alumnos: Optional[Iterable[int]] = None):
+    """Igual que `actualizar_estado_cuenta` sobre una AsyncSession."""
+    dialecto = db.get_bind().dialect.name
+    if alumnos is not None:
+        alumnos = sorted(set(alumnos))
+        if not alumnos:
+            return
+        await db.execute(_sembrar(dialecto, alumnos))
+        await db.execute(_bloquear(alumnos))
+    await db.execute(recalcular(dialecto, alumnos))
+
+
+def recalcular_todos(bind=None) -> int:
+    """Recalcula el estado de cuenta de todos los alumnos con una sesión propia (sobre `bind` si se indica)."""
+    from config.db import SessionLocal
+
+    with SessionLocal() if bind is None else Session(bind) as db:
+        actualizar_estado_cuenta(db)
+        db.commit()
+        return db.query(EstadoCuenta).count()
+
+
+if __name__ == "__main__":
+    import config.init_db  # noqa: F401  registra todos los modelos
+
+    print(f"✅ Estado de cuenta recalculado para {recalcular_todos()} alumnos.")
@@ -0,0 +1,212 @@
+# services/idempotencia.py
+"""
+Respuestas guardadas por Idempotency-Key. Una clave vale
+IDEMPOTENCIA_TTL_HORAS desde que se registró: después se ignora (el
+cliente puede reutilizarla) y la purga periódica la borra.
+
+    python -m services.idempotencia          # una purga
+    python -m services.idempotencia loop     # cada IDEMPOTENCIA_PURGA_INTERVALO segundos
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple, TYPE_CHECKING
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from models.idempotencia import ClaveIdempotencia
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+IDEMPOTENCIA_CACHE_SIZE = int(os.getenv("IDEMPOTENCIA_CACHE_SIZE", "10000"))
+IDEMPOTENCIA_TTL_HORAS = float(os.getenv("IDEMPOTENCIA_TTL_HORAS", "24"))
+# Segundos entre purgas dentro de la app; 0 la desactiva (por ejemplo, si corre por cron)
+IDEMPOTENCIA_PURGA_INTERVALO = float(os.getenv("IDEMPOTENCIA_PURGA_INTERVALO", "3600"))
+
+
+def limite_vigencia() -> datetime:
+    """Las claves creadas antes de este momento están vencidas."""
+    return datetime.now() - timedelta(hours=IDEMPOTENCIA_TTL_HORAS)
+
+
+@dataclass(frozen=True)
+class RespuestaGuardada:
+    huella: str
+    status_code: int
+    cuerpo: Any
+    creada: datetime
+
+
+class CacheIdempotencia:
+    """LRU en memoria delante de la tabla `claves_idempotencia`."""
+
+    def __init__(self, max_size: int = IDEMPOTENCIA_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Tuple[int, str], RespuestaGuardada]" = OrderedDict()
+
+    def obtener(self, clave: Tuple[int, str]) -> Optional[RespuestaGuardada]:
+        with self._lock:
+            guardada = self._entradas.get(clave)
+            if guardada is None:
+                return None
+            if guardada.creada < limite_vigencia():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return guardada
+
+    def guardar(self, clave: Tuple[int, str], guardada: RespuestaGuardada):
+        with self._lock:
+            self._entradas[clave] = guardada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_size:
+                self._entradas.popitem(last=False)
+
+
+cache_idempotencia = CacheIdempotencia()
+
+
+def huella(cuerpo: dict) -> str:
+    """Hash estable del cuerpo, para detectar una clave reutilizada con otros datos."""
+    return hashlib.sha256(json.dumps(cuerpo, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _consulta(usuario_id: int, clave: str):
+    return select(
+        ClaveIdempotencia.id,
+        ClaveIdempotencia.huella,
+        ClaveIdempotencia.status_code,
+        ClaveIdempotencia.respuesta,
+        ClaveIdempotencia.creada
+    ).where(
+        ClaveIdempotencia.usuario_id == usuario_id,
+        ClaveIdempotencia.clave == clave
+    )
+
+
+def _desde_fila(usuario_id: int, clave: str, fila) -> Optional[RespuestaGuardada]:
+    guardada = RespuestaGuardada(fila.huella, fila.status_code, json.loads(fila.respuesta), fila.creada)
+    cache_idempotencia.guardar((usuario_id, clave), guardada)
+    return guardada
+
+
+def _vencida(fila) -> bool:
+    return fila.creada is not None and fila.creada < limite_vigencia()
+
+
+def _borrar_vencida(fila):
+    # Se borra en la transacción de la petición, para que el registro nuevo no choque con el índice único
+    return delete(ClaveIdempotencia).where(ClaveIdempotencia.id == fila.id)
+
+
+def buscar(db: Session, usuario_id: int, clave: str) -> Optional[RespuestaGuardada]:
+    """La respuesta guardada de la clave, o None si no existe o ya venció."""
+    guardada = cache_idempotencia.obtener((usuario_id, clave))
+    if guardada is not None:
+        return guardada
+    fila = db.execute(_consulta(usuario_id, clave)).first()
+    if fila is None:
+        return None
+    if _vencida(fila):
+        db.execute(_borrar_vencida(fila))
+        return None
+    return _desde_fila(usuario_id, clave, fila)
+
+
+async def buscar_async(db: "AsyncSession", usuario_id: int, clave: str) -> Optional[RespuestaGuardada]:
+    guardada = cache_idempotencia.obtener((usuario_id, clave))
+    if guardada is not None:
+        return guardada
+    fila = (await db.execute(_consulta(usuario_id, clave))).first()
+    if fila is None:
+        return None
+    if _vencida(fila):
+        await db.execute(_borrar_vencida(fila))
+        return None
+    return _desde_fila(usuario_id, clave, fila)
+
+
+def repetir(guardada: RespuestaGuardada, huella_actual: str) -> JSONResponse:
+    """Respuesta original de la clave, o 422 si la clave se reutiliza con otro cuerpo."""
+    if guardada.huella != huella_actual:
+        raise HTTPException(
+            status_code=422,
+            detail="La Idempotency-Key ya se usó con una petición distinta."
+        )
+    return JSONResponse(
+        status_code=guardada.status_code,
+        content=guardada.cuerpo,
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def registrar(db, usuario_id: int, clave: str, endpoint: str, huella_actual: str, status_code: int, cuerpo: Any):
+    """
+    Agrega la clave a la sesión; se confirma con el mismo commit que el efecto.
+    Si otra petición con la misma clave gana la carrera, el commit falla por
+    el índice único y quien llama debe repetir la respuesta ganadora.
+    """
+    db.add(ClaveIdempotencia(
+        usuario_id=usuario_id,
+        clave=clave,
+        endpoint=endpoint,
+        huella=huella_actual,
+        status_code=status_code,
+        respuesta=json.dumps(cuerpo)
+    ))
+
+
+def recordar(usuario_id: int, clave: str, huella_actual: str, status_code: int, cuerpo: Any):
+    """Se llama después del commit para servir los reintentos desde memoria."""
+    cache_idempotencia.guardar(
+        (usuario_id, clave), RespuestaGuardada(huella_actual, status_code, cuerpo, datetime.now())
+    )
+
+
+def purgar_vencidas(db: Session) -> int:
+    """Borra las claves vencidas y devuelve cuántas borró."""
+    borradas = db.execute(
+        delete(ClaveIdempotencia)
+        .where(ClaveIdempotencia.creada < limite_vigencia())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return max(borradas or 0, 0)
+
+
+def purgar_con_sesion() -> int:
+    from config.db import SessionLocal
+
+    with SessionLocal() as db:
+        return purgar_vencidas(db)
+
+
+async def ejecutar_periodicamente(intervalo: float = IDEMPOTENCIA_PURGA_INTERVALO):
+    """Tarea asyncio que purga las claves vencidas al iniciar y luego cada `intervalo` segundos."""
+    while True:
+        try:
+            await run_in_threadpool(purgar_con_sesion)
+        except Exception as e:
+            print("Error al purgar claves de idempotencia:", e)
+        await asyncio.sleep(intervalo)
+
+
+if __name__ == "__main__":
+    import config.init_db  # noqa: F401  registra todos los modelos
+
+    if len(sys.argv) > 1 and sys.argv[1] == "loop":
+        asyncio.run(ejecutar_periodicamente(IDEMPOTENCIA_PURGA_INTERVALO or 3600))
+    else:
+        print(f"✅ Claves de idempotencia vencidas borradas: {purgar_con_sesion()}")
@@ -0,0 +1,239 @@
+# services/importacion.py
+"""
+Importación masiva de pagos desde archivos de conciliación (CSV con
+encabezado o NDJSON, una fila por pago). El cuerpo se lee por partes y
+se procesa en lotes: cada lote resuelve sus cuotas con un único
+SELECT ... IN, aplica los montos con un UPDATE ejecutado en bloque,
+inserta pagos y eventos de notificación en bloque y confirma. Cada lote
+usa su propia sesión.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import csv
+import json
+import os
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.cuota import Cuota
+from models.pago import Pago
+from models.outbox import EventoOutbox
+from services.pagos import aplicar_pagos_en_lote
+from services.estadoCuenta import ARRASTRADA, actualizar_estado_cuenta
+from services.outbox import evento_pago_registrado, fila_evento
+
+IMPORTACION_LOTE = int(os.getenv("IMPORTACION_LOTE", "500"))
+METODO_POR_DEFECTO = "transferencia"
+COLUMNAS_REQUERIDAS = ("alumno_id", "cuota_id", "monto_pagado")
+
+
+@dataclass
+class FilaPago:
+    linea: int
+    alumno_id: int
+    cuota_id: int
+    monto: Decimal
+    metodo: str
+    comprobante: Optional[str]
+
+
+def resultado(linea: int, estado: str, detalle: str = None, pago_id: int = None, monto: Decimal = None) -> dict:
+    return {"linea": linea, "estado": estado, "pago_id": pago_id, "monto": monto, "detalle": detalle}
+
+
+async def lineas(partes: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Parte el cuerpo en líneas a medida que llega, sin cargarlo entero."""
+    resto = b""
+    numero = 0
+    async for parte in partes:
+        resto += parte
+        *completas, resto = resto.split(b"\n")
+        for linea in completas:
+            numero += 1
+            yield numero, linea.decode("utf-8", errors="replace").lstrip("﻿").strip()
+    if resto.strip():
+        yield numero + 1, resto.decode("utf-8", errors="replace").lstrip("﻿").strip()
+
+
+class LectorCSV:
+    """La primera línea no vacía es el encabezado con los nombres de columna."""
+
+    def __init__(self):
+        self.columnas: Optional[List[str]] = None
+
+    def leer(self, texto: str) -> Optional[dict]:
+        valores = next(csv.reader([texto]))
+        if self.columnas is None:
+            columnas = [c.strip().lower() for c in valores]
+            faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in columnas]
+            if faltantes:
+                raise ValueError(f"Faltan columnas en el encabezado: {', '.join(faltantes)}")
+            self.columnas = columnas
+            return None
+        if len(valores) != len(self.columnas):
+            raise ValueError(f"Se esperaban {len(self.columnas)} columnas y hay {len(valores)}")
+        return dict(zip(self.columnas, valores))
+
+
+class LectorNDJSON:
+    def leer(self, texto: str) -> Optional[dict]:
+        try:
+            datos = json.loads(texto)
+        except json.JSONDecodeError:
+            raise ValueError("JSON inválido")
+        if not isinstance(datos, dict):
+            raise ValueError("Cada línea debe ser un objeto JSON")
+        return datos
+
+
+LECTORES = {"csv": LectorCSV, "ndjson": LectorNDJSON}
+
+
+def validar(linea: int, datos: dict) -> FilaPago:
+    """Convierte una fila leída en FilaPago; ValueError con el motivo si no es válida."""
+    try:
+        alumno_id = int(datos.get("alumno_id"))
+        cuota_id = int(datos.get("cuota_id"))
+    except (TypeError, ValueError):
+        raise ValueError("alumno_id y cuota_id deben ser enteros")
+    try:
+        monto = Decimal(str(datos.get("monto_pagado")).strip()).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        raise ValueError("monto_pagado no es un número válido")
+    if not monto.is_finite() or monto <= 0:
+        raise ValueError("monto_pagado debe ser mayor a cero")
+
+    metodo = str(datos.get("metodo") or METODO_POR_DEFECTO).strip()
+    if len(metodo) > 30:
+        raise ValueError("metodo supera los 30 caracteres")
+    comprobante = datos.get("comprobante")
+    comprobante = str(comprobante).strip() if comprobante not in (None, "") else None
+    if comprobante and len(comprobante) > 100:
+        raise ValueError("comprobante supera los 100 caracteres")
+    return FilaPago(linea, alumno_id, cuota_id, monto, metodo, comprobante)
+
+
+class CuotaCambiada(Exception):
+    """El UPDATE en bloque no alcanzó a todas las cuotas que se leyeron como válidas."""
+
+
+def procesar_lote_con_sesion(filas: List[FilaPago], registrado_por: int) -> List[dict]:
+    from config.db import SessionLocal
+
+    with SessionLocal() as db:
+        return procesar_lote(db, filas, registrado_por)
+
+
+def procesar_lote(db: Session, filas: List[FilaPago], registrado_por: int) -> List[dict]:
+    """
+    Aplica un lote de pagos ya validados y confirma. Se rechazan las filas
+    cuya cuota no existe o no es del alumno, y las que repiten un
+    comprobante ya registrado para el mismo alumno (reimportar un archivo
+    no duplica pagos). Si otra importación registra el mismo comprobante
+    a la vez, el índice único hace fallar el INSERT y el lote se vuelve a
+    evaluar una vez: esas filas salen como duplicadas. Cualquier otro
+    error de la base revierte el lote entero.
+    """
+    try:
+        return _procesar_lote(db, filas, registrado_por)
+    except IntegrityError:
+        db.rollback()
+    try:
+        return _procesar_lote(db, filas, registrado_por)
+    except IntegrityError as e:
+        db.rollback()
+        return _lote_fallido(filas, e)
+
+
+def _lote_fallido(filas: List[FilaPago], error: Exception) -> List[dict]:
+    print("Error al importar lote de pagos:", error)
+    return [resultado(f.linea, "rechazado", "Error al aplicar el lote") for f in filas]
+
+
+def _procesar_lote(db: Session, filas: List[FilaPago], registrado_por: int) -> List[dict]:
+    # Las cuotas quedan bloqueadas hasta el commit: su estado no puede cambiar antes del UPDATE
+    cuotas = {
+        c.id: c for c in db.execute(
+            select(Cuota.id, Cuota.alumno_id, Cuota.periodo, Cuota.estado)
+            .where(Cuota.id.in_({f.cuota_id for f in filas}))
+            .order_by(Cuota.id)
+            .with_for_update()
+        )
+    }
+    claves = {(f.alumno_id, f.comprobante) for f in filas if f.comprobante}
+    registrados = set()
+    if claves:
+        registrados = set(db.execute(
+            select(Pago.alumno_id, Pago.comprobante)
+            .where(tuple_(Pago.alumno_id, Pago.comprobante).in_(claves))
+        ).tuples())
+
+    resultados: Dict[int, dict] = {}
+    validas: List[FilaPago] = []
+    for fila in filas:
+        cuota = cuotas.get(fila.cuota_id)
+        if cuota is None:
+            resultados[fila.linea] = resultado(fila.linea, "rechazado", "Cuota no encontrada")
+        elif cuota.alumno_id != fila.alumno_id:
+            resultados[fila.linea] = resultado(fila.linea, "rechazado", "La cuota no pertenece al alumno")
+        elif cuota.estado == ARRASTRADA:
+            resultados[fila.linea] = resultado(fila.linea, "rechazado", "El saldo de la cuota pasó al período siguiente")
+        elif fila.comprobante and (fila.alumno_id, fila.comprobante) in registrados:
+            resultados[fila.linea] = resultado(fila.linea, "duplicado", "Comprobante ya registrado")
+        else:
+            validas.append(fila)
+            if fila.comprobante:
+                registrados.add((fila.alumno_id, fila.comprobante))
+
+    if not validas:
+        return [resultados[f.linea] for f in filas]
+
+    # Varias filas sobre la misma cuota se suman en una sola actualización
+    montos: Dict[int, Decimal] = defaultdict(Decimal)
+    for fila in validas:
+        montos[fila.cuota_id] += fila.monto
+
+    try:
+        aplicadas = db.execute(
+            aplicar_pagos_en_lote(),
+            [{"b_id": cuota_id, "b_monto": monto} for cuota_id, monto in montos.items()]
+        ).rowcount
+        # El UPDATE descarta en silencio las cuotas arrastradas: no se registran pagos sin aplicar
+        if aplicadas is not None and 0 <= aplicadas < len(montos):
+            raise CuotaCambiada(f"se actualizaron {aplicadas} de {len(montos)} cuotas")
+        actualizar_estado_cuenta(db, {f.alumno_id for f in validas})
+        pago_ids = db.scalars(
+            insert(Pago).returning(Pago.id, sort_by_parameter_order=True),
+            [{
+                "alumno_id": f.alumno_id,
+                "cuota_id": f.cuota_id,
+                "monto_pagado": f.monto,
+                "metodo": f.metodo,
+                "comprobante": f.comprobante,
+                "registrado_por": registrado_por,
+            } for f in validas]
+        ).all()
+
+        # Un evento de outbox por pago; las notificaciones las arma el worker
+        db.execute(insert(EventoOutbox), [
+            fila_evento(evento_pago_registrado(
+                f.alumno_id, f.cuota_id, cuotas[f.cuota_id].periodo, f.monto
+            )) for f in validas
+        ])
+        db.commit()
+    except IntegrityError:
+        raise
+    except Exception as e:
+        db.rollback()
+        print("Error al importar lote de pagos:", e)
+        for fila in validas:
+            resultados[fila.linea] = resultado(fila.linea, "rechazado", "Error al aplicar el lote")
+        return [resultados[f.linea] for f in filas]
+
+    for fila, pago_id in zip(validas, pago_ids):
+        resultados[fila.linea] = resultado(fila.linea, "aplicado", pago_id=pago_id, monto=fila.monto)
+    return [resultados[f.linea] for f in filas]
@@ -0,0 +1,182 @@
+# services/notificaciones.py
+"""
+Bandejas de notificaciones y su contador de no leídas.
+
+Cada notificación pertenece a una bandeja: la de su alumno
+("alumno:<id>") si el destinatario es el alumno, o la bandeja común
+"admin". La tabla notificaciones_no_leidas guarda cuántas quedan sin
+leer en cada una; se suma al insertar y se resta al marcar como leídas,
+siempre en la transacción de quien escribe. Si alguna vez se desfasa
+(borrados a mano, cargas directas) se rehace con:
+
+    python -m services.notificaciones
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, case, cast, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.contadorNotificaciones import ContadorNotificaciones
+from models.notificacionPago import NotificacionPago
+
+BANDEJA_ADMIN = "admin"
+
+
+def bandeja(destinatario: str, alumno_id: int) -> str:
+    return BANDEJA_ADMIN if destinatario == BANDEJA_ADMIN else f"{destinatario}:{alumno_id}"
+
+
+def bandeja_de(payload: dict) -> str:
+    """La bandeja que ve quien hace la petición, según su token."""
+    return BANDEJA_ADMIN if payload.get("type") == "Admin" else bandeja("alumno", int(payload["sub"]))
+
+
+def filtro_bandeja(nombre: str):
+    """Condición WHERE de las notificaciones de una bandeja."""
+    if nombre == BANDEJA_ADMIN:
+        return NotificacionPago.destinatario == BANDEJA_ADMIN
+    destinatario, _, alumno_id = nombre.partition(":")
+    return and_(NotificacionPago.alumno_id == int(alumno_id), NotificacionPago.destinatario == destinatario)
+
+
+# La misma regla que `bandeja`, en SQL, para recontar
+BANDEJA_SQL = case(
+    (NotificacionPago.destinatario == BANDEJA_ADMIN, BANDEJA_ADMIN),
+    else_=NotificacionPago.destinatario + ":" + cast(NotificacionPago.alumno_id, String),
+)
+
+
+# ----- Contador -----
+
+def _insert(dialecto: str):
+    return postgresql.insert if dialecto == "postgresql" else sqlite.insert
+
+
+def sumar_no_leidas(db: Session, cambios: Dict[str, int]):
+    """
+    Suma `cambios` ({bandeja: cantidad}) con un único upsert. Las filas van
+    ordenadas para que dos transacciones las bloqueen en el mismo orden.
+    """
+    filas = [{"bandeja": b, "no_leidas": n} for b, n in sorted(cambios.items()) if n]
+    if not filas:
+        return
+    sentencia = _insert(db.get_bind().dialect.name)(ContadorNotificaciones).values(filas)
+    db.execute(sentencia.on_conflict_do_update(
+        index_elements=[ContadorNotificaciones.bandeja],
+        set_={"no_leidas": ContadorNotificaciones.no_leidas + sentencia.excluded.no_leidas},
+    ))
+
+
+def restar_no_leidas(db: Session, nombre: str, cantidad: int):
+    if cantidad:
+        db.execute(
+            update(ContadorNotificaciones)
+            .where(ContadorNotificaciones.bandeja == nombre)
+            .values(no_leidas=ContadorNotificaciones.no_leidas - cantidad)
+        )
+
+
+def no_leidas(db: Session, nombre: str) -> int:
+    return db.scalar(
+        select(ContadorNotificaciones.no_leidas).where(ContadorNotificaciones.bandeja == nombre)
+    ) or 0
+
+
+def recontar_no_leidas(db: Session) -> int:
+    """Rehace el contador desde la tabla de notificaciones; devuelve las bandejas con pendientes."""
+    db.execute(delete(ContadorNotificaciones))
+    resultado = db.execute(insert(ContadorNotificaciones).from_select(
+        ["bandeja", "no_leidas"],
+        select(BANDEJA_SQL, func.count())
+        .where(NotificacionPago.leida == False)
+        .group_by(BANDEJA_SQL),
+    ))
+    return max(resultado.rowcount or 0, 0)
+
+
+# ----- Escrituras -----
+
+def insertar_notificaciones(db: Session, filas: List[dict]):
+    """INSERT en bloque de notificaciones nuevas (sin leer) y suma a sus contadores."""
+    if not filas:
+        return
+    db.execute(insert(NotificacionPago), filas)
+    sumar_no_leidas(db, Counter(bandeja(f["destinatario"], f["alumno_id"]) for f in filas))
+
+
+def marcar_leida(db: Session, nombre: str, notificacion_id: int) -> bool:
+    """
+    Marca una notificación de la bandeja. Devuelve False si ya estaba
+    leída y 404 si no existe o es de otra bandeja. No confirma.
+    """
+    resultado = db.execute(
+        update(NotificacionPago)
+        .where(NotificacionPago.id == notificacion_id, filtro_bandeja(nombre), NotificacionPago.leida == False)
+        .values(leida=True, leida_en=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount:
+        restar_no_leidas(db, nombre, resultado.rowcount)
+        return True
+    existe = db.scalar(
+        select(NotificacionPago.id).where(NotificacionPago.id == notificacion_id, filtro_bandeja(nombre))
+    )
+    if existe is None:
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    return False
+
+
+def marcar_todas_leidas(db: Session, nombre: str, hasta_id: Optional[int] = None) -> int:
+    """
+    Marca las no leídas de la bandeja (solo hasta `hasta_id` si se indica,
+    para no marcar las que llegaron después de que el usuario miró).
+    Devuelve cuántas marcó. No confirma.
+    """
+    q = (
+        update(NotificacionPago)
+        .where(filtro_bandeja(nombre), NotificacionPago.leida == False)
+        .values(leida=True, leida_en=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    if hasta_id is not None:
+        q = q.where(NotificacionPago.id <= hasta_id)
+    marcadas = db.execute(q).rowcount or 0
+    restar_no_leidas(db, nombre, marcadas)
+    return marcadas
+
+
+# ----- Paginación por cursor -----
+
+def cursor_de(fecha_envio: datetime, notificacion_id: int) -> str:
+    return f"{fecha_envio.isoformat()}_{notificacion_id}"
+
+
+def leer_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        fecha, _, notificacion_id = cursor.rpartition("_")
+        return datetime.fromisoformat(fecha), int(notificacion_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def pagina(consulta, cursor: Optional[str], limit: int):
+    """Ordena por (fecha_envio, id) descendente y aplica el cursor de la página anterior."""
+    if cursor:
+        consulta = consulta.where(
+            tuple_(NotificacionPago.fecha_envio, NotificacionPago.id) < tuple_(*leer_cursor(cursor))
+        )
+    return consulta.order_by(NotificacionPago.fecha_envio.desc(), NotificacionPago.id.desc()).limit(limit)
+
+
+if __name__ == "__main__":
+    import config.init_db  # noqa: F401  registra todos los modelos
+    from config.db import SessionLocal
+
+    with SessionLocal() as db:
+        bandejas = recontar_no_leidas(db)
+        db.commit()
+    print(f"✅ Contador de no leídas recalculado ({bandejas} bandejas con pendientes).")
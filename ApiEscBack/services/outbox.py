@@ -0,0 +1,297 @@
+# services/outbox.py
+"""
+Outbox de notificaciones de pagos.
+
+Las rutas de pagos solo insertan un EventoOutbox dentro de su propia
+transacción. El worker toma los eventos pendientes en lotes, arma los
+mensajes, guarda las NotificacionPago que muestra el panel, confirma y
+recién entonces los entrega por el transporte configurado. Si la entrega falla el evento se
+reintenta con espera exponencial (entrega al menos una vez); los eventos
+procesados se borran a los OUTBOX_RETENCION_DIAS días.
+
+    python -m services.outbox          # procesa lo pendiente y termina
+    python -m services.outbox loop     # sigue procesando cada OUTBOX_INTERVALO segundos
+    python -m services.outbox purgar   # borra los eventos procesados viejos
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from models.outbox import EventoOutbox
+from services.notificaciones import insertar_notificaciones
+from services.pagos import mensajes_pago
+
+OUTBOX_WORKER = os.getenv("OUTBOX_WORKER", "1").lower() in ("1", "true", "si")
+OUTBOX_INTERVALO = float(os.getenv("OUTBOX_INTERVALO", "1"))
+OUTBOX_LOTE = int(os.getenv("OUTBOX_LOTE", "100"))
+OUTBOX_MAX_INTENTOS = int(os.getenv("OUTBOX_MAX_INTENTOS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_TRANSPORTE = os.getenv("OUTBOX_TRANSPORTE", "log")  # log | local
+# Segundos que un evento con notificaciones guardadas espera su entrega antes de que otro worker lo retome
+OUTBOX_PLAZO_ENTREGA = float(os.getenv("OUTBOX_PLAZO_ENTREGA", "60"))
+# Días que se conservan los eventos procesados, y cada cuántos segundos se purgan
+OUTBOX_RETENCION_DIAS = float(os.getenv("OUTBOX_RETENCION_DIAS", "7"))
+OUTBOX_PURGA_INTERVALO = float(os.getenv("OUTBOX_PURGA_INTERVALO", "3600"))
+
+logger = logging.getLogger("outbox")
+
+
+# ----- Eventos que escriben las rutas -----
+
+def evento_pago_registrado(alumno_id: int, cuota_id: int, periodo: str, monto: float) -> EventoOutbox:
+    return EventoOutbox("pago_registrado", {
+        "alumno_id": alumno_id, "cuota_id": cuota_id, "periodo": periodo, "monto": float(monto)
+    })
+
+
+def evento_pago_eliminado(pago_id: int, alumno_id: int, cuota_id: int, monto: float, motivo: Optional[str]) -> EventoOutbox:
+    return EventoOutbox("pago_eliminado", {
+        "pago_id": pago_id, "alumno_id": alumno_id, "cuota_id": cuota_id,
+        "monto": float(monto), "motivo": motivo
+    })
+
+
+def fila_evento(evento: EventoOutbox) -> dict:
+    """El mismo evento como fila para un INSERT en bloque."""
+    return {"tipo": evento.tipo, "payload": evento.payload}
+
+
+# ----- Armado de mensajes -----
+
+def _render_pago_registrado(p: dict) -> List[dict]:
+    mensaje_alumno, mensaje_admin = mensajes_pago(p["alumno_id"], p["periodo"], p["monto"])
+    return [
+        {"alumno_id": p["alumno_id"], "cuota_id": p["cuota_id"], "tipo": "pago_registrado",
+         "destinatario": "alumno", "mensaje": mensaje_alumno},
+        {"alumno_id": p["alumno_id"], "cuota_id": p["cuota_id"], "tipo": "pago_registrado",
+         "destinatario": "admin", "mensaje": mensaje_admin},
+    ]
+
+
+def _render_pago_eliminado(p: dict) -> List[dict]:
+    mensaje_admin = (
+        f"Se eliminó el pago ID {p['pago_id']} del alumno ID {p['alumno_id']}. "
+        f"Monto: ${p['monto']:,.2f}. Motivo: {p['motivo'] or 'No especificado'}."
+    )
+    return [
+        {"alumno_id": p["alumno_id"], "cuota_id": p["cuota_id"], "tipo": "pago_eliminado",
+         "destinatario": "admin", "mensaje": mensaje_admin},
+    ]
+
+
+RENDERIZADORES = {
+    "pago_registrado": _render_pago_registrado,
+    "pago_eliminado": _render_pago_eliminado,
+}
+
+
+# ----- Transportes -----
+
+class TransporteLog:
+    """Transporte por defecto: solo deja constancia en el log."""
+
+    def enviar(self, notificaciones: List[dict]):
+        for n in notificaciones:
+            logger.info("Notificación %s a %s (alumno %s): %s",
+                        n["tipo"], n["destinatario"], n["alumno_id"], n["mensaje"])
+
+
+class TransporteLocal:
+    """
+    Transporte falso para pruebas: guarda lo enviado en memoria y puede
+    simular `fallos` entregas fallidas seguidas.
+    """
+
+    def __init__(self, fallos: int = 0):
+        self.enviados: List[dict] = []
+        self.fallos = fallos
+
+    def enviar(self, notificaciones: List[dict]):
+        if self.fallos > 0:
+            self.fallos -= 1
+            raise ConnectionError("Fallo simulado del transporte")
+        self.enviados.extend(notificaciones)
+
+
+TRANSPORTES = {"log": TransporteLog, "local": TransporteLocal}
+transporte = TRANSPORTES[OUTBOX_TRANSPORTE]()
+
+
+# ----- Worker -----
+
+def espera_reintento(intentos: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_BACKOFF_BASE * 2 ** (intentos - 1), OUTBOX_BACKOFF_MAX))
+
+
+def _registrar_fallos(db: Session, fallos: Dict[int, str], ahora: datetime):
+    """
+    Suma el intento fallido de cada evento en su propia transacción, así
+    queda registrado aunque el resto del lote se haya revertido.
+    """
+    if not fallos:
+        return
+    eventos = db.scalars(
+        select(EventoOutbox).where(EventoOutbox.id.in_(fallos)).with_for_update()
+    ).all()
+    for evento in eventos:
+        evento.intentos += 1
+        evento.error = fallos[evento.id][:255]
+        if evento.intentos >= OUTBOX_MAX_INTENTOS:
+            evento.estado = "fallido"
+        else:
+            evento.proximo_intento = ahora + espera_reintento(evento.intentos)
+    db.commit()
+
+
+def procesar_lote(db: Session, transporte_lote=None, limite: int = OUTBOX_LOTE) -> int:
+    """
+    Procesa hasta `limite` eventos vencidos. Con FOR UPDATE SKIP LOCKED
+    varios workers pueden drenar la misma tabla sin tomar dos veces el
+    mismo evento. Devuelve la cantidad de eventos tomados.
+
+    Cada evento pendiente guarda sus notificaciones bajo un SAVEPOINT y
+    pasa a `por_entregar`: una fila que falla (por ejemplo, una FK rota)
+    solo revierte su evento. La entrega por el transporte recién se hace
+    después de confirmar las notificaciones; si falla se reintenta sin
+    volver a guardarlas. Los fallos se registran en otra transacción,
+    así cada evento llega a OUTBOX_MAX_INTENTOS y a `fallido`.
+    """
+    transporte_lote = transporte_lote or transporte
+    ahora = datetime.now()
+    eventos = db.scalars(
+        select(EventoOutbox)
+        .where(EventoOutbox.estado.in_(["pendiente", "por_entregar"]), EventoOutbox.proximo_intento <= ahora)
+        .order_by(EventoOutbox.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not eventos:
+        db.commit()
+        return 0
+
+    fallos: Dict[int, str] = {}
+    a_entregar = []
+    for evento in eventos:
+        try:
+            with db.begin_nested():
+                mensajes = RENDERIZADORES[evento.tipo](evento.payload)
+                if evento.estado == "pendiente":
+                    insertar_notificaciones(db, mensajes)
+                    evento.estado = "por_entregar"
+                # Plazo para entregar: si el proceso muere acá, otro worker lo retoma después
+                evento.proximo_intento = ahora + timedelta(seconds=OUTBOX_PLAZO_ENTREGA)
+        except Exception as e:
+            fallos[evento.id] = str(e)
+            continue
+        a_entregar.append((evento.id, mensajes))
+
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        fallos.update({evento_id: f"Error al confirmar el lote: {e}" for evento_id, _ in a_entregar})
+        a_entregar = []
+    _registrar_fallos(db, fallos, ahora)
+
+    entregados = []
+    fallos = {}
+    for evento_id, mensajes in a_entregar:
+        try:
+            transporte_lote.enviar(mensajes)
+        except Exception as e:
+            fallos[evento_id] = str(e)
+            continue
+        entregados.append(evento_id)
+    if entregados:
+        db.execute(
+            update(EventoOutbox)
+            .where(EventoOutbox.id.in_(entregados))
+            .values(estado="procesado", procesado_en=datetime.now(), intentos=EventoOutbox.intentos + 1, error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    _registrar_fallos(db, fallos, ahora)
+    return len(eventos)
+
+
+def purgar_procesados(db: Session, dias: float = OUTBOX_RETENCION_DIAS) -> int:
+    """Borra los eventos procesados hace más de `dias` días. Los fallidos quedan para revisarlos."""
+    borrados = db.execute(
+        delete(EventoOutbox)
+        .where(EventoOutbox.estado == "procesado", EventoOutbox.procesado_en < datetime.now() - timedelta(days=dias))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return max(borrados or 0, 0)
+
+
+_ultima_purga = 0.0
+
+
+def procesar_pendientes(transporte_lote=None) -> int:
+    """Drena todos los eventos vencidos con una sesión propia y, cada tanto, purga los viejos."""
+    from config.db import SessionLocal
+
+    global _ultima_purga
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            tomados = procesar_lote(db, transporte_lote)
+            total += tomados
+            if tomados < OUTBOX_LOTE:
+                break
+        if time.monotonic() - _ultima_purga >= OUTBOX_PURGA_INTERVALO:
+            _ultima_purga = time.monotonic()
+            purgar_procesados(db)
+    return total
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_aviso: Optional[asyncio.Event] = None
+
+
+def avisar():
+    """Despierta al worker después de confirmar un evento, sin esperar al próximo ciclo."""
+    if _loop is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_aviso.set)
+
+
+async def ejecutar_worker(intervalo: float = OUTBOX_INTERVALO):
+    """Tarea asyncio que procesa el outbox cada `intervalo` segundos o al recibir un aviso."""
+    global _loop, _aviso
+    _loop = asyncio.get_running_loop()
+    _aviso = asyncio.Event()
+    while True:
+        try:
+            await run_in_threadpool(procesar_pendientes)
+        except Exception as e:
+            print("Error en el worker del outbox:", e)
+        try:
+            await asyncio.wait_for(_aviso.wait(), timeout=intervalo)
+        except asyncio.TimeoutError:
+            pass
+        _aviso.clear()
+
+
+if __name__ == "__main__":
+    import config.init_db  # noqa: F401  registra todos los modelos
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == "loop":
+        asyncio.run(ejecutar_worker())
+    elif len(sys.argv) > 1 and sys.argv[1] == "purgar":
+        from config.db import SessionLocal
+
+        with SessionLocal() as db:
+            print(f"✅ Eventos procesados borrados: {purgar_procesados(db)}")
+    else:
+        print(f"✅ Eventos procesados: {procesar_pendientes()}")
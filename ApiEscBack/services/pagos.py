@@ -0,0 +1,102 @@
+# services/pagos.py
+from decimal import Decimal
+from typing import Tuple
+
+from sqlalchemy import Date, Numeric, bindparam, case, func, select, update
+
+from models.cuota import Cuota
+from models.pago import Pago
+from services.estadoCuenta import ARRASTRADA
+
+
+def _valores_pago(monto):
+    """
+    Nuevos monto_pagado, saldo_pendiente y estado de una cuota tras sumar
+    `monto`. Una cuota arrastrada sigue así (su saldo vive en la cuota
+    del período siguiente); solo le llegan reversiones de pagos viejos.
+    """
+    pagado = func.coalesce(Cuota.monto_pagado, 0) + monto
+    saldo = Cuota.monto_a_pagar - pagado
+    arrastrada = Cuota.estado == ARRASTRADA
+    return {
+        "monto_pagado": pagado,
+        "saldo_pendiente": case((arrastrada, 0), (saldo > 0, saldo), else_=0),
+        "estado": case(
+            (arrastrada, ARRASTRADA),
+            (saldo <= 0, "pagada"),
+            (Cuota.fecha_vencimiento < func.current_date(), "vencida"),
+            (saldo < Cuota.monto_a_pagar, "parcial"),
+            else_="pendiente",
+        ),
+    }
+
+
+def aplicar_pago(cuota_id: int, monto: Decimal, alumno_id: int = None):
+    """
+    UPDATE atómico que suma `monto` (negativo para revertir) a la cuota y
+    recalcula en la misma sentencia el saldo (nunca negativo) y el estado:
+    pagada sin saldo, vencida con saldo y fecha de vencimiento pasada,
+    parcial con saldo menor al total, pendiente si no.
+    Devuelve (id, alumno_id, periodo, saldo_pendiente, estado).
+    Los pagos simultáneos sobre la misma cuota se serializan en el lock de
+    fila, que se retiene solo hasta el commit.
+    """
+    sentencia = update(Cuota).where(Cuota.id == cuota_id)
+    if monto > 0:
+        # Un pago nuevo va a la cuota que hoy tiene el saldo, no a una arrastrada
+        sentencia = sentencia.where(Cuota.estado != ARRASTRADA)
+    if alumno_id is not None:
+        sentencia = sentencia.where(Cuota.alumno_id == alumno_id)
+    return (
+        sentencia
+        .values(**_valores_pago(monto))
+        .returning(Cuota.id, Cuota.alumno_id, Cuota.periodo, Cuota.saldo_pendiente, Cuota.estado)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def aplicar_pagos_en_lote():
+    """
+    Misma actualización que `aplicar_pago` para ejecutar con muchos
+    parámetros a la vez: db.execute(sentencia, [{"b_id": ..., "b_monto": ...}]).
+    """
+    return (
+        update(Cuota.__table__)
+        .where(Cuota.__table__.c.id == bindparam("b_id"), Cuota.__table__.c.estado != ARRASTRADA)
+        .values(**_valores_pago(bindparam("b_monto", type_=Numeric(10, 2))))
+    )
+
+
+def consulta_mis_pagos(alumno_id: int):
+    """
+    Pagos del alumno con el período de su cuota, como columnas listas para
+    PagoOut (la fecha se trunca al día, como se mostraba siempre).
+    """
+    return (
+        select(
+            Pago.id,
+            Pago.alumno_id,
+            Pago.cuota_id,
+            Pago.monto_pagado,
+            func.date(Pago.fecha_pago, type_=Date).label("fecha_pago"),
+            Pago.metodo,
+            Pago.comprobante,
+            func.coalesce(Cuota.periodo, "Sin período").label("periodo"),
+        )
+        .outerjoin(Cuota, Cuota.id == Pago.cuota_id)
+        .where(Pago.alumno_id == alumno_id)
+        .order_by(Pago.fecha_pago.desc())
+    )
+
+
+def mensajes_pago(alumno_id: int, periodo: str, monto_pagado: float) -> Tuple[str, str]:
+    """Textos (alumno, admin) de la notificación de un pago registrado."""
+    mensaje_alumno = (
+        f"Se registró un pago de ${monto_pagado:,.2f} "
+        f"para tu cuota del período {periodo}."
+    )
+    mensaje_admin = (
+        f"El alumno ID {alumno_id} realizó un pago de ${monto_pagado:,.2f} "
+        f"para la cuota {periodo}."
+    )
+    return mensaje_alumno, mensaje_admin
@@ -0,0 +1,268 @@
+# services/perfiles.py
+"""
+Caché de los perfiles que el frontend pide en cada navegación
+(/user/profile y /userdetail/me). Se guarda el JSON ya serializado junto
+con su ETag, indexado por id de usuario; las escrituras sobre el usuario
+o su detalle borran las dos entradas.
+
+Backends según PERFIL_CACHE_URL:
+
+    (vacío)             LRU en memoria de cada proceso (por defecto)
+    redis://host:6379/0 clave-valor compartido entre workers (requiere `redis`)
+    memoria://          clave-valor falso en memoria, para pruebas locales
+
+El ETag es un hash del contenido, así que coincide entre workers aunque
+cada uno tenga su propia copia.
+
+Cada usuario tiene además una versión que sube en cada invalidación y
+vive en el mismo backend que las entradas. Cada entrada guarda la
+versión que había cuando se empezó a leer la base y solo se sirve si
+sigue siendo la actual: una lectura que se cruzó con una escritura en
+otro worker no deja un perfil viejo en la caché compartida.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from fastapi.responses import Response
+
+PERFIL_CACHE_URL = os.getenv("PERFIL_CACHE_URL", "")
+PERFIL_CACHE_SIZE = int(os.getenv("PERFIL_CACHE_SIZE", "10000"))
+# Red de seguridad para cambios que no pasan por las rutas que invalidan
+PERFIL_CACHE_TTL = int(os.getenv("PERFIL_CACHE_TTL", "600"))
+
+logger = logging.getLogger("perfiles")
+
+
+class BackendLRU:
+    """LRU acotado en memoria del proceso, con vencimiento por entrada."""
+
+    def __init__(self, max_size: int = PERFIL_CACHE_SIZE, ttl: int = PERFIL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versiones: Dict[str, int] = {}
+
+    def obtener(self, clave: str, clave_version: str) -> Tuple[Optional[bytes], int]:
+        """La entrada (o None) y la versión actual."""
+        with self._lock:
+            version = self._versiones.get(clave_version, 0)
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None, version
+            if entrada[0] <= time.monotonic():
+                del self._entradas[clave]
+                return None, version
+            self._entradas.move_to_end(clave)
+            return entrada[1], version
+
+    def guardar(self, clave: str, valor: bytes):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_size:
+                self._entradas.popitem(last=False)
+
+    def borrar(self, *claves: str):
+        with self._lock:
+            for clave in claves:
+                self._entradas.pop(clave, None)
+
+    def incrementar(self, clave_version: str):
+        with self._lock:
+            self._versiones[clave_version] = self._versiones.get(clave_version, 0) + 1
+
+
+class ClienteMemoria:
+    """Lo mínimo de la interfaz de redis (mget/set con ex/delete/incr/expire) sobre un dict."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos: Dict[str, Tuple[float, bytes]] = {}
+
+    def _leer(self, clave: str) -> Optional[bytes]:
+        entrada = self._datos.get(clave)
+        if entrada is None or entrada[0] <= time.monotonic():
+            self._datos.pop(clave, None)
+            return None
+        return entrada[1]
+
+    def mget(self, *claves: str) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._leer(clave) for clave in claves]
+
+    def set(self, clave: str, valor: bytes, ex: int):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ex, valor)
+
+    def delete(self, *claves: str):
+        with self._lock:
+            for clave in claves:
+                self._datos.pop(clave, None)
+
+    def incr(self, clave: str) -> int:
+        with self._lock:
+            valor = int(self._leer(clave) or 0) + 1
+            self._datos[clave] = (float("inf"), str(valor).encode("ascii"))
+            return valor
+
+    def expire(self, clave: str, segundos: int):
+        with self._lock:
+            valor = self._leer(clave)
+            if valor is not None:
+                self._datos[clave] = (time.monotonic() + segundos, valor)
+
+
+class BackendClaveValor:
+    """
+    Clave-valor compartido (redis o ClienteMemoria). Un error del servidor
+    se trata como ausencia: el perfil se lee de la base y la entrada vieja
+    vence sola a los `ttl` segundos.
+    """
+
+    def __init__(self, cliente, ttl: int = PERFIL_CACHE_TTL, prefijo: str = "apiesc:perfil:"):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefijo = prefijo
+
+    def obtener(self, clave: str, clave_version: str) -> Tuple[Optional[bytes], int]:
+        """Entrada y versión en un solo viaje (MGET)."""
+        try:
+            valor, version = self.cliente.mget(self.prefijo + clave, self.prefijo + clave_version)
+        except Exception as e:
+            logger.warning("Caché de perfiles no disponible: %s", e)
+            # Versión imposible: lo que se lea de la base no se guarda
+            return None, -1
+        return valor, int(version or 0)
+
+    def guardar(self, clave: str, valor: bytes):
+        try:
+            self.cliente.set(self.prefijo + clave, valor, ex=self.ttl)
+        except Exception as e:
+            logger.warning("Caché de perfiles no disponible: %s", e)
+
+    def borrar(self, *claves: str):
+        try:
+            self.cliente.delete(*(self.prefijo + c for c in claves))
+        except Exception as e:
+            logger.warning("No se pudo invalidar la caché de perfiles: %s", e)
+
+    def incrementar(self, clave_version: str):
+        # La versión dura más que cualquier entrada: si vence, ya no queda ninguna que invalidar
+        try:
+            self.cliente.incr(self.prefijo + clave_version)
+            self.cliente.expire(self.prefijo + clave_version, self.ttl * 2)
+        except Exception as e:
+            logger.warning("No se pudo invalidar la caché de perfiles: %s", e)
+
+
+def crear_backend(url: str = PERFIL_CACHE_URL):
+    if not url:
+        return BackendLRU()
+    if url.startswith("memoria://"):
+        return BackendClaveValor(ClienteMemoria())
+    try:
+        import redis
+    except ImportError:  # dependencia opcional, solo para el backend compartido
+        raise RuntimeError("PERFIL_CACHE_URL apunta a redis pero el paquete `redis` no está instalado")
+    # Timeout corto: una caché lenta no puede ser peor que ir a la base
+    return BackendClaveValor(redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2))
+
+
+def etag_de(cuerpo: bytes) -> str:
+    return '"' + hashlib.blake2b(cuerpo, digest_size=12).hexdigest() + '"'
+
+
+class CachePerfiles:
+    """Cada valor es `version\netag\ncuerpo`."""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else crear_backend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def _clave(tipo: str, user_id: int) -> str:
+        return f"{tipo}:{user_id}"
+
+    @staticmethod
+    def _clave_version(user_id: int) -> str:
+        return f"version:{user_id}"
+
+    def obtener(self, tipo: str, user_id: int) -> Tuple[Optional[Tuple[str, bytes]], int]:
+        """
+        (etag, cuerpo) si hay una entrada de la versión actual, o None; y
+        esa versión, que se le pasa a `guardar` tras leer de la base.
+        """
+        valor, version = self.backend.obtener(self._clave(tipo, user_id), self._clave_version(user_id))
+        guardado = None
+        if valor is not None:
+            version_entrada, _, resto = valor.partition(b"\n")
+            if int(version_entrada) == version:
+                etag, _, cuerpo = resto.partition(b"\n")
+                guardado = etag.decode("ascii"), cuerpo
+        with self._lock:
+            if guardado is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return guardado, version
+
+    def guardar(self, tipo: str, user_id: int, cuerpo: bytes, version: int) -> Tuple[str, bytes]:
+        etag = etag_de(cuerpo)
+        if version >= 0:
+            valor = b"%d\n%s\n%s" % (version, etag.encode("ascii"), cuerpo)
+            self.backend.guardar(self._clave(tipo, user_id), valor)
+        return etag, cuerpo
+
+    def invalidar(self, user_id: int):
+        with self._lock:
+            self.invalidaciones += 1
+        # Primero la versión: una lectura en curso ya no podrá dejar su copia vigente
+        self.backend.incrementar(self._clave_version(user_id))
+        self.backend.borrar(self._clave("perfil", user_id), self._clave("detalle", user_id))
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+cache_perfiles = CachePerfiles()
+
+
+def invalidar_perfil(user_id: int):
+    """Se llama después de confirmar cambios en el usuario o en su detalle."""
+    cache_perfiles.invalidar(user_id)
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparación débil (RFC 9110): se ignora el prefijo W/
+    return any(e.strip().removeprefix("W/") == etag for e in if_none_match.split(","))
+
+
+def respuesta_perfil(guardado: Tuple[str, bytes], if_none_match: Optional[str]) -> Response:
+    """200 con el JSON guardado, o 304 sin cuerpo si el cliente ya tiene esa versión."""
+    etag, cuerpo = guardado
+    # El navegador revalida en cada navegación; con el mismo ETag la respuesta es un 304 vacío
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
@@ -0,0 +1,123 @@
+# services/tarifas.py
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import TYPE_CHECKING, List, Optional
+import os
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.tarifa import Tarifa
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Segundos que se confía en la copia en memoria antes de releerla.
+# Es la red de seguridad para cuando otro proceso crea una tarifa.
+TARIFA_CACHE_TTL = float(os.getenv("TARIFA_CACHE_TTL", "300"))
+# Fechas resueltas que se recuerdan; las importaciones con fechas arbitrarias no la hacen crecer sin límite
+TARIFA_CACHE_FECHAS = int(os.getenv("TARIFA_CACHE_FECHAS", "1024"))
+
+
+@dataclass(frozen=True)
+class TarifaVigente:
+    """Copia inmutable de una fila de `tarifas`, segura para compartir entre sesiones."""
+    id: int
+    monto_mensual: Decimal
+    vigente_desde: date
+    vigente_hasta: Optional[date]
+
+
+class CacheTarifas:
+    """
+    Mantiene todas las tarifas ordenadas por `vigente_desde` y resuelve
+    la tarifa de cualquier fecha con búsqueda binaria. Los resultados
+    por fecha se memorizan en un LRU de `max_fechas` entradas hasta la
+    próxima invalidación o vencimiento del TTL.
+    """
+
+    def __init__(self, ttl: float = TARIFA_CACHE_TTL, max_fechas: int = TARIFA_CACHE_FECHAS):
+        self.ttl = ttl
+        self.max_fechas = max_fechas
+        self._lock = threading.Lock()
+        self._tarifas: List[TarifaVigente] = []
+        self._desdes: List[date] = []
+        self._por_fecha: "OrderedDict[date, Optional[TarifaVigente]]" = OrderedDict()
+        self._vence = 0.0
+
+    @staticmethod
+    def _consulta():
+        return (
+            select(Tarifa.id, Tarifa.monto_mensual, Tarifa.vigente_desde, Tarifa.vigente_hasta)
+            .order_by(Tarifa.vigente_desde.asc(), Tarifa.id.asc())
+        )
+
+    def _cargar(self, filas):
+        self._tarifas = [TarifaVigente(*fila) for fila in filas]
+        self._desdes = [t.vigente_desde for t in self._tarifas]
+        self._por_fecha = OrderedDict()
+        self._vence = time.monotonic() + self.ttl
+
+    def _buscar(self, fecha: date) -> Optional[TarifaVigente]:
+        # La más reciente que empezó antes de la fecha y sigue vigente en ella
+        i = bisect_right(self._desdes, fecha) - 1
+        while i >= 0:
+            tarifa = self._tarifas[i]
+            if tarifa.vigente_hasta is None or tarifa.vigente_hasta >= fecha:
+                return tarifa
+            i -= 1
+        return None
+
+    def resolver(self, db: Session, fecha: Optional[date] = None) -> Optional[TarifaVigente]:
+        fecha = fecha or date.today()
+        with self._lock:
+            if time.monotonic() >= self._vence:
+                self._cargar(db.execute(self._consulta()).all())
+            return self._memorizar(fecha)
+
+    async def resolver_async(self, db: "AsyncSession", fecha: Optional[date] = None) -> Optional[TarifaVigente]:
+        fecha = fecha or date.today()
+        # La lectura se hace fuera del lock: no se puede retener un threading.Lock en un await
+        filas = None
+        if time.monotonic() >= self._vence:
+            filas = (await db.execute(self._consulta())).all()
+        with self._lock:
+            if filas is not None:
+                self._cargar(filas)
+            return self._memorizar(fecha)
+
+    def _memorizar(self, fecha: date) -> Optional[TarifaVigente]:
+        if fecha in self._por_fecha:
+            self._por_fecha.move_to_end(fecha)
+            return self._por_fecha[fecha]
+        tarifa = self._por_fecha[fecha] = self._buscar(fecha)
+        while len(self._por_fecha) > self.max_fechas:
+            self._por_fecha.popitem(last=False)
+        return tarifa
+
+    def invalidar(self):
+        with self._lock:
+            self._vence = 0.0
+
+
+cache_tarifas = CacheTarifas()
+
+
+def obtener_tarifa(db: Session, fecha: Optional[date] = None) -> Optional[TarifaVigente]:
+    """Tarifa aplicable en `fecha` (hoy por defecto), o None si no hay ninguna."""
+    return cache_tarifas.resolver(db, fecha)
+
+
+async def obtener_tarifa_async(db: "AsyncSession", fecha: Optional[date] = None) -> Optional[TarifaVigente]:
+    """Igual que `obtener_tarifa`, para sesiones asíncronas."""
+    return await cache_tarifas.resolver_async(db, fecha)
+
+
+def invalidar_tarifas():
+    """Descarta la copia en memoria; se llama después de escribir en `tarifas`."""
+    cache_tarifas.invalidar()
@@ -0,0 +1,177 @@
+# services/vencimientos.py
+"""
+Pasa a `vencida` las cuotas impagas cuya fecha de vencimiento ya pasó,
+con un único UPDATE por corrida. Con RECARGO_MORA_PORCENTAJE > 0 cada
+cuota que vence guarda su recargo en `recargo_mora`, que se suma al
+`ajuste_anterior` de la cuota del período siguiente (ahora si ya existe,
+o al generarla). Cada corrida queda registrada en ejecuciones_tarea.
+
+Cada worker lanza la tarea periódica, pero en PostgreSQL un advisory
+lock deja correr una sola a la vez, y la tarea se saltea si otro worker
+ya corrió dentro del intervalo: queda una ejecución por período.
+
+    python -m services.vencimientos          # una corrida
+    python -m services.vencimientos loop     # cada VENCIMIENTOS_INTERVALO segundos
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+import asyncio
+import os
+import sys
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Numeric, bindparam, case, func, select, text, update
+from sqlalchemy.orm import Session
+
+from models.cuota import Cuota
+from models.ejecucionTarea import EjecucionTarea
+from services.estadoCuenta import actualizar_estado_cuenta
+from services.dashboard import invalidar_dashboard
+
+# Segundos entre corridas dentro de la app; 0 la desactiva (por ejemplo, si corre por cron)
+VENCIMIENTOS_INTERVALO = float(os.getenv("VENCIMIENTOS_INTERVALO", "3600"))
+RECARGO_MORA_PORCENTAJE = Decimal(os.getenv("RECARGO_MORA_PORCENTAJE", "0"))
+LOCK_VENCIMIENTOS = 72_017
+
+
+def _tomar_turno(db: Session, inicio: datetime, intervalo: Optional[float]) -> bool:
+    """
+    False si otro worker está corriendo el proceso o, con `intervalo`,
+    si la última corrida registrada empezó hace menos de ese tiempo (con
+    un margen para relojes y demoras). El lock se libera con el commit.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        if not db.scalar(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": LOCK_VENCIMIENTOS}):
+            return False
+    if intervalo:
+        ultima = db.scalar(
+            select(func.max(EjecucionTarea.inicio)).where(EjecucionTarea.tarea == "vencimientos")
+        )
+        if ultima is not None and (inicio - ultima).total_seconds() < intervalo * 0.9:
+            return False
+    return True
+
+
+def _trasladar_recargos():
+    """
+    UPDATE para ejecutar en bloque que suma cada recargo a la cuota del
+    período inmediato siguiente del alumno, si existe.
+    """
+    cuotas = Cuota.__table__
+    siguiente = cuotas.alias("siguiente")
+    recargo = bindparam("b_recargo", type_=Numeric(10, 2))
+    periodo_siguiente = (
+        select(func.min(siguiente.c.periodo))
+        .where(siguiente.c.alumno_id == bindparam("b_alumno"), siguiente.c.periodo > bindparam("b_periodo"))
+        .scalar_subquery()
+    )
+    return (
+        update(cuotas)
+        .where(cuotas.c.alumno_id == bindparam("b_alumno"), cuotas.c.periodo == periodo_siguiente)
+        .values(
+            ajuste_anterior=func.coalesce(cuotas.c.ajuste_anterior, 0) + recargo,
+            monto_a_pagar=cuotas.c.monto_a_pagar + recargo,
+            saldo_pendiente=func.coalesce(cuotas.c.saldo_pendiente, 0) + recargo,
+            estado=case((cuotas.c.estado == "pagada", "parcial"), else_=cuotas.c.estado),
+        )
+    )
+
+
+def procesar_vencimientos(
+    db: Session,
+    hoy: Optional[date] = None,
+    porcentaje: Decimal = RECARGO_MORA_PORCENTAJE,
+    intervalo: Optional[float] = None,
+) -> dict:
+    """
+    Marca las cuotas vencidas, aplica recargos, actualiza estado_cuenta y
+    registra la corrida. Si no le toca (ver `_tomar_turno`) no escribe nada
+    y devuelve el resumen en cero con `omitida`.
+    """
+    hoy = hoy or date.today()
+    inicio = datetime.now()
+    reloj = time.perf_counter()
+    if not _tomar_turno(db, inicio, intervalo):
+        db.rollback()
+        return {
+            "fecha": hoy, "vencidas": 0, "con_recargo": 0, "monto_recargos": 0.0,
+            "alumnos": 0, "duracion_ms": 0.0, "omitida": True,
+        }
+
+    resto = Cuota.monto_a_pagar - func.coalesce(Cuota.monto_pagado, 0)
+    valores = {"estado": "vencida"}
+    if porcentaje > 0:
+        valores["recargo_mora"] = func.round(resto * porcentaje / 100, 2)
+
+    vencidas = db.execute(
+        update(Cuota)
+        .where(
+            Cuota.estado.in_(["pendiente", "parcial"]),
+            Cuota.fecha_vencimiento < hoy,
+            resto > 0,
+        )
+        .values(**valores)
+        .returning(Cuota.alumno_id, Cuota.periodo, Cuota.recargo_mora)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    con_recargo = [v for v in vencidas if v.recargo_mora] if porcentaje > 0 else []
+    if con_recargo:
+        db.execute(_trasladar_recargos(), [
+            {"b_alumno": v.alumno_id, "b_periodo": v.periodo, "b_recargo": v.recargo_mora}
+            for v in con_recargo
+        ])
+
+    alumnos = {v.alumno_id for v in vencidas}
+    actualizar_estado_cuenta(db, alumnos)
+
+    resumen = {
+        "fecha": hoy,
+        "vencidas": len(vencidas),
+        "con_recargo": len(con_recargo),
+        "monto_recargos": float(sum(Decimal(v.recargo_mora) for v in con_recargo)),
+        "alumnos": len(alumnos),
+        "duracion_ms": round((time.perf_counter() - reloj) * 1000, 2),
+    }
+    db.add(EjecucionTarea(
+        tarea="vencimientos",
+        inicio=inicio,
+        duracion_ms=resumen["duracion_ms"],
+        filas=resumen["vencidas"],
+        detalle={**resumen, "fecha": hoy.isoformat()},
+    ))
+    db.commit()
+    if vencidas:
+        invalidar_dashboard()
+    return resumen
+
+
+def procesar_con_sesion(intervalo: Optional[float] = None) -> dict:
+    from config.db import SessionLocal
+
+    with SessionLocal() as db:
+        return procesar_vencimientos(db, intervalo=intervalo)
+
+
+async def ejecutar_periodicamente(intervalo: float = VENCIMIENTOS_INTERVALO):
+    """
+    Tarea asyncio que procesa los vencimientos al iniciar y luego cada
+    `intervalo` segundos, salvo que otro worker ya lo haya hecho.
+    """
+    while True:
+        try:
+            await run_in_threadpool(procesar_con_sesion, intervalo)
+        except Exception as e:
+            print("Error al procesar vencimientos:", e)
+        await asyncio.sleep(intervalo)
+
+
+if __name__ == "__main__":
+    import config.init_db  # noqa: F401  registra todos los modelos
+
+    if len(sys.argv) > 1 and sys.argv[1] == "loop":
+        asyncio.run(ejecutar_periodicamente(VENCIMIENTOS_INTERVALO or 3600))
+    else:
+        print(f"✅ Vencimientos: {procesar_con_sesion()}")
@@ -1,8 +1,32 @@
 import { Card } from "react-bootstrap";
 import { motion } from "framer-motion";
 import { DollarSign, Users, Bell } from "lucide-react";
+import { useEffect, useState } from "react";
+import { httpClient } from "../../api/httpClient";
+
+// Respuesta de GET /dashboard/admin (todos los indicadores en una sola petición)
+interface ResumenAdmin {
+  ingresos_mes: number;
+  alumnos: number;
+  alumnos_morosos: number;
+  deuda_vencida: number;
+  cuotas_vencidas: number;
+  ultimo_pago: { alumno: string; monto_pagado: number; fecha_pago: string } | null;
+}
+
+const moneda = (valor: number) =>
+  valor.toLocaleString("es-AR", { style: "currency", currency: "ARS" });
 
 const AdminDashboard = () => {
+  const [resumen, setResumen] = useState<ResumenAdmin | null>(null);
+
+  useEffect(() => {
+    httpClient
+      .get("/dashboard/admin")
+      .then(setResumen)
+      .catch((err) => console.error("Error al cargar el panel:", err));
+  }, []);
+
   return (
     <motion.div
       className="row g-4"
@@ -16,7 +40,14 @@ const AdminDashboard = () => {
             <DollarSign size={40} className="text-success me-3" />
             <div>
               <h5 className="mb-0">Pagos del mes</h5>
-              <small className="text-muted">Ver historial completo</small>
+              <small className="text-muted">
+                {resumen ? moneda(resumen.ingresos_mes) : "Ver historial completo"}
+              </small>
+              {resumen?.ultimo_pago && (
+                <div className="small text-muted">
+                  Último: {resumen.ultimo_pago.alumno} · {moneda(resumen.ultimo_pago.monto_pagado)}
+                </div>
+              )}
             </div>
           </div>
         </Card>
@@ -28,7 +59,9 @@ const AdminDashboard = () => {
             <Users size={40} className="text-primary me-3" />
             <div>
               <h5 className="mb-0">Alumnos registrados</h5>
-              <small className="text-muted">Gestión de usuarios</small>
+              <small className="text-muted">
+                {resumen ? `${resumen.alumnos} alumnos` : "Gestión de usuarios"}
+              </small>
             </div>
           </div>
         </Card>
@@ -40,7 +73,11 @@ const AdminDashboard = () => {
             <Bell size={40} className="text-warning me-3" />
             <div>
               <h5 className="mb-0">Notificaciones</h5>
-              <small className="text-muted">Pagos próximos a vencer</small>
+              <small className="text-muted">
+                {resumen
+                  ? `${resumen.alumnos_morosos} alumnos con ${resumen.cuotas_vencidas} cuotas vencidas (${moneda(resumen.deuda_vencida)})`
+                  : "Pagos próximos a vencer"}
+              </small>
             </div>
           </div>
         </Card>
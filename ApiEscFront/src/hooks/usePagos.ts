@@ -31,6 +31,24 @@ export const usePagos = () => {
     Authorization: `Bearer ${token}`,
   };
 
+  // 🔹 POST /nuevo con Idempotency-Key: reintentar no duplica el pago
+  const postNuevoPago = async (nuevoPago: NuevoPago) => {
+    const idempotencyKey = crypto.randomUUID();
+    let ultimoError: unknown;
+    for (let intento = 0; intento < 3; intento++) {
+      try {
+        return await fetch(`${API_URL}/nuevo`, {
+          method: "POST",
+          headers: { ...headers, "Idempotency-Key": idempotencyKey },
+          body: JSON.stringify(nuevoPago),
+        });
+      } catch (error) {
+        ultimoError = error;
+      }
+    }
+    throw ultimoError;
+  };
+
   // 🔹 Obtener todos los pagos (Admin)
   const fetchPagos = useCallback(async () => {
     try {
@@ -49,11 +67,7 @@ export const usePagos = () => {
   // 🔹 Crear nuevo pago (Admin)
   const crearPago = useCallback(async (nuevoPago: NuevoPago) => {
     try {
-      const res = await fetch(`${API_URL}/nuevo`, {
-        method: "POST",
-        headers,
-        body: JSON.stringify(nuevoPago),
-      });
+      const res = await postNuevoPago(nuevoPago);
       if (!res.ok) throw new Error();
       toast.success("Pago registrado correctamente");
       fetchPagos();
@@ -112,11 +126,7 @@ export const usePagos = () => {
   // 🔹 Crear pago como alumno (autenticado)
   const crearPagoAlumno = useCallback(async (nuevoPago: NuevoPago) => {
     try {
-      const res = await fetch(`${API_URL}/nuevo`, {
-        method: "POST",
-        headers,
-        body: JSON.stringify(nuevoPago),
-      });
+      const res = await postNuevoPago(nuevoPago);
       if (!res.ok) throw new Error();
       toast.success("Pago registrado correctamente");
       misPagos();